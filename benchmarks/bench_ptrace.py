@@ -0,0 +1,78 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without
+#    modification, are permitted provided that the following conditions are
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+"""
+Benchmark for the partial trace of multi-qubit states: a dense and a sparse
+density matrix and a ket, traced down to subsystem selections of different
+sizes.
+
+Usage: python bench_ptrace.py [number of qubits, default 10]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from qutip import rand_dm, rand_ket
+
+
+def timeit(func, repeat=5):
+    """Best time of a number of calls of func."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.time()
+        func()
+        best = min(best, time.time() - t0)
+    return best
+
+
+def run(N):
+    dims = [2] * N
+    states = [
+        ("dense dm", rand_dm(2 ** N, dims=[dims, dims]).to_dense()),
+        ("sparse dm", rand_dm(2 ** N, density=0.01,
+                              dims=[dims, dims]).to_csr()),
+        ("ket", rand_ket(2 ** N, dims=dims).to_dense()),
+    ]
+    selections = [[0], [0, N - 1], list(range(N // 2)),
+                  list(range(0, N, 2)), list(range(N - 1))]
+    print("%-10s %-32s %10s" % ("state", "selection", "time [ms]"))
+    for name, state in states:
+        for sel in selections:
+            t = timeit(lambda: state.ptrace(sel))
+            print("%-10s %-32s %10.3f" % (name, sel, 1e3 * t))
+
+
+if __name__ == "__main__":
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print("Partial trace of %d qubit states" % N)
+    run(N)
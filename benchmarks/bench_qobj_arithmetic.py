@@ -0,0 +1,99 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without
+#    modification, are permitted provided that the following conditions are
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+"""
+Benchmark for Qobj arithmetic: term by term construction of the Hamiltonian
+of an open Heisenberg spin chain,
+
+    H = sum_n J (sx_n sx_{n+1} + sy_n sy_{n+1} + sz_n sz_{n+1}),
+
+with the eager (default) and the lazy automatic tidyup of arithmetic
+results (``qutip.settings.auto_tidyup_lazy``).
+
+Usage: python bench_qobj_arithmetic.py [number of spins, default 20]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import qutip.settings
+from qutip import qeye, sigmax, sigmay, sigmaz, tensor
+
+
+def site_operators(N):
+    """Single-site spin operators embedded in the full chain."""
+    si = qeye(2)
+    ops = []
+    for op in [sigmax(), sigmay(), sigmaz()]:
+        op_list = []
+        for n in range(N):
+            factors = [si] * N
+            factors[n] = op
+            op_list.append(tensor(factors))
+        ops.append(op_list)
+    return ops
+
+
+def heisenberg(ops, J=1.0):
+    """Adds up the chain Hamiltonian one term at a time."""
+    N = len(ops[0])
+    H = 0
+    for n in range(N - 1):
+        for op_list in ops:
+            H += J * op_list[n] * op_list[n + 1]
+    return H
+
+
+def run(N):
+    ops = site_operators(N)
+    results = {}
+    for lazy in [False, True]:
+        qutip.settings.auto_tidyup_lazy = lazy
+        t0 = time.time()
+        H = heisenberg(ops)
+        t_build = time.time() - t0
+        t0 = time.time()
+        nnz = H.data.nnz
+        isherm = H.isherm
+        t_use = time.time() - t0
+        results[lazy] = t_build + t_use
+        print("%-6s build %8.3f s, first use %8.3f s, nnz = %d, isherm = %s" %
+              ("lazy" if lazy else "eager", t_build, t_use, nnz, isherm))
+    qutip.settings.auto_tidyup_lazy = False
+    print("speedup: %.2f" % (results[False] / results[True]))
+
+
+if __name__ == "__main__":
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print("Heisenberg chain with %d spins (dimension %d)" % (N, 2 ** N))
+    run(N)
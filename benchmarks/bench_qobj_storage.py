@@ -0,0 +1,103 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without
+#    modification, are permitted provided that the following conditions are
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+"""
+Benchmark comparing the CSR and dense storage of Qobj data on typical
+quantum objects: a random ket, a random density matrix and the Liouvillian
+of a damped cavity, each combined with a sparse operator.
+
+Usage: python bench_qobj_storage.py [Hilbert space dimension, default 50]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from qutip import (Qobj, destroy, expect, liouvillian, operator_to_vector,
+                   rand_dm, rand_ket, fidelity, tracedist)
+
+
+def timeit(func, q, repeat=20, max_time=2.0):
+    """Best time of a number of calls of func on fresh copies of q, since
+    accessing the data directly may change the storage of q."""
+    best = float('inf')
+    total = 0.0
+    for _ in range(repeat):
+        arg = Qobj(q)
+        t0 = time.time()
+        func(arg)
+        t = time.time() - t0
+        best = min(best, t)
+        total += t
+        if total > max_time:
+            break
+    return best
+
+
+def cases(N):
+    a = destroy(N)
+    H = a.dag() * a + 0.1 * (a + a.dag())
+    L = liouvillian(H, [0.1 * a])
+    psi = rand_ket(N)
+    rho = rand_dm(N)
+    sigma = rand_dm(N)
+    rho_vec = operator_to_vector(rho)
+    return [
+        ("ket: H * psi", lambda psi: H * psi, psi),
+        ("ket: expect(H, psi)", lambda psi: expect(H, psi), psi),
+        ("ket: psi.dag() * psi", lambda psi: psi.dag() * psi, psi),
+        ("dm: H * rho", lambda rho: H * rho, rho),
+        ("dm: expect(H, rho)", lambda rho: expect(H, rho), rho),
+        ("dm: rho + rho.dag()", lambda rho: rho + rho.dag(), rho),
+        ("dm: rho.tr()", lambda rho: rho.tr(), rho),
+        ("dm: rho.expm()", lambda rho: rho.expm(), rho),
+        ("dm: fidelity", lambda rho: fidelity(rho, sigma), rho),
+        ("dm: tracedist", lambda rho: tracedist(rho, sigma), rho),
+        ("L: L * rho_vec", lambda L: L * rho_vec, L),
+        ("L: L * L", lambda L: L * L, L),
+    ]
+
+
+def run(N):
+    print("%-24s %12s %12s %8s" % ("operation", "csr [ms]", "dense [ms]",
+                                   "speedup"))
+    for name, func, q in cases(N):
+        t_csr = timeit(func, q.to_csr())
+        t_dense = timeit(func, q.to_dense())
+        print("%-24s %12.3f %12.3f %8.2f" %
+              (name, 1e3 * t_csr, 1e3 * t_dense, t_csr / t_dense))
+
+
+if __name__ == "__main__":
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print("Hilbert space dimension %d" % N)
+    run(N)
@@ -5,22 +5,40 @@ from Cython.Build import cythonize
 
 import numpy as np
 import os
+import sys
 
 exts = ['spmatfuncs', 'stochastic', 'sparse_utils', 'graph_utils']
 
 _compiler_flags = ['-w', '-ffast-math', '-O3', '-march=native']
 
+# OpenMP flags for the extensions with multi-threaded kernels. Without them
+# (e.g. with the default clang on OSX) the kernels are compiled serially.
+openmp_exts = ['spmatfuncs']
+if sys.platform == 'win32':
+    _openmp_compile_flags, _openmp_link_flags = ['/openmp'], []
+elif sys.platform == 'darwin':
+    _openmp_compile_flags, _openmp_link_flags = [], []
+else:
+    _openmp_compile_flags, _openmp_link_flags = ['-fopenmp'], ['-fopenmp']
+
+
+def _ext_flags(ext):
+    if ext in openmp_exts:
+        return (_compiler_flags + _openmp_compile_flags, _openmp_link_flags)
+    return _compiler_flags, []
+
 def configuration(parent_package='', top_path=None):
     # compiles files during installation
     from numpy.distutils.misc_util import Configuration
     config = Configuration('cy', parent_package, top_path)
 
     for ext in exts:
+        compile_flags, link_flags = _ext_flags(ext)
         config.add_extension(
             ext, sources=[ext + ".pyx"],
             include_dirs=[np.get_include()],
-            extra_compile_args=_compiler_flags,
-            extra_link_args=[])
+            extra_compile_args=compile_flags,
+            extra_link_args=link_flags)
 
     config.ext_modules = cythonize(config.ext_modules)
 
@@ -34,5 +52,5 @@ if __name__ == '__main__':
         include_dirs=[np.get_include()],
         ext_modules=[Extension(
             ext, [ext + ".pyx"],
-            extra_compile_args=_compiler_flags,
-            extra_link_args=[]) for ext in exts])
+            extra_compile_args=_ext_flags(ext)[0],
+            extra_link_args=_ext_flags(ext)[1]) for ext in exts])
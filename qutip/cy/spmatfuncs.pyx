@@ -34,6 +34,7 @@ import numpy as np
 cimport numpy as np
 cimport cython
 cimport libc.math
+from cython.parallel cimport prange
 
 include "complex_math.pxi"
 
@@ -160,6 +161,161 @@ cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] cy_ode_rhs(
     return out
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] spmmpy(
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] data,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] idx,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] vec,
+        CTYPE_t a,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] out,
+        int nvec):
+    """
+    Sparse matrix times block of vectors plus block of vectors function:
+    out = out + a * (data, idx, ptr) * vec, where vec and out hold nvec
+    vectors as the columns of a row-major (num_rows, nvec) array. Each element
+    of the sparse matrix is read once for all the vectors.
+    """
+    cdef Py_ssize_t row
+    cdef int jj, kk, col, row_start, row_end
+    cdef int num_rows = ptr.shape[0] - 1
+    cdef CTYPE_t val
+
+    for row in range(num_rows):
+        row_start = ptr[row]
+        row_end = ptr[row+1]
+        for jj in range(row_start, row_end):
+            val = a * data[jj]
+            col = idx[jj] * nvec
+            for kk in range(nvec):
+                out[row * nvec + kk] = out[row * nvec + kk] + \
+                    val * vec[col + kk]
+
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] cy_ode_rhs_block(
+        double t,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] rho,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] data,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] idx,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr,
+        int nvec):
+    """
+    ODE right-hand side (data, idx, ptr) * rho for a block of nvec state
+    vectors, stored as the columns of a row-major (num_rows, nvec) array.
+    """
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.zeros((rho.shape[0]), dtype=np.complex)
+    return spmmpy(data, idx, ptr, rho, 1.0, out, nvec)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _spmvpy_rows(CTYPE_t * data, ITYPE_t * idx, ITYPE_t * ptr,
+                       CTYPE_t * vec, CTYPE_t a, CTYPE_t * out,
+                       int row_start, int row_end) nogil:
+    """
+    out = out + a * (data, idx, ptr) * vec for the rows row_start to
+    row_end - 1 of the sparse matrix.
+    """
+    cdef int row, jj
+    cdef CTYPE_t dot
+
+    for row in range(row_start, row_end):
+        dot = 0.0
+        for jj in range(ptr[row], ptr[row+1]):
+            dot = dot + data[jj] * vec[idx[jj]]
+        out[row] = out[row] + a * dot
+
+
+def row_partition(np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr, int nthr):
+    """
+    Split the rows of a CSR matrix with row pointers ptr into nthr blocks of
+    consecutive rows with about the same number of nonzero elements.
+
+    Returns
+    -------
+    bounds : array
+        The rows bounds[k] to bounds[k+1] - 1 make up the k-th block.
+
+    """
+    cdef int num_rows = ptr.shape[0] - 1
+    bounds = np.searchsorted(ptr, np.linspace(0, ptr[num_rows], nthr + 1))
+    bounds[0] = 0
+    bounds[nthr] = num_rows
+    return bounds.astype(ITYPE)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] spmvpy_openmp(
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] data,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] idx,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] vec,
+        CTYPE_t a,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] out,
+        int nthr):
+    """
+    Sparse matrix time vector plus vector function, multi-threaded over
+    blocks of rows with about the same number of nonzero elements:
+    out = out + a * (data, idx, ptr) * vec
+    """
+    cdef int k
+    cdef np.ndarray[ITYPE_t, ndim=1, mode="c"] bounds
+
+    if data.shape[0] == 0:
+        return out
+    if nthr <= 1:
+        return spmvpy(data, idx, ptr, vec, a, out)
+
+    bounds = row_partition(ptr, nthr)
+    for k in prange(nthr, nogil=True, schedule='static', num_threads=nthr):
+        _spmvpy_rows(&data[0], &idx[0], &ptr[0], &vec[0], a, &out[0],
+                     bounds[k], bounds[k+1])
+
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] spmv_csr_openmp(
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] data,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] idx,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] vec,
+        int nthr):
+    """
+    Sparse matrix, dense vector multiplication, multi-threaded over blocks of
+    rows. See spmv_csr.
+    """
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.zeros((ptr.shape[0] - 1), dtype=np.complex)
+    return spmvpy_openmp(data, idx, ptr, vec, 1.0, out, nthr)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] cy_ode_rhs_openmp(
+        double t,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] rho,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] data,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] idx,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr,
+        int nthr):
+    """
+    ODE right-hand side (data, idx, ptr) * rho, multi-threaded over blocks of
+    rows. See cy_ode_rhs.
+    """
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.zeros((rho.shape[0]), dtype=np.complex)
+    return spmvpy_openmp(data, idx, ptr, rho, 1.0, out, nthr)
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] cy_ode_psi_func_td(
@@ -273,6 +429,76 @@ cpdef cy_expect_psi_csr(np.ndarray[CTYPE_t, ndim=1, mode="c"] data,
         return dot
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef tuple cy_mc_collapse(np.ndarray[CTYPE_t, ndim=1, mode="c"] data,
+                           np.ndarray[ITYPE_t, ndim=1, mode="c"] idx,
+                           np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr,
+                           np.ndarray[CTYPE_t, ndim=1, mode="c"] state,
+                           np.ndarray[DTYPE_t, ndim=1, mode="c"] weights,
+                           double rand):
+    """
+    Collapse of a state vector in the Monte Carlo solver.
+
+    The collapse operators are stacked row-wise in a single CSR matrix of
+    shape (num_ops * N, N). The collapsed states of all channels, and their
+    norms, are computed in one pass over this matrix. The probability of a
+    channel is its weight times the squared norm of its collapsed state, and
+    the first channel whose cumulative probability reaches rand times the
+    total is selected.
+
+    Parameters
+    ----------
+    data : array
+        Data for the stacked collapse operators.
+    idx : array
+        Indices for the stacked collapse operators.
+    ptr : array
+        Pointers for the stacked collapse operators.
+    state : array
+        State vector at the time of the collapse.
+    weights : array
+        Weight of each channel, the squared magnitude of its time-dependent
+        coefficient (or one).
+    rand : float
+        Uniform random number in [0, 1).
+
+    Returns
+    -------
+    j, out : int, array
+        Index of the selected channel, and the normalized collapsed state.
+
+    """
+    cdef int num_ops = weights.shape[0]
+    cdef int N = state.shape[0]
+    cdef int k, row, jj, j
+    cdef CTYPE_t dot
+    cdef double total = 0, cum = 0, target
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.zeros((num_ops * N), dtype=np.complex)
+    cdef np.ndarray[DTYPE_t, ndim=1, mode="c"] norm2 = \
+        np.zeros((num_ops), dtype=np.float64)
+
+    for k in range(num_ops):
+        for row in range(k * N, (k + 1) * N):
+            dot = 0.0
+            for jj in range(ptr[row], ptr[row + 1]):
+                dot += data[jj] * state[idx[jj]]
+            out[row] = dot
+            norm2[k] += dot.real * dot.real + dot.imag * dot.imag
+        total += weights[k] * norm2[k]
+
+    target = rand * total
+    j = num_ops - 1
+    for k in range(num_ops):
+        cum += weights[k] * norm2[k]
+        if cum >= target and weights[k] * norm2[k] > 0:
+            j = k
+            break
+
+    return j, out[j * N:(j + 1) * N] / libc.math.sqrt(norm2[j])
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 cpdef cy_expect_rho_vec(object super_op,
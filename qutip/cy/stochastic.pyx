@@ -157,3 +157,281 @@ cpdef cy_d2_rho_photocurrent(double t, np.ndarray[CTYPE_t, ndim=1] rho_vec,
         return [- rho_vec]
 
 
+#
+# Euler-Maruyama kernels for the built-in homodyne, heterodyne and
+# photocurrent processes, running all the substeps between two output times.
+#
+
+cdef inline void _spmv_rows(CTYPE_t[::1] data, ITYPE_t[::1] ind,
+                            ITYPE_t[::1] ptr, CTYPE_t[::1] vec,
+                            CTYPE_t[::1] out, int nrows) nogil:
+    cdef int row, jj
+    cdef CTYPE_t dot
+    for row in range(nrows):
+        dot = 0
+        for jj in range(ptr[row], ptr[row + 1]):
+            dot = dot + data[jj] * vec[ind[jj]]
+        out[row] = dot
+
+
+cdef inline double _poisson(double lam, double u) nogil:
+    """
+    Poisson distributed number with mean lam, by inversion of the
+    cumulative distribution at the uniform random number u. The
+    probabilities are accumulated in log space, since exp(-lam) underflows
+    for lam larger than about 745.
+    """
+    cdef double logp = -lam
+    cdef double p = libc.math.exp(logp)
+    cdef double cdf = p
+    cdef int k = 0
+    while u > cdf and (k < lam or p > 0):
+        k += 1
+        logp += libc.math.log(lam / k)
+        p = libc.math.exp(logp)
+        cdf += p
+    return k
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef cy_sse_euler_substeps(int method,
+                            CTYPE_t[::1] H_data, ITYPE_t[::1] H_ind,
+                            ITYPE_t[::1] H_ptr,
+                            CTYPE_t[::1] A_data, ITYPE_t[::1] A_ind,
+                            ITYPE_t[::1] A_ptr, int n_sc,
+                            CTYPE_t[::1] E_data, ITYPE_t[::1] E_ind,
+                            ITYPE_t[::1] E_ptr, int n_e,
+                            CTYPE_t[::1] psi, double[:, :, :] dW,
+                            double[:, :, :] rand, CTYPE_t[:] expect,
+                            CTYPE_t[:] ss, double dt, int normalize,
+                            int draw, CTYPE_t[::1] work, CTYPE_t[::1] dpsi):
+    """
+    Euler-Maruyama substeps of the stochastic Schrodinger equation between
+    two output times, for the homodyne (method 0), heterodyne (1) and
+    photocurrent (2) processes. The expectation values of the e_ops at the
+    initial state are first added to expect and ss.
+
+    Parameters
+    ----------
+    H_data, H_ind, H_ptr : array
+        CSR data of the Hamiltonian.
+    A_data, A_ind, A_ptr : array
+        The operators c and c^dagger c of each of the n_sc stochastic
+        collapse operators, stacked row-wise.
+    E_data, E_ind, E_ptr : array
+        The n_e expectation value operators, stacked row-wise.
+    psi : array
+        State vector, updated in place.
+    dW : array
+        Increments of shape (n_sc, nsubsteps, d2_len). With draw, the
+        poisson increments of the photocurrent are drawn into dW.
+    rand : array
+        Uniform random numbers of the shape of dW, for drawing the poisson
+        increments.
+    expect, ss : array
+        Sums of the expectation values and of their squares.
+    work, dpsi : array
+        Work buffers of length 2 * n_sc * N and N.
+
+    """
+    cdef int N = psi.shape[0]
+    cdef int n_substeps = dW.shape[1]
+    cdef int j, a, k, i, row, jj
+    cdef CTYPE_t ec, e_C, e_Cd, s, dot, d2
+    cdef double e1, n1, nrm, X, Y, sqrt_half = libc.math.sqrt(0.5)
+    cdef CTYPE_t ihalf = 1j * sqrt_half
+    cdef CTYPE_t cpsi, ncpsi
+
+    with nogil:
+        for k in range(n_e):
+            s = 0
+            for i in range(N):
+                row = k * N + i
+                dot = 0
+                for jj in range(E_ptr[row], E_ptr[row + 1]):
+                    dot = dot + E_data[jj] * psi[E_ind[jj]]
+                s = s + psi[i].conjugate() * dot
+            expect[k] = expect[k] + s
+            ss[k] = ss[k] + s * s
+
+        for j in range(n_substeps):
+            _spmv_rows(A_data, A_ind, A_ptr, psi, work, 2 * n_sc * N)
+            _spmv_rows(H_data, H_ind, H_ptr, psi, dpsi, N)
+            for i in range(N):
+                dpsi[i] = -1j * dt * dpsi[i]
+
+            for a in range(n_sc):
+                ec = 0
+                n1 = 0
+                for i in range(N):
+                    cpsi = work[2 * a * N + i]
+                    ec = ec + psi[i].conjugate() * cpsi
+                    n1 += cpsi.real * cpsi.real + cpsi.imag * cpsi.imag
+
+                if method == 0:
+                    e1 = 2 * ec.real
+                    for i in range(N):
+                        cpsi = work[2 * a * N + i]
+                        ncpsi = work[(2 * a + 1) * N + i]
+                        dpsi[i] = dpsi[i] + \
+                            0.5 * (e1 * cpsi - ncpsi -
+                                   0.25 * e1 * e1 * psi[i]) * dt + \
+                            (cpsi - 0.5 * e1 * psi[i]) * dW[a, j, 0]
+
+                elif method == 1:
+                    e_C = ec
+                    e_Cd = ec.conjugate()
+                    X = ec.real
+                    Y = ec.imag
+                    for i in range(N):
+                        cpsi = work[2 * a * N + i]
+                        ncpsi = work[(2 * a + 1) * N + i]
+                        dpsi[i] = dpsi[i] + \
+                            (-0.5 * ncpsi + 0.5 * e_Cd * cpsi -
+                             0.25 * e_C * e_Cd * psi[i]) * dt + \
+                            sqrt_half * (cpsi - X * psi[i]) * dW[a, j, 0] - \
+                            ihalf * (cpsi - 1j * Y * psi[i]) * dW[a, j, 1]
+
+                else:
+                    if draw:
+                        dW[a, j, 0] = _poisson(n1 * dt, rand[a, j, 0])
+                    nrm = libc.math.sqrt(n1)
+                    for i in range(N):
+                        cpsi = work[2 * a * N + i]
+                        ncpsi = work[(2 * a + 1) * N + i]
+                        if nrm != 0:
+                            d2 = cpsi / nrm - psi[i]
+                        else:
+                            d2 = -psi[i]
+                        dpsi[i] = dpsi[i] - \
+                            0.5 * (ncpsi - n1 * psi[i]) * dt + d2 * dW[a, j, 0]
+
+            nrm = 0
+            for i in range(N):
+                psi[i] = psi[i] + dpsi[i]
+                nrm += psi[i].real * psi[i].real + psi[i].imag * psi[i].imag
+            if normalize:
+                nrm = libc.math.sqrt(nrm)
+                for i in range(N):
+                    psi[i] = psi[i] / nrm
+
+
+cdef inline CTYPE_t _trace_vec(CTYPE_t[::1] vec, int offset, int n) nogil:
+    cdef int k
+    cdef CTYPE_t tr = 0
+    for k in range(n):
+        tr = tr + vec[offset + k * (n + 1)]
+    return tr
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef cy_sme_euler_substeps(int method,
+                            CTYPE_t[::1] L_data, ITYPE_t[::1] L_ind,
+                            ITYPE_t[::1] L_ptr,
+                            CTYPE_t[::1] A_data, ITYPE_t[::1] A_ind,
+                            ITYPE_t[::1] A_ptr, int n_sc, int n_blocks,
+                            CTYPE_t[::1] E_data, ITYPE_t[::1] E_ind,
+                            ITYPE_t[::1] E_ptr, int n_e,
+                            CTYPE_t[::1] rho, double[:, :, :] dW,
+                            double[:, :, :] rand, CTYPE_t[:] expect,
+                            CTYPE_t[:] ss, double dt, int draw,
+                            CTYPE_t[::1] work, CTYPE_t[::1] drho):
+    """
+    Euler-Maruyama substeps of the stochastic master equation between two
+    output times, for the homodyne (method 0), heterodyne (1) and
+    photocurrent (2) processes. The expectation values of the e_ops at the
+    initial state are first added to expect and ss.
+
+    Parameters
+    ----------
+    L_data, L_ind, L_ptr : array
+        CSR data of the Liouvillian.
+    A_data, A_ind, A_ptr : array
+        The n_blocks superoperators of each of the n_sc stochastic collapse
+        operators c, stacked row-wise: D[c] and spre(c) + spost(c^dagger)
+        for homodyne, followed by spre(c) - spost(c^dagger) for heterodyne,
+        and spre(c^dagger c) + spost(c^dagger c) and spre(c) spost(c^dagger)
+        for photocurrent.
+    E_data, E_ind, E_ptr : array
+        The n_e expectation value superoperators, stacked row-wise.
+    rho : array
+        Density matrix in vector form, updated in place.
+    dW : array
+        Increments of shape (n_sc, nsubsteps, d2_len). With draw, the
+        poisson increments of the photocurrent are drawn into dW.
+    rand : array
+        Uniform random numbers of the shape of dW, for drawing the poisson
+        increments.
+    expect, ss : array
+        Sums of the expectation values and of their squares.
+    work, drho : array
+        Work buffers of length n_blocks * n_sc * N**2 and N**2.
+
+    """
+    cdef int M = rho.shape[0]
+    cdef int N = <int>libc.math.sqrt(M)
+    cdef int n_substeps = dW.shape[1]
+    cdef int j, a, k, i, row, jj, off
+    cdef CTYPE_t s, dot, e1, e2, en, eg
+    cdef double sqrt_half = libc.math.sqrt(0.5), lam
+
+    with nogil:
+        for k in range(n_e):
+            s = 0
+            for i in range(N):
+                row = k * M + i * (N + 1)
+                for jj in range(E_ptr[row], E_ptr[row + 1]):
+                    s = s + E_data[jj] * rho[E_ind[jj]]
+            expect[k] = expect[k] + s
+            ss[k] = ss[k] + s * s
+
+        for j in range(n_substeps):
+            _spmv_rows(A_data, A_ind, A_ptr, rho, work, n_blocks * n_sc * M)
+            _spmv_rows(L_data, L_ind, L_ptr, rho, drho, M)
+            for i in range(M):
+                drho[i] = drho[i] * dt
+
+            for a in range(n_sc):
+                off = n_blocks * a * M
+
+                if method == 0:
+                    e1 = _trace_vec(work, off + M, N)
+                    for i in range(M):
+                        drho[i] = drho[i] + work[off + i] * dt + \
+                            (work[off + M + i] - e1 * rho[i]) * dW[a, j, 0]
+
+                elif method == 1:
+                    e1 = _trace_vec(work, off + M, N)
+                    e2 = _trace_vec(work, off + 2 * M, N)
+                    for i in range(M):
+                        drho[i] = drho[i] + work[off + i] * dt + \
+                            sqrt_half * (work[off + M + i] - e1 * rho[i]) * \
+                            dW[a, j, 0] - \
+                            1j * sqrt_half * \
+                            (work[off + 2 * M + i] - e2 * rho[i]) * \
+                            dW[a, j, 1]
+
+                else:
+                    en = _trace_vec(work, off, N)
+                    eg = _trace_vec(work, off + M, N)
+                    if draw:
+                        lam = 0.5 * en.real * dt
+                        if lam > 0:
+                            dW[a, j, 0] = _poisson(lam, rand[a, j, 0])
+                        else:
+                            dW[a, j, 0] = 0
+                    for i in range(M):
+                        drho[i] = drho[i] + \
+                            0.5 * (en * rho[i] - work[off + i]) * dt
+                        if eg.real > 1e-12:
+                            drho[i] = drho[i] + \
+                                (work[off + M + i] / eg - rho[i]) * dW[a, j, 0]
+                        else:
+                            drho[i] = drho[i] - rho[i] * dW[a, j, 0]
+
+            for i in range(M):
+                rho[i] = rho[i] + drho[i]
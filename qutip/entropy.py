@@ -34,9 +34,10 @@
 __all__ = ['entropy_vn', 'entropy_linear', 'entropy_mutual', 'negativity',
            'concurrence', 'entropy_conditional', 'entangling_power']
 
+import numpy as np
 from numpy import e, real, sort, sqrt
 from scipy import log, log2
-from qutip.qobj import ptrace
+from qutip.qobj import ptrace, _state_stacks
 from qutip.states import ket2dm
 from qutip.tensor import tensor
 from qutip.operators import sigmay
@@ -51,8 +52,9 @@ def entropy_vn(rho, base=e, sparse=False):
 
     Parameters
     ----------
-    rho : qobj
-        Density matrix.
+    rho : qobj / list
+        Density matrix, or a list of density matrices with the same
+        dimensions, whose eigenvalues are then calculated together.
     base : {e,2}
         Base of logarithm.
     sparse : {False,True}
@@ -60,8 +62,9 @@ def entropy_vn(rho, base=e, sparse=False):
 
     Returns
     -------
-    entropy : float
-        Von-Neumann entropy of `rho`.
+    entropy : float / array
+        Von-Neumann entropy of `rho`, or an array of the entropies for a list
+        of density matrices.
 
     Examples
     --------
@@ -70,9 +73,27 @@ def entropy_vn(rho, base=e, sparse=False):
     1.0
 
     """
+    if isinstance(rho, (list, np.ndarray)):
+        if sparse:
+            return np.array([entropy_vn(r, base, sparse) for r in rho])
+        rhos = [ket2dm(r) if r.type in ['ket', 'bra'] else r for r in rho]
+        if any([r.dims != rhos[0].dims for r in rhos]):
+            raise TypeError("Density matrices do not have same dimensions.")
+        vals = np.concatenate([np.linalg.eigvalsh(stack)
+                               for stack in _state_stacks(rhos)])
+        return np.array([_entropy_from_eigs(v, base) for v in vals])
+
     if rho.type == 'ket' or rho.type == 'bra':
         rho = ket2dm(rho)
-    vals = sp_eigs(rho.data, rho.isherm, vecs=False, sparse=sparse)
+    vals = sp_eigs(rho._current_data(), rho.isherm, vecs=False,
+                   sparse=sparse)
+    return _entropy_from_eigs(vals, base)
+
+
+def _entropy_from_eigs(vals, base):
+    """
+    Von-Neumann entropy from the eigenvalues of a density matrix.
+    """
     nzvals = vals[vals != 0]
     if base == 2:
         logvals = log2(nzvals)
@@ -36,7 +36,8 @@ __all__ = ['expect', 'variance']
 import numpy as np
 import scipy.sparse as sp
 
-from qutip.qobj import Qobj, isoper
+import qutip.settings as settings
+from qutip.qobj import Qobj, isoper, _state_stacks
 from qutip.eseries import eseries
 from qutip.cy.spmatfuncs import (cy_expect_rho_vec, cy_expect_psi, cy_spmm_tr)
 
@@ -44,6 +45,10 @@ from qutip.cy.spmatfuncs import (cy_expect_rho_vec, cy_expect_psi, cy_spmm_tr)
 expect_rho_vec = cy_expect_rho_vec
 expect_psi = cy_expect_psi
 
+# largest dimension of sparse density matrices that are converted to dense
+# arrays to calculate their expectation values together
+_batch_max_dim = 64
+
 
 def expect(oper, state):
     '''Calculates the expectation value for operator(s) and state(s).
@@ -54,7 +59,11 @@ def expect(oper, state):
         A single or a `list` or operators for expectation value.
 
     state : qobj/array-like
-        A single or a `list` of quantum states or density matrices.
+        A single or a `list` of quantum states or density matrices, or the
+        data of many states stacked in an ndarray, of shape (n, N) for kets
+        or (n, N, N) for density matrices. The expectation values for a list
+        of kets, or of density matrices, with the same dimensions are
+        calculated together in a single contraction.
 
     Returns
     -------
@@ -87,6 +96,10 @@ def expect(oper, state):
             return [expect(o, state) for o in oper]
 
     elif isinstance(state, (list, np.ndarray)):
+        if isinstance(state, np.ndarray) and state.dtype != object:
+            return _stack_expect(oper, state)
+        if _can_batch(oper, state):
+            return _batch_qobj_expect(oper, state)
         if oper.isherm and all([(op.isherm or op.type == 'ket')
                                 for op in state]):
             return np.array([_single_qobj_expect(oper, x) for x in state])
@@ -109,17 +122,113 @@ def _single_qobj_expect(oper, state):
 
         if state.type == 'oper':
             # calculates expectation value via TR(op*rho)
-            return cy_spmm_tr(oper.data, state.data,
-                              oper.isherm and state.isherm)
+            isherm = oper.isherm and state.isherm
+            if oper.storage == 'csr' and state.storage == 'csr':
+                return cy_spmm_tr(oper.data, state.data, isherm)
+            out = _dense_tr_product(oper._current_data(),
+                                    state._current_data())
+            return float(np.real(out)) if isherm else complex(out)
 
         elif state.type == 'ket':
             # calculates expectation value via <psi|op|psi>
-            return cy_expect_psi(oper.data, state.full(squeeze=True),
-                                 oper.isherm)
+            if oper.storage == 'csr':
+                return cy_expect_psi(oper.data, state.full(squeeze=True),
+                                     oper.isherm)
+            psi = state.full(squeeze=True)
+            out = np.vdot(psi, np.dot(oper._current_data(), psi))
+            return float(np.real(out)) if oper.isherm else complex(out)
     else:
         raise TypeError('Invalid operand types')
 
 
+def _dense_tr_product(A, B):
+    """
+    Private function that calculates TR(A*B) for the data of two operators,
+    at least one of which is stored as a dense array.
+    """
+    if sp.issparse(A):
+        rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+        return np.dot(A.data, B[A.indices, rows])
+    elif sp.issparse(B):
+        return _dense_tr_product(B, A)
+    else:
+        return np.sum(A * B.T)
+
+
+def _can_batch(oper, states):
+    """
+    Private function checking if the expectation values for a list of states
+    can be calculated together: all states are kets, or all are operators,
+    with the same dims matching the operator. Sparse density matrices larger
+    than _batch_max_dim are not batched, since the batch holds them as dense
+    arrays.
+    """
+    if not isinstance(oper, Qobj) or not isoper(oper) or len(states) == 0:
+        return False
+    first = states[0]
+    if not isinstance(first, Qobj) or first.type not in ['ket', 'oper']:
+        return False
+    if not (oper.dims[1] == first.dims[0] and
+            all(isinstance(x, Qobj) and x.type == first.type and
+                x.dims == first.dims for x in states)):
+        return False
+    return (first.type == 'ket' or first.shape[0] <= _batch_max_dim or
+            all(x.storage == 'dense' for x in states))
+
+
+def _batch_qobj_expect(oper, states):
+    """
+    Private function used by expect to calculate the expectation values of a
+    Qobj for a list of states together.
+    """
+    out = np.concatenate([_stack_data_expect(oper, stack)
+                          for stack in _state_stacks(states)])
+    if oper.isherm and (states[0].isket or
+                        all([x.isherm for x in states])):
+        return np.real(out)
+    else:
+        return out
+
+
+def _stack_expect(oper, state):
+    """
+    Private function used by expect to calculate the expectation values of a
+    Qobj for the data of many states stacked in an ndarray.
+    """
+    stack = np.asarray(state, dtype=complex)
+    if stack.ndim == 2:
+        stack = stack[:, :, np.newaxis]
+    if (stack.ndim != 3 or stack.shape[1] != oper.shape[1] or
+            stack.shape[2] not in [1, stack.shape[1]]):
+        raise TypeError('Invalid shape of the stacked states: %s' %
+                        (state.shape,))
+    out = _stack_data_expect(oper, stack)
+    if oper.isherm and (stack.shape[2] == 1 or
+                        not np.any(np.abs(out.imag) > settings.atol)):
+        return np.real(out)
+    else:
+        return out
+
+
+def _stack_data_expect(oper, stack):
+    """
+    Private function calculating the expectation values of an operator for a
+    dense stack of kets, of shape (n, N, 1), or of density matrices, of shape
+    (n, N, N).
+    """
+    data = oper._current_data()
+    if stack.shape[2] == 1:
+        # <psi|op|psi> for all states with a single matrix product
+        psi = stack[:, :, 0]
+        return np.einsum('ij,ij->i', psi.conj(), data.dot(psi.T).T)
+    elif sp.issparse(data):
+        # TR(op*rho) = sum_ij op_ij rho_ji over the nonzeros of op
+        rows = np.repeat(np.arange(data.shape[0]), np.diff(data.indptr))
+        return stack[:, data.indices, rows].dot(data.data)
+    else:
+        return np.einsum('ij,nji->n', data, stack)
+
+
 def _single_eseries_expect(oper, state):
     """
     Private function used by expect to calculate expectation values for
@@ -34,20 +34,27 @@
 __all__ = ['mcsolve']
 
 import os
+import copy
+from abc import ABCMeta, abstractmethod
 from types import FunctionType
 import numpy as np
-from numpy.random import RandomState, random_integers
+from numpy.random import random_integers
 from scipy.integrate import ode
 import scipy.sparse as sp
 from scipy.integrate._ode import zvode
 from scipy.linalg.blas import get_blas_funcs
-from qutip.qobj import Qobj
-from qutip.parallel import parfor, parallel_map, serial_map
-from qutip.cy.spmatfuncs import cy_ode_rhs, cy_expect_psi_csr, spmv, spmv_csr
+from qutip.qobj import Qobj, _dense_to_csr
+from qutip.parallel import (parfor, parallel_map, serial_map, SharedArrays,
+                            _chunk_task, _map_chunks)
+from qutip.cy.spmatfuncs import (cy_ode_rhs, cy_expect_psi_csr, spmv,
+                                 spmv_csr, cy_mc_collapse)
 from qutip.cy.codegen import Codegen
 from qutip.cy.utilities import _cython_build_cleanup
-from qutip.solver import Options, Result, config
-from qutip.rhs_generate import _td_format_check, _td_wrap_array_str
+from qutip.solver import (Options, Result, config, TrajectoryStates,
+                          RaggedArray, _new_seed, _trajectory_rng,
+                          _uniform_pairs)
+from qutip.rhs_generate import (_td_format_check, _td_wrap_array_str,
+                                _td_str_namespace)
 from qutip.settings import debug
 from qutip.ui.progressbar import TextProgressBar, BaseProgressBar
 import qutip.settings
@@ -68,6 +75,27 @@ _cy_col_spmv_call_func = None
 _cy_col_expect_call_func = None
 _cy_rhs_func = None
 
+# compiled list-string coefficients of the collapse operators, for weighting
+# the collapse channels
+_mc_coeff_code = {}
+
+# number of trajectories in the first batch, and minimum number in the
+# following batches, when running to Options.target_tol
+_mc_target_batch = 100
+
+# minimum number of iterations locating a collapse on the dense output of an
+# integrator, before Options.norm_steps
+_mc_dense_steps = 50
+
+# operator data in the solver configuration that is placed in shared memory
+# with Options.shared_memory
+_mc_shared_attrs = ['psi0', 'h_data', 'h_ind', 'h_ptr',
+                    'h_td_data', 'h_td_ind', 'h_td_ptr',
+                    'c_ops_data', 'c_ops_ind', 'c_ops_ptr',
+                    'c_stack_data', 'c_stack_ind', 'c_stack_ptr',
+                    'n_ops_data', 'n_ops_ind', 'n_ops_ptr',
+                    'e_ops_data', 'e_ops_ind', 'e_ops_ptr', 'mc_prop']
+
 
 class qutip_zvode(zvode):
     def step(self, *args):
@@ -130,14 +158,16 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
     H : :class:`qutip.Qobj`
         System Hamiltonian.
 
-    psi0 : :class:`qutip.Qobj`
-        Initial state vector
+    psi0 : :class:`qutip.Qobj` / list
+        Initial state vector, or a list of initial state vectors that share
+        the setup of the problem.
 
     tlist : array_like
         Times at which results are recorded.
 
     ntraj : int
-        Number of trajectories to run.
+        Number of trajectories to run. With ``Options.target_tol``, the
+        maximum number of trajectories.
 
     c_ops : array_like
         single collapse operator or ``list`` or ``array`` of collapse
@@ -167,13 +197,26 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
     Returns
     -------
     results : :class:`qutip.solver.Result`
-        Object storing all results from the simulation.
+        Object storing all results from the simulation. For a list of initial
+        states, a list with one such object per initial state.
+
+    .. note::
+
+        With ``Options.target_tol``, trajectories are run in batches until
+        the standard error of every averaged expectation value is below
+        ``target_tol``. The standard errors are returned in
+        ``results.expect_err``, and the number of trajectories used in
+        ``results.ntraj``.
 
     .. note::
 
         It is possible to reuse the random number seeds from a previous run
         of the mcsolver by passing the output Result object seeds via the
-        Options class, i.e. Options(seeds=prev_result.seeds).
+        Options class, i.e. Options(seeds=prev_result.seeds). The random
+        numbers of each trajectory are derived from this seed and the index
+        of the trajectory, so that a run is reproduced exactly for any number
+        of processes or chunk size, and a larger ntraj extends a previous run
+        with new trajectories.
     """
 
     if debug:
@@ -188,8 +231,20 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
     config.map_func = map_func if map_func is not None else parallel_map
     config.map_kwargs = map_kwargs if map_kwargs is not None else {}
 
-    if not psi0.isket:
-        raise Exception("Initial state must be a state vector.")
+    if isinstance(psi0, list):
+        psi0_list = psi0
+        if len(psi0_list) == 0:
+            return []
+        psi0 = psi0_list[0]
+        for psi in psi0_list:
+            if not psi.isket:
+                raise Exception("Initial state must be a state vector.")
+            if psi.dims != psi0.dims:
+                raise TypeError("All initial states must have the same dims")
+    else:
+        psi0_list = None
+        if not psi0.isket:
+            raise Exception("Initial state must be a state vector.")
 
     if isinstance(c_ops, Qobj):
         c_ops = [c_ops]
@@ -222,11 +277,7 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
             config.map_func = serial_map
 
     # set initial value data
-    if options.tidy:
-        config.psi0 = psi0.tidyup(options.atol).full().ravel()
-    else:
-        config.psi0 = psi0.full().ravel()
-
+    config.psi0 = _mc_psi0_data(psi0, options)
     config.psi0_dims = psi0.dims
     config.psi0_shape = psi0.shape
 
@@ -237,6 +288,8 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
     # set general items
     config.tlist = tlist
     if isinstance(ntraj, (list, np.ndarray)):
+        if options.target_tol is not None:
+            raise TypeError("Options.target_tol requires an integer ntraj.")
         config.ntraj = np.sort(ntraj)[-1]
     else:
         config.ntraj = ntraj
@@ -285,33 +338,138 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
         # function based
         elif config.tflag in [2, 3, 20, 22]:
             config.h_func_args = args
+        config.c_coeff_args = args
+
+    # precompute the no-jump propagators, shared by all trajectories
+    if options.mc_integrator == 'propagator':
+        _mc_prop_config(config)
+
+    if psi0_list is None:
+        output = _mc_solve(config, ntraj, e_ops, e_ops_dict)
+    elif config.c_num:
+        # the setup of the problem is shared by all initial states
+        seeds = options.seeds
+        max_ntraj = config.ntraj
+        output = []
+        for psi in psi0_list:
+            config.psi0 = _mc_psi0_data(psi, options)
+            config.ntraj = max_ntraj
+            options.seeds = seeds
+            output.append(_mc_solve(config, ntraj, e_ops, e_ops_dict))
+    else:
+        output = _mc_solve_batch(config, psi0_list, ntraj, e_ops, e_ops_dict)
+
+    # Remove RHS cython file if necessary
+    if not options.rhs_reuse and config.tdname:
+        _cython_build_cleanup(config.tdname)
+
+    return output
+
+
+def _mc_psi0_data(psi0, options):
+    """
+    Data of an initial state vector, as a dense array.
+    """
+    if options.tidy:
+        return psi0.tidyup(options.atol).full().ravel()
+    else:
+        return psi0.full().ravel()
+
+
+def _mc_shared_run(config, func):
+    """
+    Calls func, with the operator data in shared memory if requested with
+    Options.shared_memory.
+    """
+    if config.options.shared_memory and config.map_func is not serial_map:
+        # the workers attach to the operator data instead of copying it
+        with SharedArrays() as shared:
+            shared.share_attrs(config, _mc_shared_attrs)
+            return func()
+    return func()
+
 
+def _mc_solve(config, ntraj, e_ops, e_ops_dict):
+    """
+    Runs the trajectories for the initial state in config, and returns the
+    Result.
+    """
     # load monte carlo class
-    mc = _MC(config)
+    mc = _MC(config, ntraj)
 
     # Run the simulation
-    mc.run()
+    _mc_shared_run(config, mc.run)
 
-    # Remove RHS cython file if necessary
-    if not options.rhs_reuse and config.tdname:
-        _cython_build_cleanup(config.tdname)
+    return _mc_output(config, mc, ntraj, e_ops, e_ops_dict)
+
+
+def _mc_solve_batch(config, psi0_list, ntraj, e_ops, e_ops_dict):
+    """
+    Evolves a list of initial states without collapse operators, one initial
+    state per task of the map function, and returns the list of Results.
+    """
+    map_kwargs = {'progress_bar': config.progress_bar,
+                  'num_cpus': config.options.num_cpus,
+                  'shared_args': True}
+    map_kwargs.update(config.map_kwargs)
+    psi0_data = [_mc_psi0_data(psi, config.options) for psi in psi0_list]
+
+    results = _mc_shared_run(
+        config, lambda: config.map_func(_mc_no_collapse_evolve, psi0_data,
+                                        (config,), {}, **map_kwargs))
+
+    config.ntraj = 1
+    outputs = []
+    for expect_out, psi_out in results:
+        mc = _MC(config, ntraj)
+        mc.expect_out = expect_out
+        mc.psi_out = psi_out
+        outputs.append(_mc_output(config, mc, ntraj, e_ops, e_ops_dict))
+    return outputs
+
+
+def _mc_no_collapse_evolve(psi0, config):
+    """
+    Evolution of a single initial state without collapse operators, for
+    _mc_solve_batch.
+    """
+    config = copy.copy(config)
+    config.psi0 = psi0
+    if config.e_num == 0 or config.options.store_states:
+        return _evolve_no_collapse_psi_out(config)
+    else:
+        return _evolve_no_collapse_expect_out(config), None
 
-    # AFTER MCSOLVER IS DONE
-    # ----------------------
 
-    # Store results in the Result object
+def _mc_output(config, mc, ntraj, e_ops, e_ops_dict):
+    """
+    Result of the trajectories run by mc.
+    """
     output = Result()
     output.solver = 'mcsolve'
     output.seeds = config.options.seeds
     # state vectors
-    if (mc.psi_out is not None and config.options.average_states
+    if mc.average is not None:
+        output.states = mc.average.states()
+    elif _mc_compact_states(config):
+        output.states = TrajectoryStates(mc.psi_out, config.psi0_dims)
+    elif (mc.psi_out is not None and config.options.average_states
             and config.cflag and ntraj != 1):
         output.states = parfor(_mc_dm_avg, mc.psi_out.T)
     elif mc.psi_out is not None:
         output.states = mc.psi_out
 
     # expectation values
-    if (mc.expect_out is not None and config.cflag
+    if mc.average is not None:
+        # running averages merged while the trajectories completed
+        if isinstance(ntraj, (list, np.ndarray)):
+            output.expect = [mc.average.snapshots[num][0] for num in ntraj]
+            output.expect_err = [mc.average.snapshots[num][1]
+                                 for num in ntraj]
+        else:
+            output.expect = mc.average.expect()
+            output.expect_err = mc.average.expect_err()
+    elif (mc.expect_out is not None and config.cflag
             and config.options.average_expect):
         # averaging if multiple trajectories
         if isinstance(ntraj, int):
@@ -345,8 +503,16 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
     output.num_expect = config.e_num
     output.num_collapse = config.c_num
     output.ntraj = config.ntraj
-    output.col_times = mc.collapse_times_out
-    output.col_which = mc.which_op_out
+    if mc.average is not None:
+        output.col_times = mc.average.collapse_times
+        output.col_which = mc.average.which_oper
+    else:
+        output.col_times = mc.collapse_times_out
+        output.col_which = mc.which_op_out
+    if (config.options.compact_states and
+            output.col_times is not None and config.c_num):
+        output.col_times = RaggedArray.from_list(output.col_times)
+        output.col_which = RaggedArray.from_list(output.col_which, dtype=int)
 
     if e_ops_dict:
         output.expect = {e: output.expect[n]
@@ -363,7 +529,7 @@ class _MC():
     Private class for solving Monte Carlo evolution from mcsolve
     """
 
-    def __init__(self, config):
+    def __init__(self, config, ntraj=None):
 
         self.config = config
         # set output variables, even if they are not used to simplify output
@@ -372,23 +538,33 @@ class _MC():
         self.expect_out = []
         self.collapse_times_out = None
         self.which_op_out = None
+        self.average = None
+        # run time of a single trajectory, measured on the first one
+        self.traj_time = None
 
         # FOR EVOLUTION WITH COLLAPSE OPERATORS
-        if config.c_num:
+        if config.c_num and _mc_streaming(config):
+            # only the running sums over the trajectories are kept
+            self.average = _MCAverage(
+                config, ntraj if ntraj is not None else config.ntraj)
+        elif config.c_num:
             # preallocate ntraj arrays for state vectors, collapse times, and
             # which operator
             self.collapse_times_out = np.zeros(config.ntraj, dtype=np.ndarray)
             self.which_op_out = np.zeros(config.ntraj, dtype=np.ndarray)
-            if config.e_num == 0 or config.options.store_states:
+            if _mc_compact_states(config):
+                self.psi_out = _mc_states_array(config)
+            elif config.e_num == 0 or config.options.store_states:
                 self.psi_out = [None] * config.ntraj
             if config.e_num > 0:
                 self.expect_out = [None] * config.ntraj
 
-            # setup seeds array
+        if config.c_num:
+            # setup seeds
             if self.config.options.seeds is None:
-                self.config.options.seeds = \
-                    random_integers(1e8, size=config.ntraj)
-            else:
+                # root seed of the streams of all trajectories
+                self.config.options.seeds = _new_seed()
+            elif np.ndim(self.config.options.seeds) > 0:
                 # if ntraj was reduced but reusing seeds
                 seed_length = len(config.options.seeds)
                 if seed_length > config.ntraj:
@@ -414,20 +590,9 @@ class _MC():
             else:
                 self.expect_out = _evolve_no_collapse_expect_out(self.config)
 
-        else:
-            # set arguments for input to monte carlo
-            map_kwargs = {'progress_bar': self.config.progress_bar,
-                          'num_cpus': self.config.options.num_cpus}
-            map_kwargs.update(self.config.map_kwargs)
-
-            task_args = (self.config, self.config.options,
-                         self.config.options.seeds)
-            task_kwargs = {}
-
-            results = config.map_func(_mc_alg_evolve,
-                                      list(range(config.ntraj)),
-                                      task_args, task_kwargs,
-                                      **map_kwargs)
+        elif self.average is None:
+            results = self._run_trajectories(_mc_alg_chunk,
+                                             np.arange(config.ntraj))
 
             for n, result in enumerate(results):
                 state_out, expect_out, collapse_times, which_oper = result
@@ -441,7 +606,298 @@ class _MC():
                 self.collapse_times_out[n] = collapse_times
                 self.which_op_out[n] = which_oper
 
-            self.psi_out = np.asarray(self.psi_out, dtype=object)
+            if not _mc_compact_states(self.config):
+                self.psi_out = np.asarray(self.psi_out, dtype=object)
+
+        elif self.config.options.target_tol is None:
+            self._run_trajectories(_mc_alg_chunk_sum, np.arange(config.ntraj))
+
+        else:
+            # launch batches of trajectories until the standard error of all
+            # expectation values is below target_tol, or ntraj is reached
+            if not self.config.e_num:
+                raise ValueError("Options.target_tol requires expectation "
+                                 "value operators in e_ops.")
+            tol = self.config.options.target_tol
+            ntraj = self.config.ntraj
+            batch = min(_mc_target_batch, ntraj)
+            num = 0
+            while True:
+                self._run_trajectories(_mc_alg_chunk_sum,
+                                       np.arange(num, num + batch))
+                num += batch
+                err = max(np.max(e) for e in self.average.expect_err())
+                if num >= ntraj or err <= tol:
+                    break
+                # the standard error decreases as 1/sqrt(ntraj)
+                num_needed = int(np.ceil(1.1 * num * (err / tol) ** 2))
+                batch = min(max(num_needed - num, _mc_target_batch),
+                            ntraj - num)
+
+            self.config.ntraj = num
+            if np.ndim(self.config.options.seeds) > 0:
+                self.config.options.seeds = self.config.options.seeds[:num]
+
+    def _run_trajectories(self, task, trajs):
+        """
+        Runs the trajectories with the given indices in chunks through the
+        map function. Returns the list of trajectory results, or merges the
+        trajectory sums into the running average in streaming mode.
+        """
+        # set arguments for input to monte carlo. the problem data is sent to
+        # each worker once, and the trajectories in chunks.
+        map_kwargs = {'num_cpus': self.config.options.num_cpus}
+        map_kwargs.update(self.config.map_kwargs)
+
+        task_args = (self.config, self.config.options,
+                     self.config.options.seeds)
+
+        if self.average is None:
+            parts, self.traj_time = _map_chunks(
+                task, trajs, task_args, self.config.map_func, map_kwargs,
+                num_cpus=map_kwargs['num_cpus'],
+                chunk_size=self.config.options.chunk_size,
+                task_time=self.traj_time,
+                progress_bar=self.config.progress_bar)
+            return [result for part in parts for result in part]
+
+        # merge the trajectory sums as they arrive, without averaging over
+        # the list of numbers of trajectories ntraj in a chunk
+        offset = self.average.next_part
+
+        def _reduce(n, result):
+            self.average.add(n + offset, result)
+
+        _, self.traj_time = _map_chunks(
+            task, trajs, task_args, self.config.map_func, map_kwargs,
+            num_cpus=map_kwargs['num_cpus'],
+            chunk_size=self.config.options.chunk_size,
+            task_time=self.traj_time,
+            boundaries=self.average.snapshot_ntraj, reduce_func=_reduce,
+            progress_bar=self.config.progress_bar)
+        return []
+
+
+def _mc_compact_states(config):
+    """
+    Whether the state vectors of the trajectories are stored in a single
+    array.
+    """
+    return (config.options.compact_states and
+            (config.e_num == 0 or config.options.store_states) and
+            not config.options.average_states and
+            not config.options.steady_state_average and
+            not _mc_streaming(config))
+
+
+def _mc_states_array(config):
+    """
+    Array for the state vectors of all trajectories at all times, memory-
+    mapped to Options.states_file if given.
+    """
+    shape = (config.ntraj, len(config.tlist), len(config.psi0))
+    if config.options.states_file:
+        return np.memmap(config.options.states_file, dtype=complex,
+                         mode='w+', shape=shape)
+    return np.zeros(shape, dtype=complex)
+
+
+def _mc_streaming(config):
+    """
+    Whether the trajectories are reduced to running averages as they
+    complete.
+    """
+    return ((config.options.stream_average or
+             config.options.target_tol is not None) and
+            config.options.average_expect)
+
+
+class _MCAverage():
+    """
+    Private class that merges the trajectory sums returned by _mc_sums into
+    running averages. The sums are added as soon as they arrive, so that the
+    memory use does not grow with the number of trajectories or chunks. Only
+    what depends on the trajectory order, the collapse times and the
+    expectation values after the numbers of trajectories in a list ntraj, is
+    merged in trajectory order.
+    """
+
+    def __init__(self, config, ntraj):
+
+        self.config = config
+        self.num = 0        # number of merged trajectories
+        self.next_part = 0  # index of the next part to merge in order
+        self.pending = {}   # ordered data of parts that arrived ahead
+        self.expect_sum = [np.zeros(len(config.tlist),
+                                    dtype=float if config.e_ops_isherm[jj]
+                                    else complex)
+                           for jj in range(config.e_num)]
+        self.expect_sum2 = [np.zeros(len(config.tlist), dtype=float)
+                            for jj in range(config.e_num)]
+        self.states_sum = None
+
+        # averages of the expectation values after the numbers of
+        # trajectories in a list ntraj
+        if isinstance(ntraj, (list, np.ndarray)):
+            self.snapshot_ntraj = set(int(num) for num in ntraj)
+        else:
+            self.snapshot_ntraj = set()
+        self.snapshots = {}
+        self.ordered_num = 0
+        self.ordered_sum = [np.zeros_like(e) for e in self.expect_sum]
+        self.ordered_sum2 = [np.zeros_like(e) for e in self.expect_sum2]
+
+        if config.options.store_trajectories:
+            self.collapse_times = []
+            self.which_oper = []
+        else:
+            self.collapse_times = None
+            self.which_oper = None
+
+    def add(self, n, sums):
+        """
+        Add the sums of part n, and merge the ordered data of all parts that
+        are now in order.
+        """
+        num, expect_sum, expect_sum2, states_sum, col_times, col_which = sums
+
+        for jj in range(self.config.e_num):
+            self.expect_sum[jj] += expect_sum[jj]
+            self.expect_sum2[jj] += expect_sum2[jj]
+        if states_sum is not None:
+            if self.states_sum is None:
+                self.states_sum = states_sum
+            else:
+                self.states_sum += states_sum
+        self.num += num
+
+        if not self.snapshot_ntraj:
+            expect_sum = expect_sum2 = None
+        self.pending[n] = (num, expect_sum, expect_sum2, col_times, col_which)
+        while self.next_part in self.pending:
+            self._merge_ordered(self.pending.pop(self.next_part))
+            self.next_part += 1
+
+    def _merge_ordered(self, part):
+        num, expect_sum, expect_sum2, col_times, col_which = part
+
+        self.ordered_num += num
+        if self.collapse_times is not None:
+            self.collapse_times += col_times
+            self.which_oper += col_which
+
+        if expect_sum is not None:
+            for jj in range(self.config.e_num):
+                self.ordered_sum[jj] += expect_sum[jj]
+                self.ordered_sum2[jj] += expect_sum2[jj]
+            if self.ordered_num in self.snapshot_ntraj:
+                self.snapshots[self.ordered_num] = (
+                    _mc_expect_avg(self.ordered_num, self.ordered_sum),
+                    _mc_expect_err(self.ordered_num, self.ordered_sum,
+                                   self.ordered_sum2, self.config.tlist))
+
+    def expect(self):
+        """
+        Averaged expectation values.
+        """
+        return _mc_expect_avg(self.num, self.expect_sum)
+
+    def expect_err(self):
+        """
+        Standard error of the averaged expectation values.
+        """
+        return _mc_expect_err(self.num, self.expect_sum, self.expect_sum2,
+                              self.config.tlist)
+
+    def states(self):
+        """
+        Averaged density matrices.
+        """
+        if self.states_sum is None:
+            return []
+        dims = [self.config.psi0_dims[0], self.config.psi0_dims[0]]
+        return [Qobj(rho / self.num, dims=dims, isherm=True)
+                for rho in self.states_sum]
+
+
+def _mc_expect_avg(num, expect_sum):
+    """
+    Averages of the expectation values from their sums over num trajectories.
+    """
+    return [e / num for e in expect_sum]
+
+
+def _mc_expect_err(num, expect_sum, expect_sum2, tlist):
+    """
+    Standard errors of the averaged expectation values from the sums of the
+    expectation values and their absolute squares over num trajectories.
+    """
+    if num < 2:
+        return [np.inf * np.ones(len(tlist)) for e in expect_sum]
+    return [np.sqrt(np.maximum(e2 / num - np.abs(e / num) ** 2, 0) /
+                    (num - 1))
+            for e, e2 in zip(expect_sum, expect_sum2)]
+
+
+def _mc_sums(config, results):
+    """
+    Sums of the expectation values, their absolute squares and the density
+    matrices over the given trajectory results from _mc_alg_evolve, in the
+    form merged by _MCAverage.
+    """
+    num_times = len(config.tlist)
+    # the density matrices are only summed when they are averaged
+    store_states = ((config.e_num == 0 or config.options.store_states) and
+                    config.options.average_states)
+
+    num = 0
+    expect_sum = [np.zeros(num_times, dtype=float if config.e_ops_isherm[jj]
+                           else complex)
+                  for jj in range(config.e_num)]
+    expect_sum2 = [np.zeros(num_times, dtype=float)
+                   for jj in range(config.e_num)]
+    states_sum = None
+    col_times = []
+    col_which = []
+
+    for state_out, expect_out, collapse_times, which_oper in results:
+        num += 1
+        for jj in range(config.e_num):
+            expect_sum[jj] += expect_out[jj]
+            expect_sum2[jj] += np.abs(expect_out[jj]) ** 2
+
+        if store_states:
+            if states_sum is None:
+                states_sum = np.zeros((len(state_out), config.psi0.shape[0],
+                                       config.psi0.shape[0]), dtype=complex)
+            for k, state in enumerate(state_out):
+                if state.isket:
+                    psi = state.full().ravel()
+                    states_sum[k] += np.outer(psi, psi.conj())
+                else:
+                    states_sum[k] += state.full()
+
+        if config.options.store_trajectories:
+            col_times.append(collapse_times)
+            col_which.append(which_oper)
+
+    return num, expect_sum, expect_sum2, states_sum, col_times, col_which
+
+
+def _mc_alg_chunk(chunk, config, opt, seeds):
+    """
+    Monte Carlo algorithm returning the results of a chunk of trajectories.
+    """
+    return _chunk_task(chunk, _mc_alg_evolve, config, opt, seeds)
+
+
+def _mc_alg_chunk_sum(chunk, config, opt, seeds):
+    """
+    Monte Carlo algorithm returning the contribution of a chunk of
+    trajectories to the running sums of the streaming average.
+    """
+    return _mc_sums(config, (_mc_alg_evolve(nt, config, opt, seeds)
+                             for nt in chunk))
 
 
 # -----------------------------------------------------------------------------
@@ -574,51 +1030,18 @@ def _evolve_no_collapse_psi_out(config):
         _mc_func_load(config)
 
     opt = config.options
-    if config.tflag in [1, 10, 11]:
-        ODE = ode(_cy_rhs_func)
-        code = compile('ODE.set_f_params(' + config.string + ')',
-                       '<string>', 'exec')
-        exec(code)
-    elif config.tflag == 2:
-        ODE = ode(_cRHStd)
-        ODE.set_f_params(config)
-    elif config.tflag in [20, 22]:
-        if config.options.rhs_with_state:
-            ODE = ode(_tdRHStd_with_state)
-        else:
-            ODE = ode(_tdRHStd)
-        ODE.set_f_params(config)
-    elif config.tflag == 3:
-        if config.options.rhs_with_state:
-            ODE = ode(_pyRHSc_with_state)
-        else:
-            ODE = ode(_pyRHSc)
-        ODE.set_f_params(config)
-    else:
-        ODE = ode(cy_ode_rhs)
-        ODE.set_f_params(config.h_data, config.h_ind, config.h_ptr)
-
-    # initialize ODE solver for RHS
-    ODE.set_integrator('zvode', method=opt.method, order=opt.order,
-                       atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
-                       first_step=opt.first_step, min_step=opt.min_step,
-                       max_step=opt.max_step)
-    # set initial conditions
-    ODE.set_initial_value(config.psi0, config.tlist[0])
-    psi_out[0] = Qobj(config.psi0, config.psi0_dims,
-                      config.psi0_shape)
+    integ = _mc_integrator(config, opt, config.psi0, config.tlist[0],
+                           config.tlist[-1])
+    psi_out[0] = Qobj.from_csr(config.psi0, dims=config.psi0_dims, copy=True)
     for k in range(1, num_times):
-        ODE.integrate(config.tlist[k], step=0)  # integrate up to tlist[k]
-        if ODE.successful():
-            state = ODE.y / dznrm2(ODE.y)
-            psi_out[k] = Qobj(state, config.psi0_dims, config.psi0_shape)
-            for jj in range(config.e_num):
-                expect_out[jj][k] = cy_expect_psi_csr(
-                    config.e_ops_data[jj], config.e_ops_ind[jj],
-                    config.e_ops_ptr[jj], state,
-                    config.e_ops_isherm[jj])
-        else:
-            raise ValueError('Error in ODE solver')
+        integ.integrate(config.tlist[k])  # integrate up to tlist[k]
+        state = integ.y / dznrm2(integ.y)
+        psi_out[k] = Qobj.from_csr(state, dims=config.psi0_dims)
+        for jj in range(config.e_num):
+            expect_out[jj][k] = cy_expect_psi_csr(
+                config.e_ops_data[jj], config.e_ops_ind[jj],
+                config.e_ops_ptr[jj], state,
+                config.e_ops_isherm[jj])
 
     return expect_out, psi_out
 
@@ -660,35 +1083,8 @@ def _evolve_no_collapse_expect_out(config):
         _mc_func_load(config)
 
     opt = config.options
-    if config.tflag in [1, 10, 11]:
-        ODE = ode(_cy_rhs_func)
-        code = compile('ODE.set_f_params(' + config.string + ')',
-                       '<string>', 'exec')
-        exec(code)
-    elif config.tflag == 2:
-        ODE = ode(_cRHStd)
-        ODE.set_f_params(config)
-    elif config.tflag in [20, 22]:
-        if config.options.rhs_with_state:
-            ODE = ode(_tdRHStd_with_state)
-        else:
-            ODE = ode(_tdRHStd)
-        ODE.set_f_params(config)
-    elif config.tflag == 3:
-        if config.options.rhs_with_state:
-            ODE = ode(_pyRHSc_with_state)
-        else:
-            ODE = ode(_pyRHSc)
-        ODE.set_f_params(config)
-    else:
-        ODE = ode(cy_ode_rhs)
-        ODE.set_f_params(config.h_data, config.h_ind, config.h_ptr)
-
-    ODE.set_integrator('zvode', method=opt.method, order=opt.order,
-                       atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
-                       first_step=opt.first_step, min_step=opt.min_step,
-                       max_step=opt.max_step)
-    ODE.set_initial_value(config.psi0, config.tlist[0])
+    integ = _mc_integrator(config, opt, config.psi0, config.tlist[0],
+                           config.tlist[-1])
     for jj in range(config.e_num):
         expect_out[jj][0] = cy_expect_psi_csr(
             config.e_ops_data[jj], config.e_ops_ind[jj],
@@ -696,16 +1092,13 @@ def _evolve_no_collapse_expect_out(config):
             config.e_ops_isherm[jj])
 
     for k in range(1, num_times):
-        ODE.integrate(config.tlist[k], step=0)  # integrate up to tlist[k]
-        if ODE.successful():
-            state = ODE.y / dznrm2(ODE.y)
-            for jj in range(config.e_num):
-                expect_out[jj][k] = cy_expect_psi_csr(
-                    config.e_ops_data[jj], config.e_ops_ind[jj],
-                    config.e_ops_ptr[jj], state,
-                    config.e_ops_isherm[jj])
-        else:
-            raise ValueError('Error in ODE solver')
+        integ.integrate(config.tlist[k])  # integrate up to tlist[k]
+        state = integ.y / dznrm2(integ.y)
+        for jj in range(config.e_num):
+            expect_out[jj][k] = cy_expect_psi_csr(
+                config.e_ops_data[jj], config.e_ops_ind[jj],
+                config.e_ops_ptr[jj], state,
+                config.e_ops_isherm[jj])
 
     return expect_out
 
@@ -729,8 +1122,12 @@ def _mc_alg_evolve(nt, config, opt, seeds):
     if not _cy_rhs_func:
         _mc_func_load(config)
 
+    compact = _mc_compact_states(config)
     if config.options.steady_state_average:
         states_out = np.zeros((1), dtype=object)
+    elif compact:
+        # state vectors as the rows of one array
+        states_out = np.zeros((num_times, len(config.psi0)), dtype=complex)
     else:
         states_out = np.zeros((num_times), dtype=object)
 
@@ -740,17 +1137,17 @@ def _mc_alg_evolve(nt, config, opt, seeds):
     if (config.options.average_states and
             not config.options.steady_state_average):
         # output is averaged states, so use dm
-        states_out[0] = Qobj(temp*temp.conj().transpose(),
-                             [config.psi0_dims[0],
-                              config.psi0_dims[0]],
-                             [config.psi0_shape[0],
-                              config.psi0_shape[0]],
-                             fast='mc-dm')
+        states_out[0] = Qobj.from_csr(temp * temp.conj().transpose(),
+                                      dims=[config.psi0_dims[0],
+                                            config.psi0_dims[0]],
+                                      isherm=True)
+    elif compact:
+        states_out[0] = config.psi0
     elif (not config.options.average_states and
           not config.options.steady_state_average):
         # output is not averaged, so write state vectors
-        states_out[0] = Qobj(temp, config.psi0_dims,
-                             config.psi0_shape, fast='mc')
+        states_out[0] = Qobj.from_csr(temp, dims=config.psi0_dims,
+                                      isherm=False)
     elif config.options.steady_state_average:
         states_out[0] = temp * temp.conj().transpose()
 
@@ -775,191 +1172,74 @@ def _mc_alg_evolve(nt, config, opt, seeds):
     which_oper = []
 
     # SEED AND RNG AND GENERATE
-    prng = RandomState(seeds[nt])
+    rand_pairs = _uniform_pairs(_trajectory_rng(seeds, nt))
     # first rand is collapse norm, second is which operator
-    rand_vals = prng.rand(2)
-
-    # CREATE ODE OBJECT CORRESPONDING TO DESIRED TIME-DEPENDENCE
-    if config.tflag in [1, 10, 11]:
-        ODE = ode(_cy_rhs_func)
-        code = compile('ODE.set_f_params(' + config.string + ')',
-                       '<string>', 'exec')
-        exec(code)
-    elif config.tflag == 2:
-        ODE = ode(_cRHStd)
-        ODE.set_f_params(config)
-    elif config.tflag in [20, 22]:
-        if config.options.rhs_with_state:
-            ODE = ode(_tdRHStd_with_state)
-        else:
-            ODE = ode(_tdRHStd)
-        ODE.set_f_params(config)
-    elif config.tflag == 3:
-        if config.options.rhs_with_state:
-            ODE = ode(_pyRHSc_with_state)
-        else:
-            ODE = ode(_pyRHSc)
-        ODE.set_f_params(config)
-    else:
-        ODE = ode(_cy_rhs_func)
-        ODE.set_f_params(config.h_data, config.h_ind,
-                         config.h_ptr)
+    rand_vals = next(rand_pairs)
 
-    # initialize ODE solver for RHS
-    ODE._integrator = qutip_zvode(
-        method=opt.method, order=opt.order, atol=opt.atol,
-        rtol=opt.rtol, nsteps=opt.nsteps, first_step=opt.first_step,
-        min_step=opt.min_step, max_step=opt.max_step)
-
-    if not len(ODE._y):
-        ODE.t = 0.0
-        ODE._y = np.array([0.0], complex)
-    ODE._integrator.reset(len(ODE._y), ODE.jac is not None)
-
-    # set initial conditions
-    ODE.set_initial_value(config.psi0, tlist[0])
-
-    # make array for collapse operator inds
-    cinds = np.arange(config.c_num)
+    # CREATE INTEGRATOR CORRESPONDING TO DESIRED TIME-DEPENDENCE
+    integ = _mc_integrator(config, opt, config.psi0, tlist[0], tlist[-1])
 
     # RUN ODE UNTIL EACH TIME IN TLIST
     for k in range(1, num_times):
         # ODE WHILE LOOP FOR INTEGRATE UP TO TIME TLIST[k]
-        while ODE.t < tlist[k]:
-            t_prev = ODE.t
-            y_prev = ODE.y
-            norm2_prev = dznrm2(ODE._y) ** 2
+        while integ.t < tlist[k]:
+            t_prev = integ.t
+            y_prev = integ.y
+            norm2_prev = dznrm2(y_prev) ** 2
             # integrate up to tlist[k], one step at a time.
-            ODE.integrate(tlist[k], step=1)
-            if not ODE.successful():
-                raise Exception("ZVODE failed!")
-            norm2_psi = dznrm2(ODE._y) ** 2
+            integ.step(tlist[k])
+            norm2_psi = dznrm2(integ.y) ** 2
             if norm2_psi <= rand_vals[0]:
                 # collapse has occured:
                 # find collapse time to within specified tolerance
                 # ------------------------------------------------
-                ii = 0
-                t_final = ODE.t
-                while ii < config.norm_steps:
-                    ii += 1
-                    t_guess = t_prev + \
-                        np.log(norm2_prev / rand_vals[0]) / \
-                        np.log(norm2_prev / norm2_psi) * (t_final - t_prev)
-                    ODE._y = y_prev
-                    ODE.t = t_prev
-                    ODE._integrator.call_args[3] = 1
-                    ODE.integrate(t_guess, step=0)
-                    if not ODE.successful():
-                        raise Exception(
-                            "ZVODE failed after adjusting step size!")
-                    norm2_guess = dznrm2(ODE._y)**2
-                    if (np.abs(rand_vals[0] - norm2_guess) <
-                            config.norm_tol * rand_vals[0]):
-                        break
-                    elif (norm2_guess < rand_vals[0]):
-                        # t_guess is still > t_jump
-                        t_final = t_guess
-                        norm2_psi = norm2_guess
-                    else:
-                        # t_guess < t_jump
-                        t_prev = t_guess
-                        y_prev = ODE.y
-                        norm2_prev = norm2_guess
-                if ii > config.norm_steps:
-                    raise Exception("Norm tolerance not reached. " +
-                                    "Increase accuracy of ODE solver or " +
-                                    "Options.norm_steps.")
-
-                collapse_times.append(ODE.t)
-
-                # some string based collapse operators
-                if config.tflag in [1, 11]:
-                    n_dp = [cy_expect_psi_csr(config.n_ops_data[i],
-                                              config.n_ops_ind[i],
-                                              config.n_ops_ptr[i],
-                                              ODE._y, 1)
-                            for i in config.c_const_inds]
-
-                    _locals = locals()
-                    # calculates the expectation values for time-dependent
-                    # norm collapse operators
-                    exec(_cy_col_expect_call_func, globals(), _locals)
-                    n_dp = np.array(_locals['n_dp'])
-
-                elif config.tflag in [2, 20, 22]:
-                    # some Python function based collapse operators
-                    n_dp = [cy_expect_psi_csr(config.n_ops_data[i],
-                                              config.n_ops_ind[i],
-                                              config.n_ops_ptr[i],
-                                              ODE._y, 1)
-                            for i in config.c_const_inds]
-                    n_dp += [abs(config.c_funcs[i](
-                                 ODE.t, config.c_func_args)) ** 2 *
-                             cy_expect_psi_csr(config.n_ops_data[i],
-                                               config.n_ops_ind[i],
-                                               config.n_ops_ptr[i],
-                                               ODE._y, 1)
-                             for i in config.c_td_inds]
-                    n_dp = np.array(n_dp)
+                if integ.dense_output:
+                    t_jump, y_jump = _mc_dense_jump(
+                        integ, t_prev, y_prev, norm2_prev, integ.t, integ.y,
+                        norm2_psi, rand_vals[0], config.norm_tol,
+                        config.norm_steps)
+                    integ.set_state(t_jump, y_jump)
                 else:
-                    # all constant collapse operators.
-                    n_dp = np.array(
-                        [cy_expect_psi_csr(config.n_ops_data[i],
-                                           config.n_ops_ind[i],
-                                           config.n_ops_ptr[i],
-                                           ODE._y, 1)
-                         for i in range(config.c_num)])
-
-                # determine which operator does collapse and store it
-                kk = np.cumsum(n_dp / np.sum(n_dp))
-                j = cinds[kk >= rand_vals[1]][0]
+                    _mc_integrate_to_jump(integ, t_prev, y_prev, norm2_prev,
+                                          norm2_psi, rand_vals[0], config)
+
+                collapse_times.append(integ.t)
+
+                # select the collapse channel and apply it, evaluating all
+                # collapse probabilities in one pass
+                j, state = cy_mc_collapse(config.c_stack_data,
+                                          config.c_stack_ind,
+                                          config.c_stack_ptr, integ.y,
+                                          _mc_col_weights(config, integ.t),
+                                          rand_vals[1])
                 which_oper.append(j)
-                if j in config.c_const_inds:
-                    state = spmv_csr(config.c_ops_data[j],
-                                     config.c_ops_ind[j],
-                                     config.c_ops_ptr[j], ODE._y)
-                else:
-                    if config.tflag in [1, 11]:
-                        _locals = locals()
-                        # calculates the state vector for collapse by a
-                        # time-dependent collapse operator
-                        exec(_cy_col_spmv_call_func, globals(), _locals)
-                        state = _locals['state']
-                    else:
-                        state = \
-                            config.c_funcs[j](ODE.t,
-                                              config.c_func_args) * \
-                            spmv_csr(config.c_ops_data[j],
-                                     config.c_ops_ind[j],
-                                     config.c_ops_ptr[j], ODE._y)
-                state = state / dznrm2(state)
-                ODE._y = state
-                ODE._integrator.call_args[3] = 1
-                rand_vals = prng.rand(2)
+                integ.set_state(integ.t, state)
+                rand_vals = next(rand_pairs)
 
         # after while loop
         # ----------------
-        out_psi = ODE._y / dznrm2(ODE._y)
+        out_psi = integ.y / dznrm2(integ.y)
         if config.e_num == 0 or config.options.store_states:
-            out_psi_csr = sp.csr_matrix(np.reshape(out_psi,
-                                                   (out_psi.shape[0], 1)),
-                                        dtype=complex)
             if (config.options.average_states and
                     not config.options.steady_state_average):
-                states_out[k] = Qobj(
+                out_psi_csr = _dense_to_csr(out_psi)
+                states_out[k] = Qobj.from_csr(
                     out_psi_csr * out_psi_csr.conj().transpose(),
-                    [config.psi0_dims[0], config.psi0_dims[0]],
-                    [config.psi0_shape[0], config.psi0_shape[0]],
-                    fast='mc-dm')
+                    dims=[config.psi0_dims[0], config.psi0_dims[0]],
+                    isherm=True)
 
             elif config.options.steady_state_average:
+                out_psi_csr = _dense_to_csr(out_psi)
                 states_out[0] = (
                     states_out[0] +
                     (out_psi_csr * out_psi_csr.conj().transpose()))
 
+            elif compact:
+                states_out[k] = out_psi
+
             else:
-                states_out[k] = Qobj(out_psi_csr, config.psi0_dims,
-                                     config.psi0_shape, fast='mc')
+                states_out[k] = Qobj.from_csr(out_psi, dims=config.psi0_dims,
+                                              isherm=False)
 
         for jj in range(config.e_num):
             expect_out[jj][k] = cy_expect_psi_csr(
@@ -970,18 +1250,393 @@ def _mc_alg_evolve(nt, config, opt, seeds):
     # Run at end of mc_alg function
     # -----------------------------
     if config.options.steady_state_average:
-        states_out = np.array([Qobj(states_out[0] / float(len(tlist)),
-                              [config.psi0_dims[0],
-                               config.psi0_dims[0]],
-                              [config.psi0_shape[0],
-                               config.psi0_shape[0]],
-                              fast='mc-dm')])
+        states_out = np.array([Qobj.from_csr(
+            states_out[0] / float(len(tlist)),
+            dims=[config.psi0_dims[0], config.psi0_dims[0]],
+            isherm=True)])
 
     return (states_out, expect_out,
             np.array(collapse_times, dtype=float),
             np.array(which_oper, dtype=int))
 
 
+def _mc_integrate_to_jump(integ, t_prev, y_prev, norm2_prev, norm2_psi,
+                          rand, config):
+    """
+    Integrates from the start of the step in which the norm of the state
+    dropped below rand, to the time of the collapse within config.norm_tol,
+    for integrators without dense output.
+    """
+    ii = 0
+    t_final = integ.t
+    # first guess from the norm and its derivative at both ends of the step,
+    # without integrating
+    t_guess = _mc_jump_time(integ, t_prev, y_prev, norm2_prev,
+                            t_final, integ.y, norm2_psi, rand)
+    while ii < config.norm_steps:
+        ii += 1
+        if ii > 1:
+            t_guess = t_prev + \
+                np.log(norm2_prev / rand) / \
+                np.log(norm2_prev / norm2_psi) * (t_final - t_prev)
+        integ.set_state(t_prev, y_prev)
+        integ.integrate(t_guess)
+        norm2_guess = dznrm2(integ.y) ** 2
+        if (np.abs(rand - norm2_guess) < config.norm_tol * rand):
+            break
+        elif (norm2_guess < rand):
+            # t_guess is still > t_jump
+            t_final = t_guess
+            norm2_psi = norm2_guess
+        else:
+            # t_guess < t_jump
+            t_prev = t_guess
+            y_prev = integ.y
+            norm2_prev = norm2_guess
+    if ii > config.norm_steps:
+        raise Exception("Norm tolerance not reached. " +
+                        "Increase accuracy of ODE solver or " +
+                        "Options.norm_steps.")
+
+
+def _mc_dense_jump(integ, t0, y0, norm2_0, t1, y1, norm2_1, rand, norm_tol,
+                   norm_steps):
+    """
+    Time and state of the collapse in the last step [t0, t1] of an integrator
+    with dense output, found on the interpolated state without integrating.
+    Starts from the interpolation of the norm over the step, then alternates
+    secant steps on the log-norm with bisection, which keeps the collapse
+    bracketed.
+    """
+    for ii in range(max(_mc_dense_steps, norm_steps)):
+        if ii == 0:
+            t_guess = _mc_jump_time(integ, t0, y0, norm2_0, t1, y1, norm2_1,
+                                    rand)
+        elif ii % 2:
+            t_guess = 0.5 * (t0 + t1)
+        else:
+            t_guess = t0 + np.log(norm2_0 / rand) / \
+                np.log(norm2_0 / norm2_1) * (t1 - t0)
+        y_guess = integ.interpolate(t_guess)
+        norm2_guess = dznrm2(y_guess) ** 2
+        if np.abs(rand - norm2_guess) < norm_tol * rand:
+            break
+        elif norm2_guess < rand:
+            t1, norm2_1 = t_guess, norm2_guess
+        else:
+            t0, norm2_0 = t_guess, norm2_guess
+    else:
+        raise Exception("Norm tolerance not reached. " +
+                        "Increase accuracy of ODE solver or " +
+                        "Options.norm_steps.")
+    return t_guess, y_guess
+
+
+def _mc_jump_time(integ, t0, y0, norm2_0, t1, y1, norm2_1, target):
+    """
+    Estimate of the time in [t0, t1] at which the squared norm of the state
+    reaches target, from a cubic Hermite interpolation of the log of the
+    squared norm over the step. The derivatives at both ends are evaluated
+    with the RHS of the ODE.
+    """
+    dt = t1 - t0
+    p0, p1 = np.log(norm2_0), np.log(norm2_1)
+    d0 = 2 * np.real(np.vdot(y0, integ.rhs(t0, y0))) / norm2_0
+    d1 = 2 * np.real(np.vdot(y1, integ.rhs(t1, y1))) / norm2_1
+    d0, d1 = d0 * dt, d1 * dt
+    roots = np.roots([2 * p0 + d0 - 2 * p1 + d1,
+                      -3 * p0 - 2 * d0 + 3 * p1 - d1,
+                      d0, p0 - np.log(target)])
+    s = [r.real for r in roots if abs(r.imag) < 1e-12 and 0 <= r.real <= 1]
+    if s:
+        return t0 + min(s) * dt
+    # fall back on interpolating the log-norm linearly
+    return t0 + np.log(norm2_0 / target) / np.log(norm2_0 / norm2_1) * dt
+
+
+def _mc_col_weights(config, t):
+    """
+    Weights of the collapse channels at time t, the squared magnitudes of the
+    time-dependent coefficients of the collapse operators.
+    """
+    weights = np.ones(config.c_num)
+    for k in config.c_td_inds:
+        coeff = config.c_coeffs[k]
+        if isinstance(coeff, str):
+            code = _mc_coeff_code.get(coeff)
+            if code is None:
+                code = _mc_coeff_code[coeff] = compile(coeff, '<string>',
+                                                       'eval')
+            namespace = dict(_td_str_namespace)
+            if config.c_coeff_args:
+                namespace.update(config.c_coeff_args)
+            namespace['t'] = t
+            weights[k] = np.abs(eval(code, namespace)) ** 2
+        else:
+            weights[k] = np.abs(coeff(t, config.c_coeff_args)) ** 2
+    return weights
+
+
+# -----------------------------------------------------------------------------
+# integrators of the no-jump evolution
+# -----------------------------------------------------------------------------
+def _mc_rhs(config):
+    """
+    RHS function of the no-jump evolution and its extra arguments, for the
+    time-dependence of the Hamiltonian and collapse operators in config.
+    """
+    if config.tflag in [1, 10, 11]:
+        return _cy_rhs_func, eval('(' + config.string + ',)')
+    elif config.tflag == 2:
+        return _cRHStd, (config,)
+    elif config.tflag in [20, 22]:
+        if config.options.rhs_with_state:
+            return _tdRHStd_with_state, (config,)
+        else:
+            return _tdRHStd, (config,)
+    elif config.tflag == 3:
+        if config.options.rhs_with_state:
+            return _pyRHSc_with_state, (config,)
+        else:
+            return _pyRHSc, (config,)
+    else:
+        return _cy_rhs_func, (config.h_data, config.h_ind, config.h_ptr)
+
+
+class _MCIntegrator(ABCMeta('_MCIntegratorBase', (object,), {})):
+    """
+    Abstract base class of the integrators of the no-jump evolution of
+    mcsolve trajectories. The current time and state are held in t and y.
+    Integrators with dense_output also provide interpolate(t), the state at a
+    time t within their last step, which is used to locate the collapses
+    without integrating again.
+    """
+    dense_output = False
+
+    def __init__(self, config, opt, y0, t0, t_bound):
+        self._rhs, self._f_params = _mc_rhs(config)
+
+    def rhs(self, t, y):
+        return self._rhs(t, y, *self._f_params)
+
+    @abstractmethod
+    def set_state(self, t, y):
+        """Restart the integration from state y at time t."""
+
+    @abstractmethod
+    def step(self, t_stop):
+        """Take a single step, without going past t_stop."""
+
+    def integrate(self, t):
+        """Integrate up to time t."""
+        while self.t < t:
+            self.step(t)
+
+
+class _MCZvode(_MCIntegrator):
+    """
+    The ZVODE integrator of scipy.integrate.ode, stepping with the critical
+    time set to t_stop.
+    """
+
+    def __init__(self, config, opt, y0, t0, t_bound):
+        _MCIntegrator.__init__(self, config, opt, y0, t0, t_bound)
+        ODE = ode(self._rhs)
+        ODE.set_f_params(*self._f_params)
+
+        # initialize ODE solver for RHS
+        ODE._integrator = qutip_zvode(
+            method=opt.method, order=opt.order, atol=opt.atol,
+            rtol=opt.rtol, nsteps=opt.nsteps, first_step=opt.first_step,
+            min_step=opt.min_step, max_step=opt.max_step)
+
+        if not len(ODE._y):
+            ODE.t = 0.0
+            ODE._y = np.array([0.0], complex)
+        ODE._integrator.reset(len(ODE._y), ODE.jac is not None)
+
+        # set initial conditions
+        ODE.set_initial_value(y0, t0)
+        self._ode = ODE
+
+    @property
+    def t(self):
+        return self._ode.t
+
+    @property
+    def y(self):
+        return self._ode._y
+
+    def set_state(self, t, y):
+        self._ode._y = y
+        self._ode.t = t
+        self._ode._integrator.call_args[3] = 1
+
+    def step(self, t_stop):
+        self._ode.integrate(t_stop, step=1)
+        if not self._ode.successful():
+            raise Exception("ZVODE failed!")
+
+    def integrate(self, t):
+        self._ode.integrate(t, step=0)
+        if not self._ode.successful():
+            raise Exception("ZVODE failed after adjusting step size!")
+
+
+class _MCRungeKutta(_MCIntegrator):
+    """
+    The explicit Runge-Kutta integrators of scipy.integrate. Steps that go
+    past t_stop are cut with the dense output of the step, and the
+    integration restarts at every collapse.
+    """
+    dense_output = True
+
+    def __init__(self, config, opt, y0, t0, t_bound):
+        _MCIntegrator.__init__(self, config, opt, y0, t0, t_bound)
+        try:
+            import scipy.integrate
+            self._method = getattr(scipy.integrate,
+                                   _mc_rk_methods[opt.mc_integrator])
+        except (ImportError, AttributeError):
+            raise Exception("The " + opt.mc_integrator + " integrator " +
+                            "requires a newer version of scipy.")
+        self._opt = opt
+        self._t_bound = t_bound
+        self.set_state(t0, y0)
+
+    def set_state(self, t, y):
+        self.t = t
+        self.y = y
+        self._solver = None
+        self._dense = None
+
+    def step(self, t_stop):
+        if self._solver is None:
+            opt = self._opt
+            self._solver = self._method(
+                self.rhs, self.t, self.y, self._t_bound,
+                rtol=opt.rtol, atol=opt.atol,
+                max_step=opt.max_step or np.inf,
+                first_step=opt.first_step or None)
+        solver = self._solver
+        # the last step of the solver may already reach past t, when it was
+        # cut at the previous t_stop
+        if solver.t <= self.t:
+            solver.step()
+            if solver.status == 'failed':
+                raise Exception(self._opt.mc_integrator + " failed: " +
+                                str(solver.message))
+            self._dense = solver.dense_output()
+        if solver.t > t_stop:
+            self.t = t_stop
+            self.y = self._dense(t_stop)
+        else:
+            self.t = solver.t
+            self.y = solver.y
+
+    def interpolate(self, t):
+        return self._dense(t)
+
+
+class _MCKrylov(_MCIntegrator):
+    """
+    Exact no-jump evolution for a constant effective Hamiltonian, applying
+    its exponential to the state with scipy.sparse.linalg.expm_multiply.
+    """
+    dense_output = True
+
+    def __init__(self, config, opt, y0, t0, t_bound):
+        if config.tflag != 0:
+            raise TypeError("The krylov integrator requires a constant " +
+                            "Hamiltonian and collapse operators.")
+        _MCIntegrator.__init__(self, config, opt, y0, t0, t_bound)
+        from scipy.sparse.linalg import expm_multiply
+        self._expm_multiply = expm_multiply
+        N = len(y0)
+        self._A = sp.csr_matrix((config.h_data, config.h_ind, config.h_ptr),
+                                shape=(N, N))
+        self._max_step = opt.max_step or np.inf
+        self.set_state(t0, y0)
+
+    def set_state(self, t, y):
+        self.t = self._t0 = t
+        self.y = self._y0 = y
+
+    def step(self, t_stop):
+        self._t0, self._y0 = self.t, self.y
+        t = min(t_stop, self.t + self._max_step)
+        self.y = self._expm_multiply(self._A * (t - self.t), self.y)
+        self.t = t
+
+    def interpolate(self, t):
+        return self._expm_multiply(self._A * (t - self._t0), self._y0)
+
+
+class _MCPropagator(_MCKrylov):
+    """
+    No-jump evolution for a constant effective Hamiltonian with the
+    propagators over the steps of tlist precomputed in config.mc_prop, shared
+    by all trajectories. Steps starting off the grid, after a collapse, fall
+    back on expm_multiply.
+    """
+
+    def __init__(self, config, opt, y0, t0, t_bound):
+        _MCKrylov.__init__(self, config, opt, y0, t0, t_bound)
+        self._tlist = config.tlist
+        self._prop = config.mc_prop
+        self._prop_ind = config.mc_prop_ind
+
+    def step(self, t_stop):
+        self._t0, self._y0 = self.t, self.y
+        k = np.searchsorted(self._tlist, t_stop)
+        if (0 < k < len(self._tlist) and self._tlist[k] == t_stop and
+                self._tlist[k - 1] == self.t):
+            self.y = np.dot(self._prop[self._prop_ind[k - 1]], self.y)
+        else:
+            self.y = self._expm_multiply(self._A * (t_stop - self.t), self.y)
+        self.t = t_stop
+
+
+def _mc_prop_config(config):
+    """
+    Precompute the no-jump propagators exp(-i H_eff dt) over the steps of
+    tlist, one for each distinct step size, for
+    Options.mc_integrator='propagator'.
+    """
+    if config.tflag != 0:
+        raise TypeError("The propagator integrator requires a constant " +
+                        "Hamiltonian and collapse operators.")
+    from scipy.linalg import expm
+    N = len(config.psi0)
+    A = sp.csr_matrix((config.h_data, config.h_ind, config.h_ptr),
+                      shape=(N, N)).toarray()
+    dt = np.diff(config.tlist)
+    # steps equal up to rounding share a propagator
+    _, first, inds = np.unique(np.round(dt, 12), return_index=True,
+                               return_inverse=True)
+    config.mc_prop = np.array([expm(A * dt[k]) for k in first])
+    config.mc_prop_ind = inds
+
+
+# scipy.integrate solvers of the Runge-Kutta integrators
+_mc_rk_methods = {'dop853': 'DOP853', 'rk45': 'RK45'}
+
+_mc_integrators = {'zvode': _MCZvode, 'dop853': _MCRungeKutta,
+                   'rk45': _MCRungeKutta, 'krylov': _MCKrylov,
+                   'propagator': _MCPropagator}
+
+
+def _mc_integrator(config, opt, y0, t0, t_bound):
+    """
+    Integrator of the no-jump evolution from state y0 at time t0, selected
+    with Options.mc_integrator.
+    """
+    if opt.mc_integrator not in _mc_integrators:
+        raise ValueError("Unknown mcsolve integrator '%s', expected one of %s"
+                         % (opt.mc_integrator, sorted(_mc_integrators)))
+    return _mc_integrators[opt.mc_integrator](config, opt, y0, t0, t_bound)
+
+
 def _mc_func_load(config):
     """Load cython functions"""
 
@@ -1071,6 +1726,19 @@ def _mc_data_config(H, psi0, h_stuff, c_ops, c_stuff, args, e_ops,
         config.n_ops_ind = np.array(config.n_ops_ind)
         config.n_ops_ptr = np.array(config.n_ops_ptr)
 
+        # collapse operators stacked row-wise, for evaluating all collapse
+        # probabilities in one pass, and their time-dependent coefficients
+        c_stack = sp.vstack([(c_op[0] if isinstance(c_op, list)
+                              else c_op).data for c_op in c_ops],
+                            format='csr')
+        config.c_stack_data = np.ascontiguousarray(c_stack.data,
+                                                   dtype=complex)
+        config.c_stack_ind = c_stack.indices.astype(np.int32)
+        config.c_stack_ptr = c_stack.indptr.astype(np.int32)
+        config.c_coeffs = [c_op[1] if isinstance(c_op, list) else None
+                           for c_op in c_ops]
+        config.c_coeff_args = args
+
     if config.tflag == 0:
         # CONSTANT H & C_OPS CODE
         # -----------------------
@@ -1321,6 +1989,5 @@ def _mc_dm_avg(psi_list):
     """
     ln = len(psi_list)
     dims = psi_list[0].dims
-    shape = psi_list[0].shape
     out_data = np.sum([psi.data for psi in psi_list]) / ln
-    return Qobj(out_data, dims=dims, shape=shape, fast='mc-dm')
+    return Qobj.from_csr(out_data, dims=dims, isherm=True)
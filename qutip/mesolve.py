@@ -48,17 +48,20 @@ import warnings
 from qutip.qobj import Qobj, isket, isoper, issuper
 from qutip.superoperator import spre, spost, liouvillian, mat2vec, vec2mat
 from qutip.expect import expect_rho_vec
-from qutip.solver import Options, Result, config
-from qutip.cy.spmatfuncs import cy_ode_rhs, cy_ode_rho_func_td
+from qutip.solver import Options, Result, config, _openmp_threads
+from qutip.cy.spmatfuncs import (cy_ode_rhs, cy_ode_rhs_openmp,
+                                 cy_ode_rhs_block, cy_ode_rho_func_td)
 from qutip.cy.codegen import Codegen
 from qutip.cy.utilities import _cython_build_cleanup
 from qutip.rhs_generate import rhs_generate
 from qutip.states import ket2dm
-from qutip.rhs_generate import _td_format_check, _td_wrap_array_str
+from qutip.rhs_generate import (_td_format_check, _td_wrap_array_str,
+                                _td_coeff_func)
 from qutip.settings import debug
 
 from qutip.sesolve import (_sesolve_list_func_td, _sesolve_list_str_td,
-                           _sesolve_list_td, _sesolve_func_td, _sesolve_const)
+                           _sesolve_list_td, _sesolve_func_td, _sesolve_const,
+                           _sesolve_batch)
 
 from qutip.ui.progressbar import BaseProgressBar, TextProgressBar
 
@@ -134,7 +137,10 @@ def mesolve(H, rho0, tlist, c_ops, e_ops, args={}, options=None,
     should be an instance of :class:`qutip.solver.Options`. Many ODE
     integration options can be set this way, and the `store_states` and
     `store_final_state` options can be used to store states even though
-    expectation values are requested via the `e_ops` argument.
+    expectation values are requested via the `e_ops` argument. With the
+    `matrix_free` option, the Hamiltonian and collapse operators are applied
+    directly to the density matrix and the Liouvillian superoperator is never
+    formed, which reduces the memory use for large systems.
 
     .. note::
 
@@ -163,8 +169,9 @@ def mesolve(H, rho0, tlist, c_ops, e_ops, args={}, options=None,
         System Hamiltonian, or a callback function for time-dependent
         Hamiltonians, or alternatively a system Liouvillian.
 
-    rho0 : :class:`qutip.Qobj`
-        initial density matrix or state vector (ket).
+    rho0 : :class:`qutip.Qobj` / list
+        initial density matrix or state vector (ket), or a list of initial
+        states that are evolved together as one block.
 
     tlist : *list* / *array*
         list of times for :math:`t`.
@@ -198,7 +205,8 @@ def mesolve(H, rho0, tlist, c_ops, e_ops, args={}, options=None,
         specified by `tlist`, or an *array* `result.states` of state vectors or
         density matrices corresponding to the times in `tlist` [if `e_ops` is
         an empty list], or nothing if a callback function was given in place of
-        operators for which to calculate the expectation values.
+        operators for which to calculate the expectation values. For a list of
+        initial states, a list with one such instance per initial state.
 
     """
 
@@ -236,6 +244,16 @@ def mesolve(H, rho0, tlist, c_ops, e_ops, args={}, options=None,
 
     res = None
 
+    if isinstance(rho0, list):
+        # evolve a batch of initial states together
+        res = _mesolve_batch(H, rho0, tlist, c_ops, e_ops, args, options,
+                             progress_bar)
+        if e_ops_dict:
+            for output in res:
+                output.expect = {e: output.expect[n]
+                                 for n, e in enumerate(e_ops_dict.keys())}
+        return res
+
     #
     # dispatch the appropriate solver
     #
@@ -255,7 +273,14 @@ def mesolve(H, rho0, tlist, c_ops, e_ops, args={}, options=None,
         # operator. Then delegate to appropriate solver...
         #
 
-        if isinstance(H, Qobj):
+        if options.matrix_free and _matrix_free_format_check(H, c_ops):
+            # apply the operators to the density matrix without forming
+            # the liouvillian
+            res = _mesolve_matrix_free(H if isinstance(H, list) else [H],
+                                       rho0, tlist, c_ops, e_ops, args,
+                                       options, progress_bar)
+
+        elif isinstance(H, Qobj):
             # constant hamiltonian
             if n_func == 0 and n_str == 0:
                 # constant collapse operators
@@ -678,8 +703,13 @@ def _mesolve_const(H, rho0, tlist, c_op_list, e_ops, args, opt,
     # setup integrator
     #
     initial_vector = mat2vec(rho0.full()).ravel()
-    r = scipy.integrate.ode(cy_ode_rhs)
-    r.set_f_params(L.data.data, L.data.indices, L.data.indptr)
+    nthr = _openmp_threads(opt, L.data.nnz)
+    if nthr > 1:
+        r = scipy.integrate.ode(cy_ode_rhs_openmp)
+        r.set_f_params(L.data.data, L.data.indices, L.data.indptr, nthr)
+    else:
+        r = scipy.integrate.ode(cy_ode_rhs)
+        r.set_f_params(L.data.data, L.data.indices, L.data.indptr)
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -692,6 +722,153 @@ def _mesolve_const(H, rho0, tlist, c_op_list, e_ops, args, opt,
     return _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar)
 
 
+# -----------------------------------------------------------------------------
+# Master equation solver for a batch of initial states, evolved together as the
+# columns of one block so that the liouvillian is read once for all of them.
+#
+def _mesolve_batch(H, rho0_list, tlist, c_op_list, e_ops, args, opt,
+                   progress_bar):
+    """
+    Evolve a list of initial states as a block, for constant hamiltonian and
+    collapse operators. Other formats fall back to evolving the states one at
+    a time.
+    """
+
+    if debug:
+        print(inspect.stack()[0][3])
+
+    if len(rho0_list) == 0:
+        return []
+
+    if (not c_op_list and all(isket(rho0) for rho0 in rho0_list) and
+            not (isinstance(H, Qobj) and issuper(H)) and
+            not (isinstance(H, list) and isinstance(H[0], Qobj) and
+                 issuper(H[0]))):
+        # unitary dynamics
+        return _sesolve_batch(H, rho0_list, tlist, e_ops, args, opt,
+                              progress_bar)
+
+    _, n_func, n_str = _td_format_check(H, c_op_list)
+    if not isinstance(H, Qobj) or n_func > 0 or n_str > 0:
+        return [mesolve(H, rho0, tlist, c_op_list, e_ops, args, opt,
+                        progress_bar) for rho0 in rho0_list]
+
+    rho0_list = [ket2dm(rho0) if isket(rho0) else rho0
+                 for rho0 in rho0_list]
+    for rho0 in rho0_list:
+        if rho0.dims != rho0_list[0].dims:
+            raise TypeError("All initial states must have the same dims")
+
+    #
+    # construct liouvillian
+    #
+    if opt.tidy:
+        H = H.tidyup(opt.atol)
+
+    L = liouvillian(H, c_op_list)
+
+    #
+    # setup integrator: the vectorized density matrices are the columns of a
+    # row-major block
+    #
+    nvec = len(rho0_list)
+    initial_vector = np.column_stack(
+        [mat2vec(rho0.full()).ravel() for rho0 in rho0_list]).ravel()
+    r = scipy.integrate.ode(cy_ode_rhs_block)
+    r.set_f_params(L.data.data, L.data.indices, L.data.indptr, nvec)
+    r.set_integrator('zvode', method=opt.method, order=opt.order,
+                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
+                     first_step=opt.first_step, min_step=opt.min_step,
+                     max_step=opt.max_step)
+    r.set_initial_value(initial_vector, tlist[0])
+
+    #
+    # prepare output
+    #
+    n_tsteps = len(tlist)
+    dims = rho0_list[0].dims
+    N2 = np.prod(rho0_list[0].shape)
+
+    outputs = []
+    for rho0 in rho0_list:
+        output = Result()
+        output.solver = "mesolve"
+        output.times = tlist
+        outputs.append(output)
+
+    if isinstance(e_ops, types.FunctionType):
+        n_expt_op = 0
+        expt_callback = True
+        store_states = opt.store_states
+
+    elif isinstance(e_ops, list):
+        n_expt_op = len(e_ops)
+        expt_callback = False
+        # fall back on storing states if no expectation values are requested
+        store_states = opt.store_states or n_expt_op == 0
+        for output, rho0 in zip(outputs, rho0_list):
+            output.num_expect = n_expt_op
+            output.expect = [np.zeros(n_tsteps)
+                             if op.isherm and rho0.isherm else
+                             np.zeros(n_tsteps, dtype=complex)
+                             for op in e_ops]
+    else:
+        raise TypeError("Expectation parameter must be a list or a function")
+
+    # tr(op rho) = sum_ij op_ij rho_ji, where rho_ji is the element
+    # i * n + j of the column-stacked vector of rho
+    e_ops_idx = []
+    for m in range(n_expt_op):
+        op_coo = e_ops[m].data.tocoo()
+        e_ops_idx.append((op_coo.row * e_ops[m].shape[1] + op_coo.col,
+                          op_coo.data))
+
+    #
+    # start evolution
+    #
+    progress_bar.start(n_tsteps)
+
+    dt = np.diff(tlist)
+    for t_idx, t in enumerate(tlist):
+        progress_bar.update(t_idx)
+
+        if not r.successful():
+            raise Exception("ODE integration error: Try to increase "
+                            "the allowed number of substeps by increasing "
+                            "the nsteps parameter in the Options class.")
+
+        rho_vecs = r.y.reshape((N2, nvec))
+
+        if store_states or expt_callback:
+            for k in range(nvec):
+                rho = Qobj.from_csr(vec2mat(rho_vecs[:, k]), dims=dims)
+                if store_states:
+                    outputs[k].states.append(rho)
+                if expt_callback:
+                    e_ops(t, rho)
+
+        for m, (idx, values) in enumerate(e_ops_idx):
+            expt = values.dot(rho_vecs[idx, :])
+            for k in range(nvec):
+                if outputs[k].expect[m].dtype == complex:
+                    outputs[k].expect[m][t_idx] = expt[k]
+                else:
+                    outputs[k].expect[m][t_idx] = expt[k].real
+
+        if t_idx < n_tsteps - 1:
+            r.integrate(r.t + dt[t_idx])
+
+    progress_bar.finished()
+
+    if opt.store_final_state:
+        rho_vecs = r.y.reshape((N2, nvec))
+        for k in range(nvec):
+            outputs[k].final_state = Qobj.from_csr(vec2mat(rho_vecs[:, k]),
+                                                   dims=dims)
+
+    return outputs
+
+
 #
 # evaluate drho(t)/dt according to the master eqaution
 # [no longer used, replaced by cython function]
@@ -700,6 +877,122 @@ def _ode_rho_func(t, rho, L):
     return L * rho
 
 
+# -----------------------------------------------------------------------------
+# Matrix-free master equation solver: the hamiltonian and collapse operators
+# are applied to the density matrix, and the liouvillian is never formed
+#
+def _matrix_free_format_check(H, c_ops):
+    """
+    Check if the hamiltonian and collapse operators are operators, constant
+    or in the list-function or list-string format, as required by
+    _mesolve_matrix_free.
+    """
+    H_list = H if isinstance(H, list) else [H]
+    for spec in list(H_list) + list(c_ops):
+        if isinstance(spec, list) and len(spec) == 2:
+            op, coeff = spec
+            if not (callable(coeff) or isinstance(coeff, str)):
+                return False
+        else:
+            op = spec
+        if not isinstance(op, Qobj) or not isoper(op):
+            return False
+    return True
+
+
+def _mesolve_matrix_free(H_list, rho0, tlist, c_list, e_ops, args, opt,
+                         progress_bar):
+    """
+    Internal function for solving the master equation without forming the
+    liouvillian. See mesolve for usage.
+    """
+
+    if debug:
+        print(inspect.stack()[0][3])
+
+    #
+    # check initial state
+    #
+    if isket(rho0):
+        rho0 = ket2dm(rho0)
+
+    #
+    # collect the terms A rho + rho A^dag + sum_c c rho c^dag, with
+    # A = -iH for hamiltonian terms and A = -c^dag c / 2 for collapse
+    # operators, and sum up the constant terms
+    #
+    N = rho0.shape[0]
+    A_const = sp.csr_matrix((N, N), dtype=complex)
+    c_const = []
+    terms = []
+
+    for h_spec in H_list:
+        if isinstance(h_spec, Qobj):
+            h = h_spec.tidyup(opt.atol) if opt.tidy else h_spec
+            A_const = A_const - 1j * h.data
+        else:
+            h, h_coeff = h_spec
+            terms.append([-1j * h.data, [],
+                          _td_coeff_func(h_coeff, args,
+                                         opt.rhs_with_state), False])
+
+    for c_spec in c_list:
+        if isinstance(c_spec, Qobj):
+            c = c_spec.data
+            A_const = A_const - 0.5 * (c.T.conj() * c)
+            c_const.append(c)
+        else:
+            c = c_spec[0].data
+            terms.append([-0.5 * (c.T.conj() * c), [c],
+                          _td_coeff_func(c_spec[1], args,
+                                         opt.rhs_with_state), True])
+
+    terms.insert(0, [A_const, c_const, None, False])
+    L_terms = [(A.tocsr(), A.conj().tocsr(),
+                [(c.tocsr(), c.conj().tocsr()) for c in jumps],
+                coeff, square) for A, jumps, coeff, square in terms]
+
+    #
+    # setup integrator
+    #
+    initial_vector = mat2vec(rho0.full()).ravel()
+    r = scipy.integrate.ode(_ode_rho_matrix_free)
+    r.set_integrator('zvode', method=opt.method, order=opt.order,
+                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
+                     first_step=opt.first_step, min_step=opt.min_step,
+                     max_step=opt.max_step)
+    r.set_initial_value(initial_vector, tlist[0])
+    r.set_f_params(N, L_terms)
+
+    #
+    # call generic ODE code
+    #
+    return _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar)
+
+
+#
+# evaluate drho(t)/dt according to the master equation, using only products
+# of the N x N operators with the N x N density matrix
+#
+def _ode_rho_matrix_free(t, rho, N, L_terms):
+    # column-stacked vector to matrix, without copying
+    rho_mat = rho.reshape((N, N), order='F')
+    rho_T = rho_mat.T
+    out = np.zeros((N, N), dtype=complex)
+    for A, A_conj, jumps, coeff, square in L_terms:
+        # A rho + rho A^dag, with rho A^dag = (conj(A) rho^T)^T
+        drho = A.dot(rho_mat) + A_conj.dot(rho_T).T
+        for c, c_conj in jumps:
+            drho += c.dot(c_conj.dot(rho_T).T)
+        if coeff is None:
+            out += drho
+        elif square:
+            out += coeff(t, rho) ** 2 * drho
+        else:
+            out += coeff(t, rho) * drho
+    return out.ravel(order='F')
+
+
 # -----------------------------------------------------------------------------
 # Master equation solver for python-function time-dependence.
 #
@@ -856,8 +1149,6 @@ def _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar):
     #
     progress_bar.start(n_tsteps)
 
-    rho = Qobj(rho0)
-
     dt = np.diff(tlist)
     for t_idx, t in enumerate(tlist):
         progress_bar.update(t_idx)
@@ -868,10 +1159,10 @@ def _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar):
                             "the nsteps parameter in the Options class.")
 
         if opt.store_states or expt_callback:
-            rho.data = vec2mat(r.y)
+            rho = Qobj.from_csr(vec2mat(r.y), dims=rho0.dims)
 
             if opt.store_states:
-                output.states.append(Qobj(rho))
+                output.states.append(rho)
 
             if expt_callback:
                 # use callback method
@@ -894,8 +1185,7 @@ def _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar):
         _cython_build_cleanup(config.tdname)
 
     if opt.store_final_state:
-        rho.data = vec2mat(r.y)
-        output.final_state = Qobj(rho)
+        output.final_state = Qobj.from_csr(vec2mat(r.y), dims=rho0.dims)
 
     return output
 
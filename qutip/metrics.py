@@ -39,7 +39,8 @@ __all__ = ['fidelity', 'tracedist', 'bures_dist', 'bures_angle',
            'hilbert_dist', 'average_gate_fidelity', 'process_fidelity']
 
 import numpy as np
-from qutip.sparse import sp_eigs
+from qutip.qobj import _state_stacks
+from qutip.expect import expect
 from qutip.states import ket2dm
 from qutip.superop_reps import to_kraus
 
@@ -53,13 +54,15 @@ def fidelity(A, B):
     ----------
     A : qobj
         Density matrix or state vector.
-    B : qobj
-        Density matrix or state vector with same dimensions as A.
+    B : qobj / list
+        Density matrix or state vector with same dimensions as A, or a list
+        of them, for which the fidelities are calculated together.
 
     Returns
     -------
-    fid : float
-        Fidelity pseudo-metric between A and B.
+    fid : float / array
+        Fidelity pseudo-metric between A and B, or an array of the fidelities
+        for a list B.
 
     Examples
     --------
@@ -71,6 +74,8 @@ def fidelity(A, B):
     """
     if A.isket or A.isbra:
         A = ket2dm(A)
+    if isinstance(B, (list, np.ndarray)):
+        return _fidelity_batch(A, B)
     if B.isket or B.isbra:
         B = ket2dm(B)
 
@@ -81,6 +86,29 @@ def fidelity(A, B):
     return float(np.real((A * (B * A)).sqrtm().tr()))
 
 
+def _fidelity_batch(A, states):
+    """
+    Fidelities between the density matrix A and a list of states. For kets
+    F = sqrt(<psi|A|psi>), otherwise the eigenvalues of sqrt(A) B sqrt(A) are
+    calculated for all density matrices together.
+    """
+    states = [B.dag() if B.isbra else B for B in states]
+    if all([B.isket for B in states]):
+        if any([B.dims[0] != A.dims[0] for B in states]):
+            raise TypeError('Density matrices do not have same dimensions.')
+        return np.sqrt(np.maximum(np.real(expect(A, states)), 0))
+
+    states = [ket2dm(B) if B.isket else B for B in states]
+    if any([B.dims != A.dims for B in states]):
+        raise TypeError('Density matrices do not have same dimensions.')
+    sqrtA = A.sqrtm().full()
+    out = []
+    for stack in _state_stacks(states):
+        vals = np.linalg.eigvalsh(np.matmul(sqrtA, np.matmul(stack, sqrtA)))
+        out.append(np.sum(np.sqrt(np.maximum(vals, 0)), axis=1))
+    return np.concatenate(out)
+
+
 def process_fidelity(U1, U2, normalize=True):
     """
     Calculate the process fidelity given two process operators.
@@ -156,7 +184,7 @@ def tracedist(A, B, sparse=False, tol=0):
 
     diff = A - B
     diff = diff.dag() * diff
-    vals = sp_eigs(diff.data, diff.isherm, vecs=False, sparse=sparse, tol=tol)
+    vals = diff.eigenenergies(sparse=sparse, tol=tol)
     return float(np.real(0.5 * np.sum(np.sqrt(np.abs(vals)))))
 
 
@@ -34,17 +34,46 @@
 This function provides functions for parallel execution of loops and function
 mappings, using the builtin Python module multiprocessing.
 """
-__all__ = ['parfor', 'parallel_map', 'serial_map']
+__all__ = ['parfor', 'parallel_map', 'serial_map', 'SharedArrays']
 
 from scipy import array
 from multiprocessing import Pool
 from functools import partial
+import copy
+import math
 import os
 import sys
 import signal
+import tempfile
+import time
+import numpy as np
+import scipy.sparse as sp
 import qutip.settings as qset
+from qutip.qobj import Qobj
 from qutip.ui.progressbar import BaseProgressBar, TextProgressBar
 
+# target run time in seconds of a chunk of tasks, long enough to amortize the
+# cost of sending a task and its result between processes
+_chunk_time = 0.2
+
+# task arguments shared with a worker process when it is started
+_shared_task_args = None
+
+# arrays smaller than this number of bytes are not placed in shared memory
+_shared_min_bytes = 65536
+
+# directory for the memory-mapped files of SharedArrays (None = default
+# temporary directory)
+_shared_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def _init_worker():
+    # each worker process runs the multi-threaded kernels with a single
+    # thread, unless a number of threads is set explicitly, so that the
+    # workers together do not use more threads than there are cpus
+    if qset.openmp_threads == 0:
+        qset.openmp_threads = 1
+
 
 def _task_wrapper(args):
     try:
@@ -112,7 +141,7 @@ def parfor(func, *args, **kwargs):
               "is larger than physical number (%s)." % qset.num_cpus)
         print("Reduce 'num_cpus' for greater performance.")
 
-    pool = Pool(processes=kw['num_cpus'])
+    pool = Pool(processes=kw['num_cpus'], initializer=_init_worker)
     args = [list(arg) for arg in args]
     var = [[args[j][i] for j in range(len(args))]
            for i in range(len(list(args[0])))]
@@ -165,6 +194,15 @@ def serial_map(task, values, task_args=tuple(), task_kwargs={}, **kwargs):
     progress_bar: ProgressBar
         Progress bar class instance for showing progress.
 
+    reduce_func: function
+        Optional function that is called as ``reduce_func(n, result)`` with
+        the result for ``values[n]`` as soon as it is available. The results
+        are then not collected, and an empty list is returned.
+
+    shared_args: bool
+        Accepted for compatibility with :func:`qutip.parallel_map`, and has
+        no effect.
+
     Returns
     --------
     result : list
@@ -172,6 +210,7 @@ def serial_map(task, values, task_args=tuple(), task_kwargs={}, **kwargs):
         ``task(value, *task_args, **task_kwargs)`` for each
         value in ``values``.
     """
+    reduce_func = kwargs.get('reduce_func', None)
     try:
         progress_bar = kwargs['progress_bar']
         if progress_bar is True:
@@ -184,7 +223,10 @@ def serial_map(task, values, task_args=tuple(), task_kwargs={}, **kwargs):
     for n, value in enumerate(values):
         progress_bar.update(n)
         result = task(value, *task_args, **task_kwargs)
-        results.append(result)
+        if reduce_func is not None:
+            reduce_func(n, result)
+        else:
+            results.append(result)
     progress_bar.finished()
 
     return results
@@ -216,6 +258,17 @@ def parallel_map(task, values, task_args=tuple(), task_kwargs={}, **kwargs):
     progress_bar: ProgressBar
         Progress bar class instance for showing progress.
 
+    reduce_func: function
+        Optional function that is called as ``reduce_func(n, result)`` with
+        the result for ``values[n]`` as soon as it is available, in the order
+        in which the tasks finish. The results are then not kept in memory,
+        and an empty list is returned.
+
+    shared_args: bool
+        Send ``task_args`` and ``task_kwargs`` to each worker process once,
+        when the pool is started, instead of with every task. Useful when the
+        arguments hold large arrays and there are many tasks.
+
     Returns
     --------
     result : list
@@ -227,6 +280,13 @@ def parallel_map(task, values, task_args=tuple(), task_kwargs={}, **kwargs):
     kw = _default_kwargs()
     if 'num_cpus' in kwargs:
         kw['num_cpus'] = kwargs['num_cpus']
+    reduce_func = kwargs.get('reduce_func', None)
+
+    pool_kwargs = {'processes': kw['num_cpus'], 'initializer': _init_worker}
+    if kwargs.get('shared_args', False):
+        pool_kwargs['initializer'] = _init_shared_args
+        pool_kwargs['initargs'] = (task_args, task_kwargs)
+        task, task_args, task_kwargs = _shared_args_task, (task,), {}
 
     try:
         progress_bar = kwargs['progress_bar']
@@ -242,8 +302,13 @@ def parallel_map(task, values, task_args=tuple(), task_kwargs={}, **kwargs):
         nfinished[0] += 1
         progress_bar.update(nfinished[0])
 
+    if reduce_func is not None:
+        return _parallel_reduce(task, values, task_args, task_kwargs,
+                                reduce_func, pool_kwargs,
+                                _update_progress_bar, progress_bar)
+
     try:
-        pool = Pool(processes=kw['num_cpus'])
+        pool = Pool(**pool_kwargs)
 
         async_res = [pool.apply_async(task, (value,) + task_args, task_kwargs,
                                       _update_progress_bar)
@@ -266,6 +331,315 @@ def parallel_map(task, values, task_args=tuple(), task_kwargs={}, **kwargs):
     return [ar.get() for ar in async_res]
 
 
+def _parallel_reduce(task, values, task_args, task_kwargs, reduce_func,
+                     pool_kwargs, update_progress_bar, progress_bar):
+    """
+    Runs the tasks of parallel_map and passes each result to reduce_func in
+    the parent process as it arrives, without holding on to the results.
+    """
+    errors = []
+
+    def _reduce_result(n, x):
+        reduce_func(n, x)
+        update_progress_bar(x)
+
+    try:
+        pool = Pool(**pool_kwargs)
+
+        for n, value in enumerate(values):
+            pool.apply_async(task, (value,) + task_args, task_kwargs,
+                             partial(_reduce_result, n), errors.append)
+
+        pool.close()
+        pool.join()
+
+    except KeyboardInterrupt as e:
+        pool.terminate()
+        pool.join()
+        raise e
+
+    progress_bar.finished()
+
+    if errors:
+        raise errors[0]
+
+    return []
+
+
+def _init_shared_args(task_args, task_kwargs):
+    global _shared_task_args
+    _init_worker()
+    _shared_task_args = (task_args, task_kwargs)
+
+
+def _shared_args_task(value, task):
+    task_args, task_kwargs = _shared_task_args
+    return task(value, *task_args, **task_kwargs)
+
+
+def _chunk_task(chunk, task, *task_args, **task_kwargs):
+    """
+    Runs task for each value in a chunk of values, as a single task.
+    """
+    return [task(value, *task_args, **task_kwargs) for value in chunk]
+
+
+def _auto_chunk_size(task_time, num_tasks, num_cpus):
+    """
+    Number of tasks per chunk, chosen from the run time of a single task so
+    that a chunk takes about _chunk_time seconds, while leaving at least four
+    chunks per process for load balancing.
+    """
+    if num_cpus <= 1 or num_tasks <= 1:
+        return 1
+    size = int(_chunk_time / max(task_time, 1e-6))
+    max_size = int(math.ceil(num_tasks / (4.0 * num_cpus)))
+    return max(1, min(size, max_size))
+
+
+def _split_chunks(values, chunk_size, boundaries=()):
+    """
+    Splits a sorted list of values into chunks of at most chunk_size values,
+    which do not straddle any of the given boundaries: the values below a
+    boundary and the values from it on are in different chunks.
+    """
+    chunks = []
+    start = 0
+    stops = set([len(values)])
+    if len(boundaries):
+        stops |= set(np.searchsorted(values, list(boundaries)))
+    for stop in sorted(stops):
+        for k in range(start, stop, chunk_size):
+            chunks.append(values[k:min(k + chunk_size, stop)])
+        start = max(start, stop)
+    return chunks
+
+
+def _map_chunks(task, values, task_args=tuple(), map_func=None,
+                map_kwargs={}, num_cpus=1, chunk_size=0, task_time=None,
+                boundaries=(), reduce_func=None, value_size=None,
+                progress_bar=None):
+    """
+    Runs task(chunk, *task_args) for chunks of the values through map_func,
+    for the trajectory solvers. The task arguments are sent to each worker
+    once. Without a chunk_size, the chunk size is chosen from task_time, the
+    run time of the task for a single value, which is first measured by
+    running the task for the first value in this process if not given.
+
+    The chunk results are passed to reduce_func(n, result) for the n-th
+    chunk as they arrive, or returned as a list in the order of the chunks.
+    The progress bar counts the values, or the sum of value_size(value) over
+    the values, such as the number of trajectories in a block of them.
+
+    Returns the list of chunk results, and the run time of a single value.
+    """
+    if map_func is None:
+        map_func = parallel_map
+    if progress_bar is None:
+        progress_bar = BaseProgressBar()
+    elif progress_bar is True:
+        progress_bar = TextProgressBar()
+
+    def _size(values):
+        if value_size is None:
+            return len(values)
+        return sum(value_size(value) for value in values)
+
+    chunks = []
+    results = {}
+    nfinished = [0]
+
+    def _reduce_chunk(n, result):
+        nfinished[0] += _size(chunks[n])
+        progress_bar.update(nfinished[0])
+        if reduce_func is None:
+            results[n] = result
+        else:
+            reduce_func(n, result)
+
+    progress_bar.start(_size(values))
+
+    if not chunk_size:
+        if task_time is None and len(values):
+            # run the first value in this process, to estimate the cost of a
+            # single value
+            t_start = time.time()
+            result = task(values[:1], *task_args)
+            task_time = time.time() - t_start
+            chunks.append(values[:1])
+            _reduce_chunk(0, result)
+            values = values[1:]
+        chunk_size = _auto_chunk_size(task_time, len(values), num_cpus)
+
+    offset = len(chunks)
+    chunks += _split_chunks(values, chunk_size, boundaries)
+
+    def _reduce(n, result):
+        _reduce_chunk(n + offset, result)
+
+    map_kwargs = dict(map_kwargs, shared_args=True, reduce_func=_reduce,
+                      progress_bar=BaseProgressBar())
+    # map functions that do not support reduce_func return the list instead
+    for n, result in enumerate(map_func(task, chunks[offset:], task_args, {},
+                                        **map_kwargs)):
+        _reduce(n, result)
+    progress_bar.finished()
+
+    return [results[n] for n in sorted(results)], task_time
+
+
+class SharedArrays():
+    """
+    Registry of arrays placed in shared memory, for passing large operators
+    to worker processes without copying them.
+
+    The arrays are stored in memory-mapped files (in ``/dev/shm`` where
+    available). A shared array is pickled as a reference to its file, so
+    that a worker process that receives it, for example as an argument of a
+    :func:`qutip.parallel_map` task, attaches to the same memory instead of
+    receiving a copy of the data. The files are removed when the registry is
+    closed, so the shared objects should only be used while it is open::
+
+        with SharedArrays() as shared:
+            H = shared.share(H)
+            results = parallel_map(task, values, task_args=(H,))
+
+    """
+
+    def __init__(self):
+        self._files = []
+        self._replaced = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def share(self, obj):
+        """
+        Copy of an object with its arrays placed in shared memory.
+
+        Parameters
+        ----------
+        obj : ndarray / csr_matrix / :class:`qutip.Qobj` / list / tuple
+            Array, sparse matrix or quantum object to share, or a list or
+            tuple of these. Other objects, and arrays smaller than 64 kB,
+            are returned unchanged.
+
+        Returns
+        -------
+        shared : object
+            Object of the same type, referring to the shared arrays.
+
+        """
+        if isinstance(obj, _SharedArray):
+            return obj
+        elif isinstance(obj, np.ndarray):
+            if obj.dtype == object:
+                out = np.empty(obj.shape, dtype=object)
+                for idx, item in np.ndenumerate(obj):
+                    out[idx] = self.share(item)
+                return out
+            if obj.nbytes < _shared_min_bytes:
+                return obj
+            return self._share_array(obj)
+        elif sp.isspmatrix_csr(obj) or sp.isspmatrix_csc(obj):
+            out = obj.__class__(obj.shape, dtype=obj.dtype)
+            out.data = self.share(obj.data)
+            out.indices = self.share(obj.indices)
+            out.indptr = self.share(obj.indptr)
+            return out
+        elif isinstance(obj, Qobj):
+            out = copy.copy(obj)
+            out._data = self.share(obj._current_data())
+            out._tidyup_pending = False
+            return out
+        elif isinstance(obj, list):
+            return [self.share(item) for item in obj]
+        elif isinstance(obj, tuple):
+            return tuple(self.share(item) for item in obj)
+        else:
+            return obj
+
+    def share_attrs(self, obj, names):
+        """
+        Replace the given attributes of an object by shared copies. The
+        original values are restored when the registry is closed.
+
+        Parameters
+        ----------
+        obj : object
+            Object holding the arrays, such as a solver configuration.
+
+        names : list of str
+            Names of the attributes to share. Missing attributes are
+            skipped.
+
+        """
+        for name in names:
+            value = getattr(obj, name, None)
+            shared = self.share(value)
+            if shared is not value:
+                self._replaced.append((obj, name, value))
+                setattr(obj, name, shared)
+
+    def close(self):
+        """
+        Restore the attributes replaced by share_attrs and remove the shared
+        memory.
+        """
+        for obj, name, value in reversed(self._replaced):
+            setattr(obj, name, value)
+        self._replaced = []
+        for filename in self._files:
+            try:
+                os.remove(filename)
+            except OSError:
+                # still mapped on platforms that lock mapped files
+                pass
+        self._files = []
+
+    def _share_array(self, arr):
+        fd, filename = tempfile.mkstemp(prefix='qutip-', suffix='.shm',
+                                        dir=_shared_dir)
+        os.close(fd)
+        self._files.append(filename)
+        mm = np.memmap(filename, dtype=arr.dtype, mode='w+', shape=arr.shape)
+        mm[...] = arr
+        mm.flush()
+        return _shared_view(mm, (filename, arr.dtype.str, arr.shape))
+
+
+class _SharedArray(np.ndarray):
+    """
+    Array in a memory-mapped file, which is pickled as a reference to the
+    file. Views and results of operations on it are pickled by value.
+    """
+
+    def __array_finalize__(self, obj):
+        self._shared_info = None
+        self._shared_mem = getattr(obj, '_shared_mem', None)
+
+    def __reduce__(self):
+        if self._shared_info is None:
+            return np.array(self).__reduce__()
+        return (_attach_shared_array, self._shared_info)
+
+
+def _shared_view(mm, info):
+    out = mm.view(_SharedArray)
+    out._shared_mem = mm
+    out._shared_info = info
+    return out
+
+
+def _attach_shared_array(filename, dtype, shape):
+    # the workers only read the shared arrays
+    mm = np.memmap(filename, dtype=dtype, mode='r', shape=shape)
+    return _shared_view(mm, (filename, dtype, shape))
+
+
 def _default_kwargs():
     settings = {'num_cpus': qset.num_cpus}
     return settings
@@ -35,7 +35,6 @@ __all__ = ['reshuffle']
 
 import numpy as np
 import scipy.sparse as sp
-from qutip.ptrace import _select
 
 
 def _chunk_dims(dims, order):
@@ -138,6 +137,22 @@ def _perm_inds(dims, order):
     return dims, perm_inds
 
 
+def _select(sel, dims):
+    """
+    Private function finding selected components
+    """
+    sel = np.asarray(sel)  # make sure sel is np.array
+    dims = np.asarray(dims)  # make sure dims is np.array
+    rlst = dims.take(sel)
+    rprod = np.prod(rlst)
+    ilist = np.ones((rprod, len(dims)), dtype=int)
+    counter = np.arange(rprod)
+    for k in range(len(sel)):
+        ilist[:, sel[k]] = np.remainder(
+            np.fix(counter / np.prod(dims[sel[k + 1:]])), dims[sel[k]]) + 1
+    return ilist
+
+
 def reshuffle(q_oper):
     """
     Column-reshuffles a ``type="super"`` Qobj.
@@ -164,3 +179,4 @@ def reshuffle(q_oper):
                     )
 
     return q_oper.permute(list(perm_idxs))
+
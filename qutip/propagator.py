@@ -34,14 +34,17 @@
 __all__ = ['propagator', 'propagator_steadystate']
 
 import types
+import time
 import numpy as np
 import scipy.linalg as la
+import scipy.sparse.linalg as spla
 import functools
 
 from qutip.qobj import Qobj
 from qutip.rhs_generate import rhs_clear
-from qutip.superoperator import (vec2mat, mat2vec,
+from qutip.superoperator import (vec2mat, mat2vec, liouvillian,
                                  vector_to_operator, operator_to_vector)
+from qutip.sparse import sp_expm
 from qutip.mesolve import mesolve
 from qutip.sesolve import sesolve
 from qutip.states import basis
@@ -49,8 +52,15 @@ from qutip.solver import Options
 from qutip.ui.progressbar import BaseProgressBar, TextProgressBar
 
 
+# largest dimension of the generator for which the 'auto' method exponentiates
+# it as a dense matrix, and fill ratio above which a sparse generator is
+# treated as dense
+_expm_dense_max = 500
+_expm_dense_fill = 0.1
+
+
 def propagator(H, t, c_op_list, args=None, options=None, sparse=False,
-               progress_bar=None):
+               progress_bar=None, method='auto', return_info=False):
     """
     Calculate the propagator U(t) for the density matrix or wave function such
     that :math:`\psi(t) = U(t)\psi(0)` or
@@ -83,11 +93,27 @@ def propagator(H, t, c_op_list, args=None, options=None, sparse=False,
         showing the progress of the simulation. By default no progress bar
         is used, and if set to True a TextProgressBar will be used.
 
+    method : str {'auto', 'ode', 'expm', 'expm_multiply'}
+        How to calculate the propagator. 'ode' integrates the equation of
+        motion for each basis state. For constant Hamiltonians and collapse
+        operators, 'expm' exponentiates the generator (dense or sparse Pade
+        with scaling and squaring), once for each distinct time step, and
+        'expm_multiply' applies the exponential to the identity with the
+        Al-Mohy-Higham algorithm, stepping through `t`. 'auto' uses 'ode' for
+        time-dependent problems, 'expm' for small or dense generators, and
+        'expm_multiply' otherwise.
+
+    return_info : bool {False}
+        Also return a dictionary with the method used and the solution time.
+
     Returns
     -------
      a : qobj
         Instance representing the propagator :math:`U(t)`.
 
+     info : dict
+        Method used and solution time, only if `return_info` is True.
+
     """
 
     if progress_bar is None:
@@ -95,16 +121,38 @@ def propagator(H, t, c_op_list, args=None, options=None, sparse=False,
     elif progress_bar is True:
         progress_bar = TextProgressBar()
 
-    if options is None:
-        options = Options()
-        options.rhs_reuse = True
-        rhs_clear()
-
     if isinstance(t, (int, float, np.integer, np.floating)):
         tlist = [0, t]
     else:
         tlist = t
 
+    _start = time.time()
+    constant = (isinstance(H, Qobj) and
+                all(isinstance(c, Qobj) for c in c_op_list))
+    if method == 'auto':
+        method = _propagator_method(H, c_op_list) if constant else 'ode'
+    elif method not in ['ode', 'expm', 'expm_multiply']:
+        raise ValueError("Invalid propagator method '%s'" % method)
+    elif method != 'ode' and not constant:
+        raise TypeError("The '%s' propagator method requires a constant "
+                        "Hamiltonian and collapse operators" % method)
+
+    if method != 'ode':
+        U, dims = _propagator_expm(H, tlist, c_op_list, method)
+        if len(tlist) == 2:
+            out = Qobj(U[1], dims=dims)
+        else:
+            out = [Qobj(U[k], dims=dims) for k in range(len(tlist))]
+        if return_info:
+            return out, {'method': method,
+                         'solution_time': time.time() - _start}
+        return out
+
+    if options is None:
+        options = Options()
+        options.rhs_reuse = True
+        rhs_clear()
+
     if isinstance(H, (types.FunctionType, types.BuiltinFunctionType,
                       functools.partial)):
         H0 = H(0.0, args)
@@ -114,26 +162,19 @@ def propagator(H, t, c_op_list, args=None, options=None, sparse=False,
         H0 = H
 
     if len(c_op_list) == 0 and H0.isoper:
-        # calculate propagator for the wave function
+        # calculate propagator for the wave function, evolving the basis
+        # states together as one batch
 
         N = H0.shape[0]
         dims = H0.dims
         u = np.zeros([N, N, len(tlist)], dtype=complex)
 
-        progress_bar.start(N)
-        for n in range(0, N):
-            progress_bar.update(n)
-            psi0 = basis(N, n)
-            output = sesolve(H, psi0, tlist, [], args, options)
+        psi0_list = [basis(N, n) for n in range(N)]
+        output = sesolve(H, psi0_list, tlist, [], args, options,
+                         progress_bar)
+        for n in range(N):
             for k, t in enumerate(tlist):
-                u[:, n, k] = output.states[k].full().T
-        progress_bar.finished()
-
-        # todo: evolving a batch of wave functions:
-        # psi_0_list = [basis(N, n) for n in range(N)]
-        # psi_t_list = mesolve(H, psi_0_list, [0, t], [], [], args, options)
-        # for n in range(0, N):
-        #    u[:,n] = psi_t_list[n][1].full().T
+                u[:, n, k] = output[n].states[k].full().ravel()
 
     elif len(c_op_list) == 0 and H0.issuper:
         # calculate the propagator for the vector representation of the
@@ -144,15 +185,12 @@ def propagator(H, t, c_op_list, args=None, options=None, sparse=False,
 
         u = np.zeros([N, N, len(tlist)], dtype=complex)
 
-        progress_bar.start(N)
-        for n in range(0, N):
-            progress_bar.update(n)
-            psi0 = basis(N, n)
-            rho0 = Qobj(vec2mat(psi0.full()))
-            output = mesolve(H, rho0, tlist, [], [], args, options)
+        rho0_list = [Qobj(vec2mat(basis(N, n).full())) for n in range(N)]
+        output = mesolve(H, rho0_list, tlist, [], [], args, options,
+                         progress_bar)
+        for n in range(N):
             for k, t in enumerate(tlist):
-                u[:, n, k] = mat2vec(output.states[k].full()).T
-        progress_bar.finished()
+                u[:, n, k] = mat2vec(output[n].states[k].full()).T
 
     else:
         # calculate the propagator for the vector representation of the
@@ -164,33 +202,105 @@ def propagator(H, t, c_op_list, args=None, options=None, sparse=False,
         u = np.zeros([N * N, N * N, len(tlist)], dtype=complex)
 
         if sparse:
-            progress_bar.start(N * N)
+            rho0_list = []
             for n in range(N * N):
-                progress_bar.update(n)
                 psi0 = basis(N * N, n)
                 psi0.dims = [dims[0], 1]
-                rho0 = vector_to_operator(psi0)
-                output = mesolve(H, rho0, tlist, c_op_list, [], args, options)
+                rho0_list.append(vector_to_operator(psi0))
+            output = mesolve(H, rho0_list, tlist, c_op_list, [], args,
+                             options, progress_bar)
+            for n in range(N * N):
                 for k, t in enumerate(tlist):
                     u[:, n, k] = operator_to_vector(
-                        output.states[k]).full(squeeze=True)
-            progress_bar.finished()
+                        output[n].states[k]).full(squeeze=True)
 
         else:
-            progress_bar.start(N * N)
+            rho0_list = [Qobj(vec2mat(basis(N * N, n).full()))
+                         for n in range(N * N)]
+            output = mesolve(H, rho0_list, tlist, c_op_list, [], args,
+                             options, progress_bar)
             for n in range(N * N):
-                progress_bar.update(n)
-                psi0 = basis(N * N, n)
-                rho0 = Qobj(vec2mat(psi0.full()))
-                output = mesolve(H, rho0, tlist, c_op_list, [], args, options)
                 for k, t in enumerate(tlist):
-                    u[:, n, k] = mat2vec(output.states[k].full()).T
-            progress_bar.finished()
+                    u[:, n, k] = mat2vec(output[n].states[k].full()).T
 
     if len(tlist) == 2:
-        return Qobj(u[:, :, 1], dims=dims)
+        out = Qobj(u[:, :, 1], dims=dims)
+    else:
+        out = [Qobj(u[:, :, k], dims=dims) for k in range(len(tlist))]
+
+    if return_info:
+        return out, {'method': 'ode', 'solution_time': time.time() - _start}
+    return out
+
+
+def _propagator_generator(H, c_op_list):
+    """
+    Generator G of a constant problem, such that U(t) = exp(G t), and the dims
+    of the propagator.
+    """
+    if len(c_op_list) == 0 and H.isoper:
+        return (-1j * H.data).tocsc(), H.dims
+    elif len(c_op_list) == 0 and H.issuper:
+        return H.data.tocsc(), H.dims
+    else:
+        return (liouvillian(H, c_op_list, data_only=True).tocsc(),
+                [H.dims, H.dims])
+
+
+def _propagator_method(H, c_op_list):
+    """
+    Method for the propagator of a constant problem, chosen from the
+    dimension and fill ratio of its generator.
+    """
+    if len(c_op_list) == 0 and (H.isoper or H.issuper):
+        n, nnz = H.shape[0], H.data.nnz
     else:
-        return [Qobj(u[:, :, k], dims=dims) for k in range(len(tlist))]
+        # the liouvillian has about N nnz(H) + sum_c nnz(c)^2 elements
+        n = H.shape[0] ** 2
+        nnz = H.shape[0] * H.data.nnz + sum(c.data.nnz ** 2 + 2 *
+                                             H.shape[0] * c.data.nnz
+                                             for c in c_op_list)
+    if n <= _expm_dense_max or (n <= 4 * _expm_dense_max and
+                                nnz >= _expm_dense_fill * n ** 2):
+        return 'expm'
+    return 'expm_multiply'
+
+
+def _propagator_expm(H, tlist, c_op_list, method):
+    """
+    Propagators U(t - tlist[0]) of a constant problem for all t in tlist,
+    as dense arrays, by exponentiation of the generator.
+    """
+    G, dims = _propagator_generator(H, c_op_list)
+    n = G.shape[0]
+    dt = np.diff(tlist)
+    U = [np.eye(n, dtype=complex)]
+
+    if method == 'expm':
+        # U(t_k) = exp(G dt_k) U(t_{k-1}), exponentiating once per distinct
+        # time step. steps equal up to rounding share a propagator
+        dense = n <= _expm_dense_max or G.nnz >= _expm_dense_fill * n ** 2
+        if dense:
+            G = G.toarray()
+        step_cache = {}
+        for k in range(len(dt)):
+            key = np.round(dt[k], 12)
+            if key not in step_cache:
+                step_cache[key] = (la.expm(G * dt[k]) if dense
+                                   else sp_expm(G * dt[k], sparse=True))
+            U.append(step_cache[key].dot(U[-1]))
+
+    elif len(dt) > 1 and np.allclose(dt, dt[0]):
+        # equally spaced times: one call for the whole tlist
+        U = list(spla.expm_multiply(G, U[0], start=0,
+                                    stop=tlist[-1] - tlist[0],
+                                    num=len(tlist), endpoint=True))
+
+    else:
+        for k in range(len(dt)):
+            U.append(spla.expm_multiply(G * dt[k], U[-1]))
+
+    return [np.asarray(u) for u in U], dims
 
 
 def _get_min_and_index(lst):
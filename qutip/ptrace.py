@@ -35,78 +35,121 @@ __all__ = []
 
 import numpy as np
 import scipy.sparse as sp
-from qutip.sparse import sp_reshape
 
 
 def _ptrace(rho, sel):
     """
     Private function calculating the partial trace.
-    """
 
-    if isinstance(sel, int):
-        sel = np.array([sel])
-    else:
-        sel = np.asarray(sel)
+    Dense data is reshaped to one axis per subsystem and the traced
+    subsystems are contracted with einsum. Sparse data is traced directly on
+    the COO indices of its nonzero elements. Kets are traced without forming
+    the density matrix of the full system.
+    """
+    drho = _flatten_dims(rho.dims[0])
+    sel = _check_sel(sel, len(drho))
+    data = rho._current_data()
 
-    if (sel < 0).any() or (sel >= len(rho.dims[0])).any():
-        raise TypeError("Invalid selection index in ptrace.")
+    if isinstance(data, np.ndarray):
+        rho1_data, rho1_dims = _ptrace_batch(data[np.newaxis], drho, sel)
+        rho1_data = rho1_data[0]
+        M = rho1_data.shape[0]
+        return rho1_data, rho1_dims, [M, M]
 
-    drho = rho.dims[0]
-    N = np.prod(drho)
-    M = np.prod(np.asarray(drho).take(sel))
+    rest = np.setdiff1d(np.arange(len(drho)), sel)
+    dims_kept = np.asarray(drho).take(sel)
+    M = int(np.prod(dims_kept))
+    data = data.tocoo()
 
     if np.prod(rho.dims[1]) == 1:
-        rho = rho * rho.dag()
+        # ket: rho_sel = X X^dag, with X the state as a (sel, rest) matrix
+        isel, irest = _split_index(data.row, drho, sel, rest)
+        X = sp.coo_matrix((data.data, (isel, irest)),
+                          shape=(M, data.shape[0] // M)).tocsr()
+        rho1_data = X * X.conj().T
 
-    perm = sp.lil_matrix((M * M, N * N))
-    # all elements in range(len(drho)) not in sel set
-    rest = np.setdiff1d(np.arange(len(drho)), sel)
-    ilistsel = _select(sel, drho)
-    indsel = _list2ind(ilistsel, drho)
-    ilistrest = _select(rest, drho)
-    indrest = _list2ind(ilistrest, drho)
-    irest = (indrest - 1) * N + indrest - 2
-    # Possibly use parfor here if M > some value ?
-    perm.rows = np.array(
-        [(irest + (indsel[int(np.floor(m / M))] - 1) * N +
-         indsel[int(np.mod(m, M))]).T[0]
-         for m in range(M ** 2)])
-    # perm.data = np.ones_like(perm.rows,dtype=int)
-    perm.data = np.ones_like(perm.rows)
-    perm.tocsr()
-    rhdata = perm * sp_reshape(rho.data, [np.prod(rho.shape), 1])
-    rhdata = rhdata.tolil().reshape((M, M))
-    rho1_data = rhdata.tocsr()
-    dims_kept0 = np.asarray(rho.dims[0]).take(sel)
-    dims_kept1 = np.asarray(rho.dims[0]).take(sel)
-    rho1_dims = [dims_kept0.tolist(), dims_kept1.tolist()]
-    rho1_shape = [np.prod(dims_kept0), np.prod(dims_kept1)]
+    else:
+        row_sel, row_rest = _split_index(data.row, drho, sel, rest)
+        col_sel, col_rest = _split_index(data.col, drho, sel, rest)
+        keep = row_rest == col_rest
+        rho1_data = sp.coo_matrix(
+            (data.data[keep], (row_sel[keep], col_sel[keep])),
+            shape=(M, M)).tocsr()
+
+    rho1_dims = [dims_kept.tolist(), dims_kept.tolist()]
+    rho1_shape = [M, M]
     return rho1_data, rho1_dims, rho1_shape
 
 
-def _list2ind(ilist, dims):
-    """!
-    Private function returning indicies
+def _ptrace_batch(stack, dims, sel):
+    """
+    Private function calculating the partial trace of a stack of kets, of
+    shape (n, N, 1), or of density matrices, of shape (n, N, N), given as a
+    dense array. Returns the reduced density matrices, of shape (n, M, M),
+    and their dims.
+    """
+    dims = _flatten_dims(dims)
+    sel = _check_sel(sel, len(dims))
+    rest = np.setdiff1d(np.arange(len(dims)), sel)
+    dims_kept = np.asarray(dims).take(sel)
+    M = int(np.prod(dims_kept))
+    nstates = stack.shape[0]
+
+    if stack.shape[2] == 1:
+        # kets: rho_sel = X X^dag, with X the state as a (sel, rest) matrix
+        axes = [0] + [k + 1 for k in sel] + [k + 1 for k in rest]
+        X = stack.reshape([nstates] + dims).transpose(axes)
+        X = X.reshape(nstates, M, -1)
+        out = np.matmul(X, X.conj().transpose(0, 2, 1))
+
+    else:
+        n = len(dims)
+        sel = sel.tolist()
+        batch_label = 2 * n
+        row_labels = [batch_label] + list(range(n))
+        col_labels = [k + n if k in sel else k for k in range(n)]
+        out_labels = [batch_label] + sel + [k + n for k in sel]
+        out = np.einsum(stack.reshape([nstates] + dims + dims),
+                        row_labels + col_labels, out_labels)
+        out = out.reshape(nstates, M, M)
+
+    return out, [dims_kept.tolist(), dims_kept.tolist()]
+
+
+def _flatten_dims(dims):
+    """
+    Private function returning the dimensions of the subsystems, with the
+    nested dims of superoperators flattened.
     """
-    ilist = np.asarray(ilist)
-    dims = np.asarray(dims)
-    irev = np.fliplr(ilist) - 1
-    fact = np.append(np.array([1]), (np.cumprod(np.flipud(dims)[:-1])))
-    fact = fact.reshape(len(fact), 1)
-    return np.array(np.sort(np.dot(irev, fact) + 1, 0), dtype=int)
+    return [d for sub in dims
+            for d in (_flatten_dims(sub) if isinstance(sub, list) else [sub])]
 
 
-def _select(sel, dims):
+def _check_sel(sel, nsubsystems):
     """
-    Private function finding selected components
+    Private function validating the selection of a partial trace. Returns
+    the selected subsystems as a sorted array.
     """
-    sel = np.asarray(sel)  # make sure sel is np.array
-    dims = np.asarray(dims)  # make sure dims is np.array
-    rlst = dims.take(sel)
-    rprod = np.prod(rlst)
-    ilist = np.ones((rprod, len(dims)), dtype=int)
-    counter = np.arange(rprod)
-    for k in range(len(sel)):
-        ilist[:, sel[k]] = np.remainder(
-            np.fix(counter / np.prod(dims[sel[k + 1:]])), dims[sel[k]]) + 1
-    return ilist
+    if isinstance(sel, (int, np.integer)):
+        sel = np.array([sel])
+    else:
+        sel = np.asarray(sel)
+
+    if (sel < 0).any() or (sel >= nsubsystems).any():
+        raise TypeError("Invalid selection index in ptrace.")
+
+    return np.unique(sel)
+
+
+def _split_index(ind, dims, sel, rest):
+    """
+    Private function splitting indices of the full space into indices of the
+    selected and of the remaining subsystems.
+    """
+    sub = np.unravel_index(ind, dims)
+    return tuple(
+        np.ravel_multi_index([sub[k] for k in subsystems],
+                             [dims[k] for k in subsystems])
+        if len(subsystems) else np.zeros(len(ind), dtype=int)
+        for subsystems in (sel, rest))
+
@@ -34,12 +34,14 @@
 operators, and related functions.
 """
 
-__all__ = ['Qobj', 'qobj_list_evaluate', 'ptrace', 'dag', 'isequal',
+__all__ = ['Qobj', 'qobj_list_evaluate', 'ptrace', 'ptrace_batch', 'dag',
+           'isequal',
            'issuper', 'isoper', 'isoperket', 'isoperbra', 'isket', 'isbra',
            'isherm', 'shape', 'dims']
 
 import warnings
 import types
+import weakref
 
 try:
     import builtins
@@ -57,7 +59,7 @@ import scipy.sparse as sp
 import scipy.linalg as la
 import qutip.settings as settings
 from qutip import __version__
-from qutip.ptrace import _ptrace
+from qutip.ptrace import _ptrace, _ptrace_batch
 from qutip.permute import _permute
 from qutip.sparse import (sp_eigs, sp_expm, sp_fro_norm, sp_max_norm,
                           sp_one_norm, sp_L2_norm)
@@ -97,6 +99,10 @@ class Qobj(object):
     ----------
     data : array_like
         Sparse matrix characterizing the quantum object.
+    storage : str
+        Storage of the data: 'csr' (sparse) or 'dense'. Data stored as a
+        dense array is converted to CSR format when the `data` attribute is
+        accessed.
     dims : list
         List of dimensions keeping track of the tensor structure.
     shape : list
@@ -163,6 +169,10 @@ class Qobj(object):
         Matrix square root of quantum object.
     tidyup(atol=1e-12)
         Removes small elements from quantum object.
+    to_csr()
+        Returns the quantum object with sparse (CSR) storage.
+    to_dense()
+        Returns the quantum object with dense storage.
     tr()
         Trace of quantum object.
     trans()
@@ -173,6 +183,9 @@ class Qobj(object):
         Returns normalized quantum object.
     """
     __array_priority__ = 100  # sets Qobj priority above numpy arrays
+    # weak reference to the Qobj this one is the adjoint of (set by dag), used
+    # to infer the hermiticity of H + H.dag() and A * A.dag() symbolically
+    _adjoint_of = None
 
     def __init__(self, inpt=None, dims=[[], []], shape=[],
                  type=None, isherm=None, fast=False, superrep=None):
@@ -182,6 +195,8 @@ class Qobj(object):
         self._isherm = None
         self._type = None
         self.superrep = None
+        self._tidyup_pending = False
+        self._csr = None
 
         if fast == 'mc':
             # fast Qobj construction for use in mcsolve with ket output
@@ -200,8 +215,12 @@ class Qobj(object):
         if isinstance(inpt, Qobj):
             # if input is already Qobj then return identical copy
 
-            # make sure matrix is sparse (safety check)
-            self.data = sp.csr_matrix(inpt.data, dtype=complex, copy=True)
+            if inpt.storage == 'dense':
+                self.data = inpt._current_data().copy()
+            else:
+                # make sure matrix is sparse (safety check)
+                self.data = sp.csr_matrix(inpt.data, dtype=complex,
+                                          copy=True)
 
             if not np.any(dims):
                 # Dimensions of quantum object used for keeping track of tensor
@@ -248,7 +267,13 @@ class Qobj(object):
             if inpt.ndim == 1:
                 inpt = inpt[:, np.newaxis]
 
-            self.data = sp.csr_matrix(inpt, dtype=complex, copy=True)
+            if isinstance(inpt, np.ndarray):
+                if _use_dense_storage(inpt):
+                    self.data = np.array(inpt, dtype=complex)
+                else:
+                    self.data = _dense_to_csr(inpt, copy=True)
+            else:
+                self.data = sp.csr_matrix(inpt, dtype=complex, copy=True)
 
             if not np.any(dims):
                 self.dims = [[int(inpt.shape[0])], [int(inpt.shape[1])]]
@@ -286,6 +311,70 @@ class Qobj(object):
         # clear type cache
         self._type = None
 
+    @classmethod
+    def from_csr(cls, data, dims=None, isherm=None, superrep=None,
+                 copy=False):
+        """Creates a quantum object that wraps the given data directly,
+        without the defensive copy and the input checks made by the Qobj
+        constructor. Intended for solvers and other code that produce the
+        data of many quantum objects.
+
+        Parameters
+        ----------
+        data : csr_matrix / ndarray
+            Data of the quantum object. A dense array, such as a state vector
+            returned by an ODE integrator, is kept as dense storage if it is
+            sufficiently filled (see `settings.dense_fill_ratio`), and is
+            otherwise converted directly to CSR format.
+        dims : list
+            Dimensions of the quantum object. Defaults to the shape of
+            `data`.
+        isherm : bool
+            Hermiticity of the quantum object, if known. If None it is
+            computed the first time it is needed.
+        superrep : str
+            Representation of a superoperator, default 'super'.
+        copy : bool {False}
+            Copy the data. If False the quantum object shares its data with
+            the input, which should therefore not be modified afterwards.
+
+        Returns
+        -------
+        oper : qobj
+            Quantum object with the given data.
+
+        """
+        if isinstance(data, np.ndarray):
+            if _use_dense_storage(data):
+                if copy:
+                    data = np.array(data, dtype=complex)
+                else:
+                    data = np.asarray(data, dtype=complex)
+                if data.ndim == 1:
+                    data = data[:, np.newaxis]
+            else:
+                data = _dense_to_csr(data, copy=copy)
+        elif sp.isspmatrix_csr(data):
+            if data.dtype != complex:
+                data = data.astype(complex)
+            elif copy:
+                data = data.copy()
+        else:
+            raise TypeError("Qobj.from_csr requires a csr_matrix or an "
+                            "ndarray, got %s" % builtins.type(data))
+
+        out = cls.__new__(cls)
+        out._isherm = isherm
+        out._type = None
+        out.data = data
+        if dims is None:
+            dims = [[data.shape[0]], [data.shape[1]]]
+        out.dims = dims
+        if superrep is None and out.type == 'super':
+            superrep = 'super'
+        out.superrep = superrep
+        return out
+
     def __add__(self, other):
         """
         ADDITION with Qobj on LEFT [ ex. Qobj+4 ]
@@ -298,52 +387,50 @@ class Qobj(object):
 
         if np.prod(other.shape) == 1 and np.prod(self.shape) != 1:
             # case for scalar quantum object
-            dat = other.data[0, 0]
+            dat = other._data[0, 0]
             if dat == 0:
                 return self
 
             out = Qobj()
 
             if self.type in ['oper', 'super']:
-                out.data = self.data + dat * sp.identity(
-                    self.shape[0], dtype=complex, format='csr')
+                out.data = _data_add_identity(self._data, dat)
             else:
                 out.data = self.data
                 out.data.data = out.data.data + dat
 
             out.dims = self.dims
-            if isinstance(dat, (int, float)):
+            if np.imag(dat) == 0:
                 out._isherm = self._isherm
-            else:
-                out._isherm = out.isherm
+            elif self._isherm:
+                out._isherm = False
 
             out.superrep = self.superrep
 
-            return out.tidyup() if settings.auto_tidyup else out
+            return out._auto_tidyup()
 
         elif np.prod(self.shape) == 1 and np.prod(other.shape) != 1:
             # case for scalar quantum object
-            dat = self.data[0, 0]
+            dat = self._data[0, 0]
             if dat == 0:
                 return other
 
             out = Qobj()
             if other.type in ['oper', 'super']:
-                out.data = dat * sp.identity(other.shape[0], dtype=complex,
-                                             format='csr') + other.data
+                out.data = _data_add_identity(other._data, dat)
             else:
                 out.data = other.data
                 out.data.data = out.data.data + dat
             out.dims = other.dims
 
-            if isinstance(dat, complex):
-                out._isherm = out.isherm
-            else:
-                out._isherm = self._isherm
+            if np.imag(dat) == 0:
+                out._isherm = other._isherm
+            elif other._isherm:
+                out._isherm = False
 
             out.superrep = self.superrep
 
-            return out.tidyup() if settings.auto_tidyup else out
+            return out._auto_tidyup()
 
         elif self.dims != other.dims:
             raise TypeError('Incompatible quantum object dimensions')
@@ -353,15 +440,19 @@ class Qobj(object):
 
         else:  # case for matching quantum objects
             out = Qobj()
-            out.data = self.data + other.data
+            out.data = _data_add(self._data, other._data)
             out.dims = self.dims
 
             if self.type in ['ket', 'bra', 'operator-ket', 'operator-bra']:
                 out._isherm = False
+            elif _are_adjoints(self, other):
+                # H + H.dag()
+                out._isherm = True
             elif self._isherm is None or other._isherm is None:
-                out._isherm = out.isherm
+                # unknown: left to be computed if isherm is ever read
+                out._isherm = None
             elif not self._isherm and not other._isherm:
-                out._isherm = out.isherm
+                out._isherm = None
             else:
                 out._isherm = self._isherm and other._isherm
 
@@ -373,7 +464,7 @@ class Qobj(object):
 
                 out.superrep = self.superrep
 
-            return out.tidyup() if settings.auto_tidyup else out
+            return out._auto_tidyup()
 
     def __radd__(self, other):
         """
@@ -400,7 +491,7 @@ class Qobj(object):
         if isinstance(other, Qobj):
             if self.dims[1] == other.dims[0]:
                 out = Qobj()
-                out.data = self.data * other.data
+                out.data = _data_mul(self._data, other._data)
                 dims = [self.dims[0], other.dims[1]]
                 out.dims = dims
 
@@ -425,7 +516,11 @@ class Qobj(object):
                 else:
                     out.dims = dims
 
-                out._isherm = out.isherm
+                if _are_adjoints(self, other):
+                    # A * A.dag() and A.dag() * A
+                    out._isherm = True
+                elif self is other and self._isherm:
+                    out._isherm = True
 
                 if self.superrep and other.superrep:
                     if self.superrep != other.superrep:
@@ -435,19 +530,19 @@ class Qobj(object):
 
                     out.superrep = self.superrep
 
-                return out.tidyup() if settings.auto_tidyup else out
+                return out._auto_storage()._auto_tidyup()
 
             elif np.prod(self.shape) == 1:
                 out = Qobj(other)
-                out.data *= self.data[0, 0]
+                out.data = out._data * self._data[0, 0]
                 out.superrep = other.superrep
-                return out.tidyup() if settings.auto_tidyup else out
+                return out._auto_tidyup()
 
             elif np.prod(other.shape) == 1:
                 out = Qobj(self)
-                out.data *= other.data[0, 0]
+                out.data = out._data * other._data[0, 0]
                 out.superrep = self.superrep
-                return out.tidyup() if settings.auto_tidyup else out
+                return out._auto_tidyup()
 
             else:
                 raise TypeError("Incompatible Qobj shapes")
@@ -463,15 +558,13 @@ class Qobj(object):
         elif isinstance(other, (int, float, complex,
                                 np.integer, np.floating, np.complexfloating)):
             out = Qobj()
-            out.data = self.data * other
+            out.data = self._data * other
             out.dims = self.dims
             out.superrep = self.superrep
-            if isinstance(other, complex):
-                out._isherm = out.isherm
-            else:
+            if np.imag(other) == 0:
                 out._isherm = self._isherm
 
-            return out.tidyup() if settings.auto_tidyup else out
+            return out._auto_tidyup()
 
         else:
             raise TypeError("Incompatible object for multiplication")
@@ -492,15 +585,13 @@ class Qobj(object):
         if isinstance(other, (int, float, complex,
                               np.integer, np.floating, np.complexfloating)):
             out = Qobj()
-            out.data = other * self.data
+            out.data = other * self._data
             out.dims = self.dims
             out.superrep = self.superrep
-            if isinstance(other, complex):
-                out._isherm = out.isherm
-            else:
+            if np.imag(other) == 0:
                 out._isherm = self._isherm
 
-            return out.tidyup() if settings.auto_tidyup else out
+            return out._auto_tidyup()
 
         else:
             raise TypeError("Incompatible object for multiplication")
@@ -519,16 +610,14 @@ class Qobj(object):
         if isinstance(other, (int, float, complex,
                               np.integer, np.floating, np.complexfloating)):
             out = Qobj()
-            out.data = self.data / other
+            out.data = self._data / other
             out.dims = self.dims
-            if isinstance(other, complex):
-                out._isherm = out.isherm
-            else:
+            if np.imag(other) == 0:
                 out._isherm = self._isherm
 
             out.superrep = self.superrep
 
-            return out.tidyup() if settings.auto_tidyup else out
+            return out._auto_tidyup()
 
         else:
             raise TypeError("Incompatible object for division")
@@ -538,19 +627,25 @@ class Qobj(object):
         NEGATION operation.
         """
         out = Qobj()
-        out.data = -self.data
+        out.data = -self._data
         out.dims = self.dims
         out.superrep = self.superrep
         out._isherm = self._isherm
-        return out.tidyup() if settings.auto_tidyup else out
+        return out._auto_tidyup()
 
     def __getitem__(self, ind):
         """
         GET qobj elements.
         """
-        out = self.data[ind]
+        data = self._current_data()
+        if isinstance(data, np.ndarray):
+            # index with matrix semantics, as for the sparse data
+            data = np.asmatrix(data)
+        out = data[ind]
         if sp.issparse(out):
             return np.asarray(out.todense())
+        elif isinstance(out, np.ndarray):
+            return np.asarray(out)
         else:
             return out
 
@@ -558,11 +653,11 @@ class Qobj(object):
         """
         EQUALITY operator.
         """
-        if (isinstance(other, Qobj) and
-                self.dims == other.dims and
-                not np.any(np.abs((self.data - other.data).data) >
-                           settings.atol)):
-            return True
+        if isinstance(other, Qobj) and self.dims == other.dims:
+            diff = _data_add(self._current_data(), -other._current_data())
+            if sp.issparse(diff):
+                diff = diff.data
+            return not np.any(np.abs(diff) > settings.atol)
         else:
             return False
 
@@ -587,7 +682,7 @@ class Qobj(object):
             data = self.data ** n
             out = Qobj(data, dims=self.dims)
             out.superrep = self.superrep
-            return out.tidyup() if settings.auto_tidyup else out
+            return out._auto_tidyup()
 
         except:
             raise ValueError('Invalid choice of exponent.')
@@ -624,7 +719,7 @@ class Qobj(object):
             # sparse data string representation
             s += str(self.data)
 
-        elif all(np.imag(self.data.data) == 0):
+        elif all(np.imag(_nonzero_values(self._current_data())) == 0):
             s += str(np.real(self.full()))
 
         else:
@@ -640,14 +735,24 @@ class Qobj(object):
 
     def __getstate__(self):
         # defines what happens when Qobj object gets pickled
+        self._current_data()  # apply any pending tidyup before storing
         self.__dict__.update({'qutip_version': __version__[:5]})
-        return self.__dict__
+        state = self.__dict__.copy()
+        # weak references cannot be pickled
+        state.pop('_adjoint_of', None)
+        state.pop('_csr', None)
+        return state
 
     def __setstate__(self, state):
         # defines what happens when loading a pickled Qobj
         if 'qutip_version' in state.keys():
             del state['qutip_version']
+        if 'data' in state.keys():
+            # Qobj pickled before data became a property
+            state['_data'] = state.pop('data')
+            state['_tidyup_pending'] = False
         (self.__dict__).update(state)
+        self._csr = None
 
     def _repr_latex_(self):
         """
@@ -674,7 +779,8 @@ class Qobj(object):
                   ", shape = " + str(shape) +
                   ", type = " + t)
 
-        M, N = self.data.shape
+        data = self._current_data()
+        M, N = data.shape
 
         s += r'\begin{equation*}\left(\begin{array}{*{11}c}'
 
@@ -709,10 +815,10 @@ class Qobj(object):
             # truncated matrix output
             for m in range(5):
                 for n in range(5):
-                    s += _format_element(m, n, self.data[m, n])
+                    s += _format_element(m, n, data[m, n])
                 s += r' & \cdots'
                 for n in range(N - 5, N):
-                    s += _format_element(m, n, self.data[m, n])
+                    s += _format_element(m, n, data[m, n])
                 s += r'\\'
 
             for n in range(5):
@@ -724,39 +830,39 @@ class Qobj(object):
 
             for m in range(M - 5, M):
                 for n in range(5):
-                    s += _format_element(m, n, self.data[m, n])
+                    s += _format_element(m, n, data[m, n])
                 s += r' & \cdots'
                 for n in range(N - 5, N):
-                    s += _format_element(m, n, self.data[m, n])
+                    s += _format_element(m, n, data[m, n])
                 s += r'\\'
 
         elif M > 10 and N == 1:
             # truncated column vector output
             for m in range(5):
-                s += _format_element(m, 0, self.data[m, 0])
+                s += _format_element(m, 0, data[m, 0])
                 s += r'\\'
 
             s += _format_element(m, 0, r'\vdots')
             s += r'\\'
 
             for m in range(M - 5, M):
-                s += _format_element(m, 0, self.data[m, 0])
+                s += _format_element(m, 0, data[m, 0])
                 s += r'\\'
 
         elif M == 1 and N > 10:
             # truncated row vector output
             for n in range(5):
-                s += _format_element(0, n, self.data[0, n])
+                s += _format_element(0, n, data[0, n])
             s += r' & \cdots'
             for n in range(N - 5, N):
-                s += _format_element(0, n, self.data[0, n])
+                s += _format_element(0, n, data[0, n])
             s += r'\\'
 
         else:
             # full output
             for m in range(M):
                 for n in range(N):
-                    s += _format_element(m, n, self.data[m, n])
+                    s += _format_element(m, n, data[m, n])
                 s += r'\\'
 
         s += r'\end{array}\right)\end{equation*}'
@@ -766,16 +872,21 @@ class Qobj(object):
         """Adjoint operator of quantum object.
         """
         out = Qobj()
-        out.data = self.data.T.conj().tocsr()
+        data = self._current_data()
+        if isinstance(data, np.ndarray):
+            out.data = data.T.conj()
+        else:
+            out.data = data.T.conj().tocsr()
         out.dims = [self.dims[1], self.dims[0]]
         out._isherm = self._isherm
+        out._adjoint_of = weakref.ref(self)
         return out
 
     def conj(self):
         """Conjugate operator of quantum object.
         """
         out = Qobj()
-        out.data = self.data.conj()
+        out.data = self._current_data().conj()
         out.dims = [self.dims[0], self.dims[1]]
         return out
 
@@ -817,25 +928,27 @@ class Qobj(object):
         Use sparse only if memory requirements demand it.
 
         """
+        data = self._current_data()
+        dense = isinstance(data, np.ndarray)
         if self.type in ['oper', 'super']:
             if norm is None or norm == 'tr':
-                vals = sp_eigs(self.data, self.isherm, vecs=False,
+                vals = sp_eigs(data, self.isherm, vecs=False,
                                sparse=sparse, tol=tol, maxiter=maxiter)
                 return np.sum(sqrt(abs(vals) ** 2))
             elif norm == 'fro':
-                return sp_fro_norm(self.data)
+                return la.norm(data, 'fro') if dense else sp_fro_norm(data)
             elif norm == 'one':
-                return sp_one_norm(self.data)
+                return la.norm(data, 1) if dense else sp_one_norm(data)
             elif norm == 'max':
-                return sp_max_norm(self.data)
+                return np.max(np.abs(data)) if dense else sp_max_norm(data)
             else:
                 raise ValueError(
                     "For matrices, norm must be 'tr', 'fro', 'one', or 'max'.")
         else:
             if norm is None or norm == 'l2':
-                return sp_L2_norm(self.data)
+                return la.norm(data) if dense else sp_L2_norm(data)
             elif norm == 'max':
-                return sp_max_norm(self.data)
+                return np.max(np.abs(data)) if dense else sp_max_norm(data)
             else:
                 raise ValueError("For vectors, norm must be 'l2', or 'max'.")
 
@@ -849,10 +962,11 @@ class Qobj(object):
             otherwise.
 
         """
+        diagonal = self._current_data().diagonal()
         if self.isherm:
-            return float(np.real(np.sum(self.data.diagonal())))
+            return float(np.real(np.sum(diagonal)))
         else:
-            return complex(np.sum(self.data.diagonal()))
+            return complex(np.sum(diagonal))
 
     def full(self, squeeze=False):
         """Dense array from quantum object.
@@ -863,10 +977,12 @@ class Qobj(object):
             Array of complex data from quantum objects `data` attribute.
 
         """
-        if squeeze:
-            return self.data.toarray().squeeze()
+        data = self._current_data()
+        if isinstance(data, np.ndarray):
+            out = data.copy()
         else:
-            return self.data.toarray()
+            out = data.toarray()
+        return out.squeeze() if squeeze else out
 
     def diag(self):
         """Diagonal elements of quantum object.
@@ -878,7 +994,9 @@ class Qobj(object):
             otherwise ``complex`` values are returned.
 
         """
-        out = self.data.diagonal()
+        out = self._current_data().diagonal()
+        if self.storage == 'dense':
+            out = out.copy()
         if np.any(np.imag(out) > settings.atol) or not self.isherm:
             return out
         else:
@@ -914,7 +1032,10 @@ class Qobj(object):
         if self.dims[0][0] != self.dims[1][0]:
             raise TypeError('Invalid operand for matrix exponential')
 
-        if method == 'dense':
+        if method is None and self.storage == 'dense':
+            F = la.expm(self._current_data())
+
+        elif method == 'dense':
             F = sp_expm(self.data, sparse=False)
 
         elif method == 'sparse':
@@ -990,8 +1111,8 @@ class Qobj(object):
 
         """
         if self.dims[0][0] == self.dims[1][0]:
-            evals, evecs = sp_eigs(self.data, self.isherm, sparse=sparse,
-                                   tol=tol, maxiter=maxiter)
+            evals, evecs = sp_eigs(self._current_data(), self.isherm,
+                                   sparse=sparse, tol=tol, maxiter=maxiter)
             numevals = len(evals)
             dV = sp.spdiags(np.sqrt(evals, dtype=complex), 0, numevals,
                             numevals, format='csr')
@@ -1095,21 +1216,106 @@ class Qobj(object):
         if atol is None:
             atol = settings.auto_tidyup_atol
 
-        if self.data.nnz:
+        data = self._data
+
+        if isinstance(data, np.ndarray):
+            data.real[abs(data.real) < atol] = 0
+            data.imag[abs(data.imag) < atol] = 0
+            self._csr = None
+            return self
+
+        if data.nnz:
 
-            data_real = self.data.data.real
+            data_real = data.data.real
             data_real[abs(data_real) < atol] = 0
 
-            data_imag = self.data.data.imag
+            data_imag = data.data.imag
             data_imag[abs(data_imag) < atol] = 0
 
-            self.data.data = data_real + 1j * data_imag
+            data.data = data_real + 1j * data_imag
 
-            self.data.eliminate_zeros()
+            data.eliminate_zeros()
             return self
         else:
             return self
 
+    def _auto_tidyup(self):
+        """Applies the automatic tidyup to the result of an arithmetic
+        operation, according to the qutip settings. In lazy mode the tidyup
+        is only flagged, and is carried out the first time the data of the
+        quantum object is accessed, so that a chain of operations (such as
+        the term by term construction of a Hamiltonian) is tidied once.
+        """
+        if settings.auto_tidyup:
+            if settings.auto_tidyup_lazy:
+                self._tidyup_pending = True
+            else:
+                self.tidyup()
+        return self
+
+    def _auto_storage(self):
+        """Switches the CSR data of the result of an operation to dense
+        storage if enough of its elements are nonzero, according to the
+        qutip settings.
+        """
+        data = self._data
+        if (settings.auto_dense and sp.issparse(data) and
+                data.nnz >= settings.dense_fill_ratio * np.prod(data.shape)):
+            self.data = data.toarray()
+        return self
+
+    def to_dense(self):
+        """Quantum object with dense storage.
+
+        Returns
+        -------
+        oper : qobj
+            Copy of the quantum object with its data stored as a dense
+            array.
+
+        """
+        out = Qobj()
+        data = self._current_data()
+        if isinstance(data, np.ndarray):
+            out.data = data.copy()
+        else:
+            out.data = data.toarray()
+        out.dims = self.dims
+        out.superrep = self.superrep
+        out._isherm = self._isherm
+        return out
+
+    def to_csr(self):
+        """Quantum object with sparse (CSR) storage.
+
+        Returns
+        -------
+        oper : qobj
+            Copy of the quantum object with its data stored as a
+            csr_matrix.
+
+        """
+        out = Qobj()
+        data = self._current_data()
+        if isinstance(data, np.ndarray):
+            out.data = _dense_to_csr(data, copy=True)
+        else:
+            out.data = data.copy()
+        out.dims = self.dims
+        out.superrep = self.superrep
+        out._isherm = self._isherm
+        return out
+
+    def _current_data(self):
+        """Returns the data in its current storage format, a csr_matrix or
+        an ndarray, after applying any pending tidyup.
+        """
+        if self._tidyup_pending:
+            # deferred tidyup from lazy arithmetic (settings.auto_tidyup_lazy)
+            self._tidyup_pending = False
+            self.tidyup()
+        return self._data
+
     def transform(self, inpt, inverse=False):
         """Basis transform defined by input array.
 
@@ -1293,9 +1499,9 @@ class Qobj(object):
         Use sparse only if memory requirements demand it.
 
         """
-        evals, evecs = sp_eigs(self.data, self.isherm, sparse=sparse,
-                               sort=sort, eigvals=eigvals, tol=tol,
-                               maxiter=maxiter)
+        evals, evecs = sp_eigs(self._current_data(), self.isherm,
+                               sparse=sparse, sort=sort, eigvals=eigvals,
+                               tol=tol, maxiter=maxiter)
         new_dims = [self.dims[0], [1] * len(self.dims[0])]
         ekets = np.array([Qobj(vec, dims=new_dims) for vec in evecs],
                          dtype=object)
@@ -1338,8 +1544,9 @@ class Qobj(object):
         Use sparse only if memory requirements demand it.
 
         """
-        return sp_eigs(self.data, self.isherm, vecs=False, sparse=sparse,
-                       sort=sort, eigvals=eigvals, tol=tol, maxiter=maxiter)
+        return sp_eigs(self._current_data(), self.isherm, vecs=False,
+                       sparse=sparse, sort=sort, eigvals=eigvals, tol=tol,
+                       maxiter=maxiter)
 
     def groundstate(self, sparse=False, tol=0, maxiter=100000):
         """Ground state Eigenvalue and Eigenvector.
@@ -1372,8 +1579,9 @@ class Qobj(object):
         Use sparse only if memory requirements demand it.
 
         """
-        grndval, grndvec = sp_eigs(self.data, self.isherm, sparse=sparse,
-                                   eigvals=1, tol=tol, maxiter=maxiter)
+        grndval, grndvec = sp_eigs(self._current_data(), self.isherm,
+                                   sparse=sparse, eigvals=1, tol=tol,
+                                   maxiter=maxiter)
         new_dims = [self.dims[0], [1] * len(self.dims[0])]
         grndvec = Qobj(grndvec[0], dims=new_dims)
         grndvec = grndvec / grndvec.norm()
@@ -1389,7 +1597,11 @@ class Qobj(object):
 
         """
         out = Qobj()
-        out.data = self.data.T.tocsr()
+        data = self._current_data()
+        if isinstance(data, np.ndarray):
+            out.data = data.T.copy()
+        else:
+            out.data = data.T.tocsr()
         out.dims = [self.dims[1], self.dims[0]]
         return out
 
@@ -1514,6 +1726,40 @@ class Qobj(object):
         else:
             return False
 
+    @property
+    def data(self):
+        data = self._current_data()
+        if isinstance(data, np.ndarray):
+            # the data attribute is always a csr_matrix, so a CSR copy of
+            # dense storage is built when the data is accessed directly, and
+            # kept until the data changes. The copy is read-only, since
+            # writing to it would not change the dense data
+            if self._csr is None:
+                csr = _dense_to_csr(data)
+                for arr in (csr.data, csr.indices, csr.indptr):
+                    arr.flags.writeable = False
+                csr.has_sorted_indices = True
+                self._csr = csr
+            return self._csr
+        return data
+
+    @data.setter
+    def data(self, data):
+        if isinstance(data, np.ndarray):
+            data = np.asarray(data, dtype=complex)
+            if data.ndim == 1:
+                data = data[:, np.newaxis]
+        elif sp.isspmatrix_csr(data) and not data.data.flags.writeable:
+            # such as the read-only CSR copy of dense storage
+            data = data.copy()
+        self._data = data
+        self._csr = None
+        self._tidyup_pending = False
+
+    @property
+    def storage(self):
+        return 'dense' if isinstance(self._data, np.ndarray) else 'csr'
+
     @property
     def isherm(self):
 
@@ -1524,8 +1770,9 @@ class Qobj(object):
         if self.dims[0] != self.dims[1]:
             self._isherm = False
         else:
-            data = self.data
-            h = np.abs((data.transpose().conj() - data).data)
+            data = self._current_data()
+            h = data.transpose().conj() - data
+            h = np.abs(h if isinstance(h, np.ndarray) else h.data)
             self._isherm = False if np.any(h > settings.atol) else True
 
         return self._isherm
@@ -1556,10 +1803,10 @@ class Qobj(object):
 
     @property
     def shape(self):
-        if self.data.shape == (1, 1):
+        if self._data.shape == (1, 1):
             return [np.prod(self.dims[0]), np.prod(self.dims[1])]
         else:
-            return list(self.data.shape)
+            return list(self._data.shape)
 
     @property
     def isbra(self):
@@ -1739,6 +1986,56 @@ def ptrace(Q, sel):
     return Q.ptrace(sel)
 
 
+def ptrace_batch(states, sel, dims=None):
+    """Partial trace of many quantum states at once.
+
+    The states are stacked in dense arrays and traced in a single
+    contraction, instead of one at a time.
+
+    Parameters
+    ----------
+    states : list of qobj / ndarray
+        Kets or density matrices with the same dimensions, or their data
+        stacked in an ndarray of shape (n, N) for kets, or (n, N, N) for
+        density matrices.
+    sel : int/list
+        An ``int`` or ``list`` of components to keep after partial trace.
+    dims : list
+        Dimensions of the components, for example ``[2, 2, 3]``. Required
+        if `states` is an ndarray.
+
+    Returns
+    -------
+    rhos : list of qobj / ndarray
+        Reduced density matrices, or their data as an ndarray of shape
+        (n, M, M) if `states` is an ndarray.
+
+    """
+    if isinstance(states, np.ndarray) and states.dtype != object:
+        if dims is None:
+            raise ValueError("dims is required for an ndarray of states")
+        stack = np.asarray(states, dtype=complex)
+        if stack.ndim == 2:
+            stack = stack[:, :, np.newaxis]
+        return _ptrace_batch(stack, dims, sel)[0]
+
+    states = list(states)
+    if not states:
+        return []
+    if any(not isinstance(q, Qobj) or q.dims != states[0].dims
+           for q in states):
+        raise TypeError("States must be quantum objects with the same dims")
+
+    isherm = True if states[0].isket else None
+    out = []
+    for stack in _state_stacks(states):
+        data, rho_dims = _ptrace_batch(stack, states[0].dims[0], sel)
+        for rho in data:
+            q = Qobj.from_csr(rho, dims=rho_dims, isherm=isherm)
+            out.append(q.tidyup() if settings.auto_tidyup else q)
+    return out
+
+
 def dims(inpt):
     """Returns the dims attribute of a quantum object.
 
@@ -2001,6 +2298,116 @@ def isherm(Q):
     return True if isinstance(Q, Qobj) and Q.isherm else False
 
 
+def _are_adjoints(A, B):
+    """
+    Returns True if one of the two quantum objects was obtained from the
+    other by dag(), without comparing their data.
+    """
+    return ((A._adjoint_of is not None and A._adjoint_of() is B) or
+            (B._adjoint_of is not None and B._adjoint_of() is A))
+
+
+def _use_dense_storage(arr):
+    """
+    Returns True if the dense array should be kept as dense storage, i.e. if
+    the fraction of nonzero elements is at least settings.dense_fill_ratio.
+    """
+    return (settings.auto_dense and
+            np.count_nonzero(arr) >= settings.dense_fill_ratio * arr.size)
+
+
+def _nonzero_values(data):
+    """
+    Returns the stored values of CSR data, or all the values of dense data.
+    """
+    return data.ravel() if isinstance(data, np.ndarray) else data.data
+
+
+def _data_add(A, B):
+    """
+    Sum of the data of two quantum objects. The result is dense if either
+    operand is dense.
+    """
+    if isinstance(A, np.ndarray):
+        return A + (B if isinstance(B, np.ndarray) else B.toarray())
+    elif isinstance(B, np.ndarray):
+        return A.toarray() + B
+    else:
+        return A + B
+
+
+def _data_add_identity(A, alpha):
+    """
+    Adds alpha times the identity to the data of a square quantum object.
+    """
+    if isinstance(A, np.ndarray):
+        out = A.copy()
+        out[np.diag_indices(A.shape[0])] += alpha
+        return out
+    else:
+        return A + alpha * sp.identity(A.shape[0], dtype=complex,
+                                       format='csr')
+
+
+def _data_mul(A, B):
+    """
+    Matrix product of the data of two quantum objects. The result is dense if
+    either operand is dense.
+    """
+    if isinstance(A, np.ndarray):
+        if isinstance(B, np.ndarray):
+            return np.dot(A, B)
+        # dense * sparse, computed as (B^T A^T)^T with the sparse on the left
+        return B.T.dot(A.T).T
+    elif isinstance(B, np.ndarray):
+        return A.dot(B)
+    else:
+        return A * B
+
+
+def _state_stacks(states, max_elements=2 ** 22):
+    """
+    Yields the data of a list of quantum objects with the same shape stacked
+    in dense arrays of shape (n, N, M), in chunks of at most `max_elements`
+    elements, for batched operations.
+    """
+    shape = tuple(states[0].shape)
+    chunk = max(1, max_elements // int(np.prod(shape)))
+    for start in range(0, len(states), chunk):
+        part = states[start:start + chunk]
+        stack = np.empty((len(part),) + shape, dtype=complex)
+        for k, q in enumerate(part):
+            data = q._current_data()
+            stack[k] = data if isinstance(data, np.ndarray) else data.toarray()
+        yield stack
+
+
+def _dense_to_csr(arr, copy=False):
+    """
+    Builds the CSR matrix of a dense array directly from its nonzero
+    elements. A 1D array is taken as a column vector. If all elements are
+    nonzero and `copy` is False, the CSR data shares memory with the array.
+    """
+    arr = np.asarray(arr, dtype=complex)
+    if arr.ndim == 1:
+        arr = arr[:, np.newaxis]
+    nrows, ncols = arr.shape
+    flat = arr.ravel()
+    nz = np.flatnonzero(flat)
+
+    if len(nz) == flat.size:
+        values = flat.copy() if copy else flat
+        indices = np.tile(np.arange(ncols, dtype=np.int32), nrows)
+        indptr = np.arange(0, flat.size + 1, ncols, dtype=np.int32)
+    else:
+        values = flat[nz]
+        indices = (nz % ncols).astype(np.int32)
+        indptr = np.zeros(nrows + 1, dtype=np.int32)
+        np.cumsum(np.bincount(nz // ncols, minlength=nrows), out=indptr[1:])
+
+    return sp.csr_matrix((values, indices, indptr), shape=(nrows, ncols))
+
+
 # TRAILING IMPORTS
 # We do a few imports here to avoid circular dependencies.
 from qutip.eseries import eseries
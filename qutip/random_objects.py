@@ -306,7 +306,8 @@ def rand_dm(N, density=0.75, pure=False, dims=None):
         if tries >= 10:
             raise ValueError(
                 "Requested density is too low to generate density matrix.")
-    H.data.sort_indices()
+    if H.storage == 'csr':
+        H.data.sort_indices()
     if dims:
         return Qobj(H / H.tr(), dims=dims, shape=[N, N])
     else:
@@ -407,3 +407,54 @@ def _td_wrap_array_str(H, c_ops, args, times):
                          "be a dictionary")
 
     return H_new, c_ops_new, args_new
+
+
+def _proj(z):
+    """
+    Projection of a complex number on the Riemann sphere, as cproj in the
+    cython code: infinite numbers are mapped to real infinity.
+    """
+    z = complex(z)
+    if np.isinf(z.real) or np.isinf(z.imag):
+        return complex(np.inf, np.copysign(0.0, z.imag))
+    return z
+
+
+# functions available in list-string format coefficients evaluated in python,
+# as in the cython code generated for them
+_td_str_namespace = {'pi': np.pi, 'abs': np.abs, 'acos': np.arccos,
+                     'acosh': np.arccosh, 'arg': np.angle,
+                     'asin': np.arcsin, 'asinh': np.arcsinh,
+                     'atan': np.arctan, 'atanh': np.arctanh,
+                     'conj': np.conj, 'cos': np.cos, 'cosh': np.cosh,
+                     'exp': np.exp, 'imag': np.imag, 'log': np.log,
+                     'pow': np.power, 'proj': _proj, 'real': np.real,
+                     'sin': np.sin, 'sinh': np.sinh, 'sqrt': np.sqrt,
+                     'tan': np.tan, 'tanh': np.tanh}
+
+
+def _td_coeff_func(coeff, args, rhs_with_state=False):
+    """
+    Coefficient function of the form f(t, state) for a list-function or
+    list-string format coefficient. String coefficients are compiled once and
+    evaluated in python, without cython code generation.
+    """
+    if isinstance(coeff, str):
+        namespace = dict(_td_str_namespace)
+        if args:
+            namespace.update(args)
+        code = compile(coeff, '<string>', 'eval')
+
+        def f(t, state):
+            namespace['t'] = t
+            return eval(code, namespace)
+
+    elif rhs_with_state:
+        def f(t, state):
+            return coeff(t, state, args)
+
+    else:
+        def f(t, state):
+            return coeff(t, args)
+
+    return f
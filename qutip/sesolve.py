@@ -45,10 +45,12 @@ from scipy.linalg import norm
 
 from qutip.qobj import Qobj, isket
 from qutip.rhs_generate import rhs_generate
-from qutip.solver import Result, Options, config
-from qutip.rhs_generate import _td_format_check, _td_wrap_array_str
+from qutip.solver import Result, Options, config, _openmp_threads
+from qutip.rhs_generate import (_td_format_check, _td_wrap_array_str,
+                                _td_coeff_func)
 from qutip.settings import debug
 from qutip.cy.spmatfuncs import (cy_expect_psi, cy_ode_rhs,
+                                 cy_ode_rhs_openmp, cy_ode_rhs_block,
                                  cy_ode_psi_func_td,
                                  cy_ode_psi_func_td_with_state)
 from qutip.cy.codegen import Codegen
@@ -81,8 +83,9 @@ def sesolve(H, rho0, tlist, e_ops, args={}, options=None,
         system Hamiltonian, or a callback function for time-dependent
         Hamiltonians.
 
-    rho0 : :class:`qutip.qobj`
-        initial density matrix or state vector (ket).
+    rho0 : :class:`qutip.qobj` / list
+        initial density matrix or state vector (ket), or a list of kets that
+        are evolved together as one block.
 
     tlist : *list* / *array*
         list of times for :math:`t`.
@@ -108,7 +111,8 @@ def sesolve(H, rho0, tlist, e_ops, args={}, options=None,
         an *array* or state vectors or density matrices corresponding to the
         times in `tlist` [if `e_ops` is an empty list], or
         nothing if a callback function was given inplace of operators for
-        which to calculate the expectation values.
+        which to calculate the expectation values. For a list of initial
+        states, a list with one such instance per initial state.
 
     """
 
@@ -134,6 +138,16 @@ def sesolve(H, rho0, tlist, e_ops, args={}, options=None,
         # reset config time-dependence flags to default values
         config.reset()
 
+    if isinstance(rho0, list):
+        # evolve a batch of initial states together
+        res = _sesolve_batch(H, rho0, tlist, e_ops, args, options,
+                             progress_bar)
+        if e_ops_dict:
+            for output in res:
+                output.expect = {e: output.expect[n]
+                                 for n, e in enumerate(e_ops_dict.keys())}
+        return res
+
     if n_func > 0:
         res = _sesolve_list_func_td(H, rho0, tlist, e_ops, args, options,
                                     progress_bar)
@@ -281,9 +295,14 @@ def _sesolve_const(H, psi0, tlist, e_ops, args, opt, progress_bar):
     # setup integrator.
     #
     initial_vector = psi0.full().ravel()
-    r = scipy.integrate.ode(cy_ode_rhs)
     L = -1.0j * H
-    r.set_f_params(L.data.data, L.data.indices, L.data.indptr)  # cython RHS
+    nthr = _openmp_threads(opt, L.data.nnz)
+    if nthr > 1:
+        r = scipy.integrate.ode(cy_ode_rhs_openmp)
+        r.set_f_params(L.data.data, L.data.indices, L.data.indptr, nthr)
+    else:
+        r = scipy.integrate.ode(cy_ode_rhs)
+        r.set_f_params(L.data.data, L.data.indices, L.data.indptr)
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -580,6 +599,171 @@ def _ode_psi_func_td_with_state(t, psi, H_func, args):
     return -1j * (H * psi)
 
 
+# -----------------------------------------------------------------------------
+# Wave function evolution of a batch of initial states, evolved together as the
+# columns of one block so that the Hamiltonian is read once for all of them.
+#
+def _sesolve_batch(H, psi0_list, tlist, e_ops, args, opt, progress_bar):
+    """
+    Evolve a list of wave functions as a block, for constant hamiltonians and
+    hamiltonians in the list-function or list-string format. Other formats
+    fall back to evolving the states one at a time.
+    """
+
+    if debug:
+        print(inspect.stack()[0][3])
+
+    if len(psi0_list) == 0:
+        return []
+    for psi0 in psi0_list:
+        if not isket(psi0):
+            raise TypeError("The unitary solver requires kets as initial "
+                            "states")
+        if psi0.dims != psi0_list[0].dims:
+            raise TypeError("All initial states must have the same dims")
+
+    if isinstance(H, Qobj):
+        H_list = [H]
+    elif (isinstance(H, list) and not opt.rhs_with_state and
+          all(isinstance(h, Qobj) or
+              (isinstance(h, list) and isinstance(h[0], Qobj))
+              for h in H)):
+        H_list = H
+    else:
+        return [sesolve(H, psi0, tlist, e_ops, args, opt, progress_bar)
+                for psi0 in psi0_list]
+
+    #
+    # collect the constant and time-dependent hamiltonian terms
+    #
+    N = psi0_list[0].shape[0]
+    nvec = len(psi0_list)
+    L_const = 0
+    L_terms = []
+    for h_spec in H_list:
+        if isinstance(h_spec, Qobj):
+            L_const = L_const - 1j * h_spec.data
+        else:
+            L_terms.append((-1j * h_spec[0].data,
+                            _td_coeff_func(h_spec[1], args)))
+
+    #
+    # setup integrator: the states are the columns of a row-major (N, nvec)
+    # block
+    #
+    initial_vector = np.column_stack(
+        [psi0.full().ravel() for psi0 in psi0_list]).ravel()
+    if len(L_terms) == 0:
+        r = scipy.integrate.ode(cy_ode_rhs_block)
+        r.set_f_params(L_const.data, L_const.indices, L_const.indptr, nvec)
+    else:
+        r = scipy.integrate.ode(_ode_psi_block_td)
+        r.set_f_params(N, nvec, L_const, L_terms)
+    r.set_integrator('zvode', method=opt.method, order=opt.order,
+                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
+                     first_step=opt.first_step, min_step=opt.min_step,
+                     max_step=opt.max_step)
+    r.set_initial_value(initial_vector, tlist[0])
+
+    return _generic_ode_solve_batch(r, psi0_list, tlist, e_ops, opt,
+                                    progress_bar)
+
+
+#
+# evaluate dpsi(t)/dt for a block of wave functions, for hamiltonians in the
+# list-function or list-string format
+#
+def _ode_psi_block_td(t, psi, N, nvec, L_const, L_terms):
+    psi_block = psi.reshape((N, nvec))
+    out = L_const * psi_block
+    for L, coeff in L_terms:
+        out = out + coeff(t, psi) * (L * psi_block)
+    return out.ravel()
+
+
+def _generic_ode_solve_batch(r, psi0_list, tlist, e_ops, opt, progress_bar):
+    """
+    Internal function for solving the ODE of a block of wave functions, with
+    one Result per wave function.
+    """
+    n_tsteps = len(tlist)
+    nvec = len(psi0_list)
+    N = psi0_list[0].shape[0]
+    dims = psi0_list[0].dims
+
+    outputs = []
+    for k in range(nvec):
+        output = Result()
+        output.solver = "sesolve"
+        output.times = tlist
+        outputs.append(output)
+
+    if isinstance(e_ops, types.FunctionType):
+        n_expt_op = 0
+        expt_callback = True
+        store_states = opt.store_states
+
+    elif isinstance(e_ops, list):
+        n_expt_op = len(e_ops)
+        expt_callback = False
+        # fall back on storing states if no expectation values are requested
+        store_states = opt.store_states or n_expt_op == 0
+        for output in outputs:
+            output.num_expect = n_expt_op
+            output.expect = [np.zeros(n_tsteps) if op.isherm else
+                             np.zeros(n_tsteps, dtype=complex)
+                             for op in e_ops]
+    else:
+        raise TypeError("Expectation parameter must be a list or a function")
+
+    #
+    # start evolution
+    #
+    progress_bar.start(n_tsteps)
+
+    dt = np.diff(tlist)
+    for t_idx, t in enumerate(tlist):
+        progress_bar.update(t_idx)
+
+        if not r.successful():
+            raise Exception("ODE integration error: Try to increase "
+                            "the allowed number of substeps by increasing "
+                            "the nsteps parameter in the Options class.")
+
+        # normalize each wave function
+        psi = r.y.reshape((N, nvec))
+        psi = psi / np.sqrt(np.sum(abs(psi) ** 2, axis=0))
+        r.set_initial_value(psi.ravel(), r.t)
+
+        if store_states or expt_callback:
+            for k in range(nvec):
+                state = Qobj.from_csr(psi[:, k], dims=dims, copy=True)
+                if store_states:
+                    outputs[k].states.append(state)
+                if expt_callback:
+                    e_ops(t, state)
+
+        for m in range(n_expt_op):
+            values = np.sum(psi.conj() * (e_ops[m].data * psi), axis=0)
+            if e_ops[m].isherm:
+                values = values.real
+            for k in range(nvec):
+                outputs[k].expect[m][t_idx] = values[k]
+
+        if t_idx < n_tsteps - 1:
+            r.integrate(r.t + dt[t_idx])
+
+    progress_bar.finished()
+
+    if opt.store_final_state:
+        psi = r.y.reshape((N, nvec))
+        for k in range(nvec):
+            outputs[k].final_state = Qobj.from_csr(psi[:, k], dims=dims,
+                                                   copy=True)
+
+    return outputs
+
+
 # -----------------------------------------------------------------------------
 # Solve an ODE which solver parameters already setup (r). Calculate the
 # required expectation values or invoke callback function at each time step.
@@ -644,11 +828,11 @@ def _generic_ode_solve(r, psi0, tlist, e_ops, opt, progress_bar,
             r.set_initial_value(data, r.t)
 
         if opt.store_states:
-            output.states.append(Qobj(r.y, dims=dims))
+            output.states.append(Qobj.from_csr(r.y, dims=dims))
 
         if expt_callback:
             # use callback method
-            e_ops(t, Qobj(r.y, dims=psi0.dims))
+            e_ops(t, Qobj.from_csr(r.y, dims=psi0.dims))
 
         for m in range(n_expt_op):
             output.expect[m][t_idx] = cy_expect_psi(e_ops[m].data,
@@ -666,6 +850,6 @@ def _generic_ode_solve(r, psi0, tlist, e_ops, opt, progress_bar,
             pass
 
     if opt.store_final_state:
-        output.final_state = Qobj(r.y)
+        output.final_state = Qobj.from_csr(r.y, dims=dims)
 
     return output
@@ -37,14 +37,27 @@ tidyup functionality, etc.
 from __future__ import absolute_import
 # use auto tidyup
 auto_tidyup = True
+# defer the auto tidyup of arithmetic results until their data is accessed
+auto_tidyup_lazy = False
 # detect hermiticity
 auto_herm = True
+# store the data of quantum objects created from dense arrays, and of
+# products of quantum objects, as dense arrays when at least a fraction
+# dense_fill_ratio of the elements are nonzero
+auto_dense = False
+dense_fill_ratio = 0.5
 # general absolute tolerance
 atol = 1e-12
 # use auto tidyup absolute tolerance
 auto_tidyup_atol = 1e-12
 # number of cpus (set at qutip import)
 num_cpus = 0
+# number of threads used by the multi-threaded sparse matrix-vector kernels
+# (0 = num_cpus, or 1 in the worker processes of parfor and parallel_map),
+# and the minimum number of nonzero elements of a matrix for them to be used
+# instead of the serial kernels
+openmp_threads = 0
+openmp_thresh = 10000
 # flag indicating if fortran module is installed
 fortran = False
 # flag indicating if scikits.umfpack is installed
@@ -78,7 +91,9 @@ def load_rc_file(rc_file):
     Load settings for the qutip RC file, by default .qutiprc in the user's home
     directory.
     """
-    global auto_tidyup, auto_herm, auto_tidyup_atol, num_cpus, debug, atol
+    global auto_tidyup, auto_tidyup_lazy, auto_herm, auto_tidyup_atol
+    global auto_dense, dense_fill_ratio, num_cpus, debug, atol
+    global openmp_threads, openmp_thresh
     global log_handler, colorblind_safe
 
     # Try to pull in configobj to do nicer handling of
@@ -124,8 +139,10 @@ def load_rc_file(rc_file):
     # Now that everything's been validated, we apply the config
     # file to the global settings.
     for config_key in (
-        'auto_tidyup', 'auto_herm', 'atol', 'auto_tidyup_atol',
-        'num_cpus', 'debug', 'log_handler', 'colorblind_safe'
+        'auto_tidyup', 'auto_tidyup_lazy', 'auto_herm', 'atol',
+        'auto_tidyup_atol', 'auto_dense', 'dense_fill_ratio', 'num_cpus',
+        'openmp_threads', 'openmp_thresh', 'debug', 'log_handler',
+        'colorblind_safe'
     ):
         if config_key in config and config_key not in bad_keys:
             _logger.debug(
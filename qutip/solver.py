@@ -36,6 +36,13 @@ __all__ = ['Options', 'Odeoptions', 'Odedata']
 
 import os
 import warnings
+import numpy as np
+from numpy.random import RandomState
+try:
+    from numpy.random import SeedSequence, Generator, Philox
+except ImportError:
+    # numpy < 1.17
+    SeedSequence = None
 from qutip import __version__
 
 
@@ -98,8 +105,11 @@ class Options():
         callback signature.
     rhs_filename : str
         Name for compiled Cython file.
-    seeds : ndarray
-        Array containing random number seeds for mcsolver.
+    seeds : int / ndarray
+        Root seed of the random number streams of the trajectories in mcsolve
+        and the stochastic solvers, from which the stream of each trajectory
+        is derived by its index. An array gives the seed of each trajectory
+        instead.
     store_final_state : bool {False, True}
         Whether or not to store the final state of the evolution in the
         result class.
@@ -108,6 +118,60 @@ class Options():
         result class, even if expectation values operators are given. If no
         expectation are provided, then states are stored by default and this
         option has no effect.
+    openmp_threads : int
+        Number of threads used by the multi-threaded sparse matrix-vector
+        kernels in mesolve and sesolve (0 = qutip.settings.openmp_threads).
+        They are used only for operators with at least
+        qutip.settings.openmp_thresh nonzero elements.
+    matrix_free : bool {False, True}
+        Integrate the master equation in mesolve without forming the
+        Liouvillian superoperator, applying the Hamiltonian and collapse
+        operators directly to the density matrix. Only for Hamiltonians and
+        collapse operators given as operators, in the constant, list-function
+        or list-string formats.
+    stream_average : bool {False, True}
+        Reduce the Monte Carlo trajectories to running sums of the
+        expectation values and density matrices as they complete, instead of
+        keeping every trajectory in memory (mcsolve only). States are then
+        only returned as averaged density matrices, with average_states, and
+        the standard errors of the averaged expectation values are stored in
+        the result.
+    store_trajectories : bool {False, True}
+        Keep the collapse times and operators of each trajectory when
+        stream_average is used.
+    chunk_size : int {0}
+        Number of trajectories sent to a worker process as a single task in
+        mcsolve and the stochastic solvers (0 = chosen from the run time of
+        the first trajectory).
+    target_tol : float {None}
+        Target standard error of the averaged expectation values in mcsolve.
+        When given, trajectories are run in batches until the standard error
+        of every expectation value is below target_tol, or ntraj trajectories
+        have been run. Requires expectation value operators (e_ops). Implies
+        stream_average.
+    shared_memory : bool {False, True}
+        Place the operator arrays of mcsolve and the stochastic solvers in
+        shared memory, which the worker processes attach to instead of
+        receiving copies (see :class:`qutip.parallel.SharedArrays`).
+    mc_integrator : str {'zvode', 'dop853', 'rk45', 'krylov', 'propagator'}
+        Integrator of the no-jump evolution of the mcsolve trajectories.
+        'dop853' and 'rk45' are the explicit Runge-Kutta solvers of
+        scipy.integrate, whose dense output is used to locate the collapses.
+        'krylov' applies the exponential of the effective Hamiltonian to the
+        state, and requires a constant Hamiltonian and collapse operators.
+        'propagator' precomputes the exponentials over the steps of tlist
+        once for all trajectories, which is fastest for small and medium
+        dimensions.
+    compact_states : bool {False, True}
+        Store the state vectors of the mcsolve trajectories in a single
+        complex array of shape (ntraj, ntimes, N), and the collapse times and
+        operators as ragged arrays (see :class:`qutip.solver.TrajectoryStates`
+        and :class:`qutip.solver.RaggedArray`). The states are returned as
+        Qobj only when accessed.
+    states_file : str {None}
+        File in which the array of compact_states is memory-mapped, instead
+        of holding it in memory. Results pickled or saved with qsave refer to
+        the file instead of holding a copy of the states.
 
     """
 
@@ -117,7 +181,12 @@ class Options():
                  num_cpus=0, norm_tol=1e-3, norm_steps=5, rhs_reuse=False,
                  rhs_filename=None, ntraj=500, gui=False, rhs_with_state=False,
                  store_final_state=False, store_states=False, seeds=None,
-                 steady_state_average=False):
+                 steady_state_average=False, matrix_free=False,
+                 openmp_threads=0, stream_average=False,
+                 store_trajectories=False, chunk_size=0,
+                 shared_memory=False, target_tol=None,
+                 mc_integrator='zvode', compact_states=False,
+                 states_file=None):
         # Absolute tolerance (default = 1e-8)
         self.atol = atol
         # Relative tolerance (default = 1e-6)
@@ -169,12 +238,35 @@ class Options():
         self.store_states = store_states
         # average mcsolver density matricies assuming steady state evolution
         self.steady_state_average = steady_state_average
+        # apply operators to the density matrix instead of forming the
+        # Liouvillian (mesolve only)
+        self.matrix_free = matrix_free
+        # Number of threads for the sparse matrix-vector kernels
+        # (0 = qutip.settings.openmp_threads)
+        self.openmp_threads = openmp_threads
+        # reduce trajectories to running averages as they complete
+        # (mcsolve only)
+        self.stream_average = stream_average
+        # keep per-trajectory collapse records when streaming
+        self.store_trajectories = store_trajectories
+        # Number of trajectories per worker task (0 = automatic)
+        self.chunk_size = chunk_size
+        # share operator arrays with the worker processes
+        self.shared_memory = shared_memory
+        # target standard error of the expectation values (mcsolve only)
+        self.target_tol = target_tol
+        # integrator of the no-jump evolution (mcsolve only)
+        self.mc_integrator = mc_integrator
+        # store the trajectory states in one array (mcsolve only)
+        self.compact_states = compact_states
+        # file for a memory-mapped array of compact states
+        self.states_file = states_file
 
     def __str__(self):
         if self.seeds is None:
             seed_length = 0
         else:
-            seed_length = len(self.seeds)
+            seed_length = np.size(self.seeds)
         s = ""
         s += "Options:\n"
         s += "-----------\n"
@@ -188,6 +280,9 @@ class Options():
         s += "max_step:          " + str(self.max_step) + "\n"
         s += "tidy:              " + str(self.tidy) + "\n"
         s += "num_cpus:          " + str(self.num_cpus) + "\n"
+        s += "chunk_size:        " + str(self.chunk_size) + "\n"
+        s += "shared_memory:     " + str(self.shared_memory) + "\n"
+        s += "openmp_threads:    " + str(self.openmp_threads) + "\n"
         s += "norm_tol:          " + str(self.norm_tol) + "\n"
         s += "norm_steps:        " + str(self.norm_steps) + "\n"
         s += "rhs_filename:      " + str(self.rhs_filename) + "\n"
@@ -197,7 +292,11 @@ class Options():
         s += "average_expect:    " + str(self.average_expect) + "\n"
         s += "average_states:    " + str(self.average_states) + "\n"
         s += "ntraj:             " + str(self.ntraj) + "\n"
+        s += "target_tol:        " + str(self.target_tol) + "\n"
+        s += "mc_integrator:     " + str(self.mc_integrator) + "\n"
+        s += "compact_states:    " + str(self.compact_states) + "\n"
         s += "store_states:      " + str(self.store_states) + "\n"
+        s += "stream_average:    " + str(self.stream_average) + "\n"
         s += "store_final_state: " + str(self.store_final_state) + "\n"
 
         return s
@@ -217,6 +316,8 @@ class Result():
         Expectation values (if requested) for simulation.
     states : array
         State of the simulation (density matrix or ket) evaluated at ``times``.
+        A :class:`TrajectoryStates` for Monte Carlo results with
+        ``Options.compact_states``.
     num_expect : int
         Number of expectation value operators in simulation.
     num_collapse : int
@@ -230,6 +331,10 @@ class Result():
     col_which : list
         Which collapse operator was responsible for each collapse in
         ``col_times``. Only for Monte Carlo solver.
+        Both are :class:`RaggedArray` with ``Options.compact_states``.
+    expect_err : list/array
+        Standard error of the averaged expectation values. Only for Monte
+        Carlo solver with ``Options.stream_average``.
 
     """
     def __init__(self):
@@ -243,6 +348,7 @@ class Result():
         self.seeds = None
         self.col_times = None
         self.col_which = None
+        self.expect_err = None
 
     def __str__(self):
         s = "Result object "
@@ -266,6 +372,58 @@ class Result():
     def __repr__(self):
         return self.__str__()
 
+    def expect_from_states(self, e_ops):
+        """Expectation values of operators for the stored states, calculated
+        for all times (and trajectories) together.
+
+        Parameters
+        ----------
+        e_ops : qobj / list
+            Single operator or list of operators.
+
+        Returns
+        -------
+        expect : array / list
+            Array of expectation values at the stored times, or list of such
+            arrays for a list of operators. For Monte Carlo results with the
+            states of each trajectory, the arrays have one row per trajectory.
+
+        """
+        from qutip.expect import expect
+
+        if isinstance(e_ops, list):
+            return [self.expect_from_states(e) for e in e_ops]
+        states = self.states
+        if isinstance(states, TrajectoryStates):
+            return states.expect(e_ops)
+        if isinstance(states, np.ndarray) and states.ndim == 2:
+            return np.array([expect(e_ops, list(traj)) for traj in states])
+        return expect(e_ops, list(states))
+
+    def ptrace_states(self, sel):
+        """Partial trace of the stored states, calculated for all times (and
+        trajectories) together.
+
+        Parameters
+        ----------
+        sel : int/list
+            An ``int`` or ``list`` of components to keep after partial trace.
+
+        Returns
+        -------
+        rhos : list
+            Reduced density matrices at the stored times. For Monte Carlo
+            results with the states of each trajectory, a list of such lists.
+
+        """
+        from qutip.qobj import ptrace_batch
+
+        states = self.states
+        if (isinstance(states, TrajectoryStates) or
+                isinstance(states, np.ndarray) and states.ndim == 2):
+            return [ptrace_batch(list(traj), sel) for traj in states]
+        return ptrace_batch(list(states), sel)
+
     def __getstate__(self):
         # defines what happens when Qobj object gets pickled
         self.__dict__.update({'qutip_version': __version__[:5]})
@@ -278,6 +436,130 @@ class Result():
         (self.__dict__).update(state)
 
 
+class TrajectoryStates():
+    """State vectors of the Monte Carlo trajectories at the output times,
+    stored in a single complex array. Indexing with a trajectory and a time
+    index returns the state as a Qobj ket, which is created when accessed.
+    Indexing with a trajectory returns the list of its states.
+
+    Attributes
+    ----------
+    data : array / memmap
+        Complex array of shape (ntraj, ntimes, N).
+    dims : list
+        Dimensions of the state vectors.
+
+    """
+    def __init__(self, data, dims):
+        self.data = data
+        self.dims = dims
+
+    @property
+    def shape(self):
+        return self.data.shape[:2]
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, key):
+        from qutip.qobj import Qobj
+
+        if isinstance(key, tuple):
+            n, k = key
+            return Qobj.from_csr(self.data[n, k], dims=self.dims, copy=True)
+        return [self[key, k] for k in range(self.data.shape[1])]
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def expect(self, oper):
+        """Expectation values of an operator for all trajectories and
+        times, calculated directly on the array of states.
+
+        Parameters
+        ----------
+        oper : qobj
+            Operator.
+
+        Returns
+        -------
+        expect : array
+            Array of shape (ntraj, ntimes).
+
+        """
+        ntraj, ntimes, N = self.data.shape
+        psi = np.asarray(self.data).reshape(ntraj * ntimes, N)
+        out = np.einsum('ij,ij->i', psi.conj(), oper.data.dot(psi.T).T)
+        if oper.isherm:
+            out = np.real(out)
+        return out.reshape(ntraj, ntimes)
+
+    def __getstate__(self):
+        if isinstance(self.data, np.memmap) and self.data.filename:
+            # a memory-mapped array is stored as its file, and mapped again
+            # when loaded
+            self.data.flush()
+            return {'filename': self.data.filename, 'offset': self.data.offset,
+                    'shape': self.data.shape, 'dims': self.dims}
+        return {'data': np.asarray(self.data), 'dims': self.dims}
+
+    def __setstate__(self, state):
+        if 'filename' in state:
+            state = dict(state)
+            state['data'] = np.memmap(state.pop('filename'), dtype=complex,
+                                      mode='r+', offset=state.pop('offset'),
+                                      shape=state.pop('shape'))
+        self.__dict__.update(state)
+
+
+class RaggedArray():
+    """Records of variable length, such as the collapse times of each Monte
+    Carlo trajectory, stored in one array. The records are the slices of
+    ``values`` between consecutive ``offsets``, and indexing returns a view.
+
+    Attributes
+    ----------
+    offsets : array
+        Start of each record in values, followed by the total length.
+    values : array
+        Concatenated records.
+
+    """
+    def __init__(self, offsets, values):
+        self.offsets = offsets
+        self.values = values
+
+    @classmethod
+    def from_list(cls, records, dtype=float):
+        """Ragged array of a list of one-dimensional arrays."""
+        lengths = [len(rec) for rec in records]
+        offsets = np.zeros(len(records) + 1, dtype=int)
+        np.cumsum(lengths, out=offsets[1:])
+        values = np.zeros(offsets[-1], dtype=dtype)
+        for n, rec in enumerate(records):
+            values[offsets[n]:offsets[n + 1]] = rec
+        return cls(offsets, values)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError("record index out of range")
+        return self.values[self.offsets[n]:self.offsets[n + 1]]
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+
 class SolverConfiguration():
 
     def __init__(self):
@@ -336,6 +618,13 @@ class SolverConfiguration():
         self.c_ops_ind = []     # collapse op indices
         self.c_ops_ptr = []     # collapse op indptrs
         self.c_args = []        # store args for time-dependent collapse func.
+        self.c_coeffs = []      # time-dependent coefficients of collapse ops
+        self.c_coeff_args = None  # args for the collapse coefficients
+        self.c_stack_data = None  # row-wise stacked collapse op data
+        self.c_stack_ind = None   # stacked collapse op indices
+        self.c_stack_ptr = None   # stacked collapse op indptrs
+        self.mc_prop = None       # no-jump propagators over tlist steps
+        self.mc_prop_ind = None   # propagator index of each tlist step
 
         # Norm collapse operator stuff
         self.n_ops_data = []  # norm collapse op data
@@ -357,6 +646,78 @@ class SolverConfiguration():
         self.c_func_args = None
 
 
+def _openmp_threads(opt, nnz):
+    """
+    Number of threads to use in the sparse matrix-vector kernels for an
+    operator with nnz nonzero elements, or 1 if the serial kernels should be
+    used.
+    """
+    import qutip.settings
+
+    if nnz < qutip.settings.openmp_thresh:
+        return 1
+    if opt is not None and opt.openmp_threads:
+        return max(opt.openmp_threads, 1)
+    return max(qutip.settings.openmp_threads or qutip.settings.num_cpus, 1)
+
+
+def _new_seed():
+    """
+    Root seed for the random number streams of a new run of trajectories.
+    """
+    if SeedSequence is not None:
+        return SeedSequence().entropy
+    return int(np.random.randint(0, 2 ** 31 - 1))
+
+
+def _trajectory_rng(seeds, n, stream=0):
+    """
+    Random number generator of trajectory n. For a root seed, the stream of
+    each trajectory is spawned from it by the trajectory index, so that the
+    streams are independent, do not depend on how the trajectories are
+    distributed over processes, and a run can be extended with more
+    trajectories. For an array of seeds, trajectory n is seeded with
+    seeds[n]. A nonzero stream gives an independent substream of the
+    trajectory.
+    """
+    if np.ndim(seeds) == 0:
+        entropy, key = int(seeds), (n,)
+    else:
+        entropy, key = int(seeds[n]), ()
+    if stream:
+        key += (stream,)
+    if SeedSequence is None:
+        words = []
+        while True:
+            words.append(entropy & 0xffffffff)
+            entropy >>= 32
+            if not entropy:
+                break
+        return _LegacyGenerator(words + list(key))
+    return Generator(Philox(SeedSequence(entropy, spawn_key=key)))
+
+
+class _LegacyGenerator(RandomState):
+    """
+    RandomState with the Generator methods used by the solvers, for numpy
+    versions without numpy.random.Generator.
+    """
+    def random(self, size=None):
+        return self.random_sample(size)
+
+    def integers(self, low, high=None, size=None):
+        return self.randint(low, high, size)
+
+
+def _uniform_pairs(rng, block=64):
+    """
+    Pairs of uniform random numbers from rng, drawn in blocks.
+    """
+    while True:
+        for pair in rng.random((block, 2)):
+            yield pair
+
+
 #
 # create a global instance of the SolverConfiguration class
 #
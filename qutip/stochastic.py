@@ -43,15 +43,16 @@ when we work more on optimizing this module for performance and features.
 
 __all__ = ['ssesolve', 'ssepdpsolve', 'smesolve', 'smepdpsolve']
 
+import copy
 import numpy as np
 import scipy.sparse as sp
+import scipy.sparse.linalg as spla
 from scipy.linalg.blas import get_blas_funcs
 try:
     norm = get_blas_funcs("znrm2", dtype=np.float64)
 except:
     from scipy.linalg import norm
 
-from numpy.random import RandomState
 
 from qutip.qobj import Qobj, isket
 from qutip.states import ket2dm
@@ -59,13 +60,18 @@ from qutip.solver import Result
 from qutip.expect import expect, expect_rho_vec
 from qutip.superoperator import (spre, spost, mat2vec, vec2mat,
                                  liouvillian, lindblad_dissipator)
+from qutip.sparse import sp_expm
 from qutip.cy.spmatfuncs import cy_expect_psi_csr, spmv, cy_expect_rho_vec
 from qutip.cy.stochastic import (cy_d1_rho_photocurrent,
-                                 cy_d2_rho_photocurrent)
-from qutip.parallel import serial_map
+                                 cy_d2_rho_photocurrent,
+                                 cy_sse_euler_substeps,
+                                 cy_sme_euler_substeps)
+from qutip.parallel import (serial_map, SharedArrays, _chunk_task,
+                            _map_chunks)
 from qutip.ui.progressbar import TextProgressBar
-from qutip.solver import Options
+from qutip.solver import Options, _new_seed, _trajectory_rng, _uniform_pairs
 from qutip.settings import debug
+import qutip.settings
 
 
 if debug:
@@ -73,6 +79,22 @@ if debug:
     import inspect
     logger = qutip.logging.get_logger()
 
+# drift-implicit and exponential solvers of smesolve, with the kind of
+# propagator of the deterministic part and whether the stochastic increment
+# is of Milstein type
+_drift_propagator_solvers = {'implicit-euler': ('implicit', False),
+                             'implicit-milstein': ('implicit', True),
+                             'exponential-euler': ('exponential', False),
+                             'exponential-milstein': ('exponential', True)}
+
+# largest dimension of the vectorized density matrix for which the exponential
+# solvers precompute exp(L dt): the exponential of the sparse Liouvillian
+# fills in, so above it exp(L dt) rho is computed by expm_multiply instead
+_expm_max_dim = 1024
+
+# methods with compiled Euler-Maruyama kernels, and their ids in the kernels
+_kernel_methods = {'homodyne': 0, 'heterodyne': 1, 'photocurrent': 2}
+
 
 class StochasticSolverOptions:
     """Class of options for stochastic solvers such as
@@ -158,7 +180,10 @@ class StochasticSolverOptions:
         functions.
 
     generate_noise : function
-        Function for generate an array of pre-computed noise signal.
+        Function for generate an array of pre-computed noise signal. The
+        array of a trajectory is generated at once, so unlike the built-in
+        increments, the increments of a custom generator are not drawn
+        lazily.
 
     homogeneous : bool (True)
         Wheter or not the stochastic process is homogenous. Inhomogenous
@@ -167,7 +192,32 @@ class StochasticSolverOptions:
     solver : string
         Name of the solver method to use for solving the stochastic
         equations. Valid values are: 'euler-maruyama', 'fast-euler-maruyama',
-        'milstein', 'fast-milstein', 'platen'.
+        'milstein', 'fast-milstein', 'platen', 'explicit1.5', 'taylor1.5',
+        'implicit-euler', 'implicit-milstein', 'exponential-euler',
+        'exponential-milstein'.
+        The strong order 1.5 solvers 'explicit1.5' (derivative-free, for
+        ssesolve and smesolve) and 'taylor1.5' (smesolve only) support the
+        homodyne and heterodyne methods, and are of order 1.5 for a single
+        stochastic increment. With several increments, their iterated
+        integrals are approximated as for commuting noise, as in the
+        Milstein solvers.
+        The drift-implicit and exponential solvers (smesolve only) integrate
+        the constant deterministic part of the master equation, the
+        Liouvillian and the dissipators of the stochastic collapse operators,
+        with the inverse of 1 - L dt or with exp(L dt), computed once for all
+        the substeps, and the stochastic part with an Euler-Maruyama or a
+        derivative-free Milstein increment. They are stable for stiff
+        Liouvillians with much larger substeps than the explicit solvers.
+
+    tol : float
+        Tolerance for adaptive substeps with the order 1.5 solvers. A
+        substep whose error estimate, the norm of the difference between the
+        order 1.5 update and the embedded order 1 update, is larger than tol
+        is split into two halves, with increments sampled from the Brownian
+        bridge. By default the substeps are fixed.
+
+    max_halvings : int (default 10)
+        Maximum number of times a substep is split in adaptive mode.
 
     method : string ('homodyne', 'heterodyne', 'photocurrent')
         The name of the type of measurement process that give rise to the
@@ -183,11 +233,36 @@ class StochasticSolverOptions:
         :class:`qutip.solver.SolverResult` instance returned by the solver.
 
     noise : array
-        Vector specifying the noise.
+        Vector specifying the noise. The handles of a previous run (see
+        store_noise) can also be given.
+
+    store_noise : bool (default True)
+        Whether or not to store the stochastic increments of the trajectories
+        in the noise attribute of the result. The increments are generated
+        for one time in times at a time, and with store_noise=False the
+        result only holds a :class:`qutip.stochastic.StochasticNoise` handle
+        for each trajectory, which regenerates the increments from the seed
+        of the trajectory. Increments that depend on the state, as in the
+        photocurrent method, can only be recovered by storing them.
+
+    measurement_file : str
+        File to which the measurement records are written as the
+        trajectories proceed, when store_measurement is set. The measurement
+        attribute of the result is then an array memory-mapped to the file,
+        of shape (ntraj, len(times), len(m_ops)), with a last axis of length
+        d2_len if it is larger than one.
 
     normalize : bool (default True)
         Whether or not to normalize the wave function during the evolution.
 
+    ensemble_size : int
+        Number of trajectories evolved together as the columns of one array,
+        so that each substep applies the operators to the whole block at
+        once. The blocks are distributed by map_func like single
+        trajectories. Only used for the built-in methods with the
+        Euler-Maruyama solver. By default the trajectories are evolved one
+        at a time.
+
     options : :class:`qutip.solver.Options`
         Generic solver options.
 
@@ -207,8 +282,9 @@ class StochasticSolverOptions:
                  generate_A_ops=None, generate_noise=None, homogeneous=True,
                  solver=None, method=None, distribution='normal',
                  store_measurement=False, noise=None, normalize=True,
-                 options=None, progress_bar=None, map_func=None,
-                 map_kwargs=None):
+                 ensemble_size=None, store_noise=True, measurement_file=None,
+                 tol=None, max_halvings=10, options=None, progress_bar=None,
+                 map_func=None, map_kwargs=None):
 
         if options is None:
             options = Options()
@@ -235,6 +311,8 @@ class StochasticSolverOptions:
         self.ntraj = ntraj
         self.nsubsteps = nsubsteps
         self.solver = solver
+        self.tol = tol
+        self.max_halvings = max_halvings
         self.method = method
         self.distribution = distribution
         self.homogeneous = homogeneous
@@ -244,8 +322,11 @@ class StochasticSolverOptions:
         self.store_measurement = store_measurement
         self.store_states = options.store_states
         self.noise = noise
+        self.store_noise = store_noise
+        self.measurement_file = measurement_file
         self.args = args
         self.normalize = normalize
+        self.ensemble_size = ensemble_size
 
         self.generate_noise = generate_noise
         self.generate_A_ops = generate_A_ops
@@ -258,6 +339,79 @@ class StochasticSolverOptions:
         self.map_kwargs = map_kwargs if map_kwargs is not None else {}
 
 
+class StochasticNoise:
+    """
+    Handle to the stochastic increments of a trajectory of
+    :func:`qutip.stochastic.ssesolve` or :func:`qutip.stochastic.smesolve`,
+    which regenerates them from the random number stream of the trajectory
+    instead of storing them. The handles are returned in the noise attribute
+    of the result with store_noise=False. A handle can be indexed and used
+    as an array, which regenerates all the increments of the trajectory at
+    each access, or passed back to the solvers in the noise argument.
+
+    Attributes
+    ----------
+
+    seeds : int / array
+        Seeds of the random number streams of the run.
+
+    n : int
+        Index of the trajectory.
+
+    shape : tuple
+        Shape (len(sc_ops), len(times), nsubsteps, d2_len) of the increments
+        drawn for the trajectory.
+
+    dt : float
+        Length of the substeps.
+
+    generate_noise : function
+        Noise generator of the run, if any.
+
+    """
+    def __init__(self, seeds, n, shape, dt, generate_noise=None):
+        self.seeds = seeds
+        self.n = n
+        self.shape = shape
+        self.dt = dt
+        self.generate_noise = generate_noise
+
+    def blocks(self):
+        """
+        Generator of the increments for each time in times, as arrays of
+        shape (len(sc_ops), nsubsteps, d2_len).
+        """
+        return _wiener_blocks(_trajectory_rng(self.seeds, self.n),
+                              self.shape, self.dt, self.generate_noise)
+
+    def full(self):
+        """
+        Array of all the increments of the trajectory.
+        """
+        dW = None
+        for t_idx, block in enumerate(self.blocks()):
+            dW = _store_noise_block(dW, block, t_idx, self.shape[1])
+        return dW
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def dtype(self):
+        return np.dtype(float)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        return self.full()[key]
+
+    def __array__(self, dtype=None, copy=None):
+        dW = self.full()
+        return dW if dtype is None else dW.astype(dtype)
+
+
 def ssesolve(H, psi0, times, sc_ops, e_ops, **kwargs):
     """
     Solve the stochastic Schrödinger equation. Dispatch to specific solvers
@@ -307,6 +461,12 @@ def ssesolve(H, psi0, times, sc_ops, e_ops, **kwargs):
     sso = StochasticSolverOptions(H=H, state0=psi0, times=times,
                                   sc_ops=sc_ops, e_ops=e_ops, **kwargs)
 
+    # the built-in processes with the default operators are integrated with
+    # the compiled Euler-Maruyama kernel
+    use_kernel = (sso.generate_A_ops is None and
+                  (sso.d1 is None or sso.d2 is None) and
+                  (sso.solver == 'euler-maruyama' or sso.solver is None))
+
     if sso.generate_A_ops is None:
         sso.generate_A_ops = _generate_psi_A_ops
 
@@ -355,9 +515,20 @@ def ssesolve(H, psi0, times, sc_ops, e_ops, **kwargs):
 
     if sso.solver == 'euler-maruyama' or sso.solver is None:
         sso.rhs = _rhs_psi_euler_maruyama
+        sso.kernel = _kernel_methods[sso.method] if use_kernel else None
 
     elif sso.solver == 'platen':
         sso.rhs = _rhs_psi_platen
+        sso.kernel = None
+
+    elif sso.solver == 'explicit1.5':
+        if sso.distribution != 'normal':
+            raise Exception("Solver '%s' requires normally distributed " %
+                            sso.solver + "increments.")
+        sso.rhs = _StochasticStep(_psi_explicit15, sso.d2_len, sso.tol,
+                                  sso.max_halvings)
+        sso.generate_noise = _generate_noise_15
+        sso.kernel = None
 
     else:
         raise Exception("Unrecognized solver '%s'." % sso.solver)
@@ -433,6 +604,15 @@ def smesolve(H, rho0, times, c_ops, sc_ops, e_ops, **kwargs):
     sso = StochasticSolverOptions(H=H, state0=rho0, times=times, c_ops=c_ops,
                                   sc_ops=sc_ops, e_ops=e_ops, **kwargs)
 
+    # the built-in processes with the default operators are integrated with
+    # the compiled Euler-Maruyama kernel
+    use_kernel = (sso.generate_A_ops is None and sso.rhs is None and
+                  sso.generate_noise is None and
+                  (sso.d1 is None or sso.d2 is None) and
+                  (sso.solver == 'euler-maruyama' or sso.solver is None))
+    sso.kernel = (_kernel_methods.get(sso.method or 'homodyne')
+                  if use_kernel else None)
+
     if (sso.d1 is None) or (sso.d2 is None):
 
         if sso.method == 'homodyne' or sso.method is None:
@@ -500,6 +680,36 @@ def smesolve(H, rho0, times, c_ops, sc_ops, e_ops, **kwargs):
             sso.rhs = _rhs_rho_euler_homodyne_fast
             sso.generate_A_ops = _generate_A_ops_Euler
 
+        elif sso.solver == 'explicit1.5':
+            if sso.distribution != 'normal':
+                raise Exception("Solver '%s' requires normally distributed " %
+                                sso.solver + "increments.")
+            sso.rhs = _StochasticStep(_rho_explicit15, sso.d2_len, sso.tol,
+                                      sso.max_halvings)
+            sso.generate_noise = _generate_noise_15
+
+        elif sso.solver == 'taylor1.5':
+            if sso.method == 'homodyne' or sso.method is None:
+                sso.generate_A_ops = _generate_A_ops_taylor15
+            elif sso.method == 'heterodyne':
+                sso.generate_A_ops = _generate_A_ops_taylor15_heterodyne
+            else:
+                raise Exception("Solver '%s' does not support method '%s'." %
+                                (sso.solver, sso.method))
+            sso.rhs = _StochasticStep(_rho_taylor15, sso.d2_len, sso.tol,
+                                      sso.max_halvings)
+            sso.generate_noise = _generate_noise_15
+
+        elif sso.solver in _drift_propagator_solvers:
+            kind, milstein = _drift_propagator_solvers[sso.solver]
+            if milstein and sso.distribution != 'normal':
+                raise Exception("Solver '%s' requires normally distributed " %
+                                sso.solver + "increments.")
+            # the built-in dissipators of the homodyne and heterodyne methods
+            # are linear, and integrated with the Liouvillian
+            dissipators = sso.d1 in (d1_rho_homodyne, d1_rho_heterodyne)
+            sso.rhs = _DriftPropagatorStep(kind, milstein, dissipators)
+
         elif sso.solver == 'fast-milstein':
             sso.generate_A_ops = _generate_A_ops_Milstein
             sso.generate_noise = _generate_noise_Milstein
@@ -654,6 +864,205 @@ def smepdpsolve(H, rho0, times, c_ops, e_ops, **kwargs):
     return res
 
 
+# -----------------------------------------------------------------------------
+# Dispatch of trajectories to the map function
+#
+def _map_trajectories(task, sso, progress_bar, ensemble=False):
+    """
+    Internal function for running task(n, sso) for all trajectories through
+    sso.map_func. The trajectories are sent to the workers in chunks, and sso
+    is sent to each worker once. With ensemble, task is run for blocks of
+    sso.ensemble_size trajectories and returns a list of results.
+    """
+    map_kwargs = dict(sso.map_kwargs)
+
+    if sso.map_func is serial_map:
+        num_cpus = 1
+    else:
+        num_cpus = map_kwargs.get('num_cpus', sso.options.num_cpus or
+                                  qutip.settings.num_cpus)
+
+    # root seed of the random number streams of the trajectories
+    sso.seeds = (sso.options.seeds if sso.options.seeds is not None
+                 else _new_seed())
+
+    shared = SharedArrays()
+    if sso.options.shared_memory and num_cpus > 1:
+        # the workers attach to the operators instead of copying them
+        shared.share_attrs(sso, ['H', 'L', 'A_ops', 'state0', 'e_ops',
+                                 's_e_ops', 'm_ops', 's_m_ops'])
+
+    try:
+        trajs = list(range(sso.ntraj))
+        if ensemble:
+            trajs = [trajs[k:k + sso.ensemble_size]
+                     for k in range(0, sso.ntraj, sso.ensemble_size)]
+        parts, _ = _map_chunks(_chunk_task, trajs, (task, sso), sso.map_func,
+                               map_kwargs, num_cpus=num_cpus,
+                               chunk_size=sso.options.chunk_size,
+                               value_size=len if ensemble else None,
+                               progress_bar=progress_bar)
+        results = [result for part in parts for result in part]
+
+    finally:
+        shared.close()
+
+    if ensemble:
+        results = [result for block in results for result in block]
+
+    return results
+
+
+def _stack_csr(ops, N):
+    """
+    Internal function stacking the sparse matrices ops row-wise, for the
+    compiled kernels and the ensemble evolution. Returns a CSR matrix with N
+    columns, with contiguous data and int32 indices.
+    """
+    if ops:
+        M = sp.vstack(ops, format='csr')
+    else:
+        M = sp.csr_matrix((0, N), dtype=complex)
+    return sp.csr_matrix((np.ascontiguousarray(M.data, dtype=complex),
+                          np.ascontiguousarray(M.indices, dtype=np.int32),
+                          np.ascontiguousarray(M.indptr, dtype=np.int32)),
+                         shape=M.shape)
+
+
+# -----------------------------------------------------------------------------
+# Stochastic increments and measurement records of the trajectories
+#
+def _wiener_blocks(rng, shape, dt, generate_noise=None):
+    """
+    Internal generator of the increments drawn from the random number stream
+    rng for each time in times, where shape is the shape (len(A_ops), N_store,
+    N_substeps, d2_len) of all the increments of a trajectory.
+    """
+    if generate_noise:
+        # noise generators draw from the global generator, which is seeded
+        # from the stream of the trajectory
+        np.random.seed(rng.integers(0, 2 ** 32 - 1))
+        noise = generate_noise(shape[0], shape[1], shape[2], shape[3], dt)
+        for t_idx in range(shape[1]):
+            yield noise[:, t_idx]
+    else:
+        block = (shape[0],) + shape[2:]
+        for t_idx in range(shape[1]):
+            yield np.sqrt(dt) * rng.standard_normal(block)
+
+
+def _noise_blocks(sso, n, rng, draw):
+    """
+    Internal generator of the increments of trajectory n for each time in
+    times, drawn lazily from the random number stream rng of the trajectory,
+    or taken from sso.noise. Yields the increments as arrays of shape
+    (len(A_ops), N_substeps, d2_len), with the uniform random numbers for
+    drawing the poisson increments in the compiled kernels if draw, or None.
+    The poisson increments are zero until they are drawn.
+    """
+    shape = (len(sso.A_ops), sso.N_store, sso.N_substeps, sso.d2_len)
+
+    if sso.noise is not None:
+        noise = sso.noise[n]
+        if isinstance(noise, StochasticNoise):
+            blocks = noise.blocks()
+        else:
+            noise = np.asarray(noise, dtype=float)
+            blocks = (noise[:, t_idx] for t_idx in range(sso.N_store))
+        for block in blocks:
+            yield block, None
+
+    elif sso.generate_noise or sso.homogeneous:
+        if not sso.generate_noise and sso.distribution != 'normal':
+            raise TypeError('Unsupported increment distribution for ' +
+                            'homogeneous process.')
+        for block in _wiener_blocks(rng, shape, sso.dt, sso.generate_noise):
+            yield block, None
+
+    else:
+        if sso.distribution != 'poisson':
+            raise TypeError('Unsupported increment distribution for ' +
+                            'inhomogeneous process.')
+        block = (shape[0],) + shape[2:]
+        for t_idx in range(sso.N_store):
+            yield np.zeros(block), rng.random(block) if draw else None
+
+
+def _ensemble_block(blocks):
+    """
+    Internal function stacking the blocks of increments, and of uniform
+    random numbers, of the trajectories of an ensemble.
+    """
+    dW_t = np.array([dW for dW, _ in blocks])
+    if blocks[0][1] is None:
+        return dW_t, None
+    return dW_t, np.array([rand for _, rand in blocks])
+
+
+def _store_noise_block(dW, block, t_idx, N_store):
+    """
+    Internal function storing the block of increments of time index t_idx in
+    the array dW of all the increments of a trajectory, which is allocated
+    if dW is None. Returns dW.
+    """
+    if dW is None:
+        dW = np.zeros((block.shape[0], N_store) + block.shape[1:])
+    dW[:, t_idx] = block
+    return dW
+
+
+def _noise_record(sso, n, dW):
+    """
+    Internal function returning the noise of trajectory n for the result:
+    the stored increments dW if sso.store_noise, else a handle regenerating
+    the increments drawn from the random stream of the trajectory. None if
+    the increments depend on the state or were given in sso.noise.
+    """
+    if sso.store_noise:
+        return dW
+    if sso.noise is None and (sso.generate_noise or sso.homogeneous):
+        return StochasticNoise(sso.seeds, n,
+                               (len(sso.A_ops), sso.N_store,
+                                sso.N_substeps, sso.d2_len),
+                               sso.dt, sso.generate_noise)
+    return None
+
+
+def _measurement_file(sso, n_m, mode):
+    """
+    Internal function opening sso.measurement_file as an array of shape
+    (ntraj, N_store, n_m, d2_len).
+    """
+    return np.memmap(sso.measurement_file, dtype=complex, mode=mode,
+                     shape=(sso.ntraj, sso.N_store, n_m, sso.d2_len))
+
+
+def _measurement_array(sso, trajs, n_m):
+    """
+    Internal function returning the array of shape (len(trajs), N_store, n_m,
+    d2_len) for the measurement records of the consecutive trajectories
+    trajs: a view of the file sink if sso.measurement_file is set.
+    """
+    if sso.store_measurement and sso.measurement_file:
+        sink = _measurement_file(sso, n_m, 'r+')
+        return sink[trajs[0]:trajs[0] + len(trajs)]
+    return np.zeros((len(trajs), sso.N_store, n_m, sso.d2_len),
+                    dtype=complex)
+
+
+def _measurement_result(sso, measurements):
+    """
+    Internal function returning the measurement records of trajectories for
+    the result, or None if they were written to the file sink.
+    """
+    if sso.store_measurement and sso.measurement_file:
+        measurements.flush()
+        return None
+    if sso.d2_len == 1:
+        return measurements.squeeze(axis=-1)
+    return measurements
+
+
 # -----------------------------------------------------------------------------
 # Generic parameterized stochastic Schrodinger equation solver
 #
@@ -681,15 +1090,25 @@ def _ssesolve_generic(sso, options, progress_bar):
     # when evaluating the RHS of stochastic Schrodinger equations
     sso.A_ops = sso.generate_A_ops(sso.sc_ops, sso.H)
 
-    map_kwargs = {'progress_bar': progress_bar}
-    map_kwargs.update(sso.map_kwargs)
-
-    task = _ssesolve_single_trajectory
-    task_args = (sso,)
-    task_kwargs = {}
-
-    results = sso.map_func(task, list(range(sso.ntraj)),
-                           task_args, task_kwargs, **map_kwargs)
+    if sso.kernel is not None:
+        # the operators c and c^dagger c of each stochastic collapse operator
+        N = sso.H.shape[0]
+        sso.kernel_ops = (_stack_csr([sso.H.data], N),
+                          _stack_csr([A[n] for A in sso.A_ops for n in (0, 3)],
+                                     N),
+                          _stack_csr([e.data for e in sso.e_ops], N))
+
+    if sso.store_measurement and sso.measurement_file:
+        # file sink of the measurement records, written by the trajectories
+        _measurement_file(sso, len(sso.m_ops), 'w+').flush()
+
+    if sso.kernel is not None and sso.ensemble_size:
+        results = _map_trajectories(_ssesolve_ensemble, sso, progress_bar,
+                                    ensemble=True)
+    else:
+        results = _map_trajectories(_ssesolve_single_trajectory, sso,
+                                    progress_bar)
+    data.seeds = sso.seeds
 
     for result in results:
         states_list, dW, m, expect, ss = result
@@ -699,6 +1118,11 @@ def _ssesolve_generic(sso, options, progress_bar):
         data.expect += expect
         data.ss += ss
 
+    if sso.store_measurement and sso.measurement_file:
+        data.measurement = _measurement_file(sso, len(sso.m_ops), 'r+')
+        if sso.d2_len == 1:
+            data.measurement = data.measurement.squeeze(axis=-1)
+
     # average density matrices
     if options.average_states and np.any(data.states):
         data.states = [sum([ket2dm(data.states[mm][n])
@@ -739,62 +1163,75 @@ def _ssesolve_single_trajectory(n, sso):
 
     psi_t = sso.state0.full().ravel()
     dims = sso.state0.dims
+    N = len(psi_t)
+
+    # random number stream of trajectory n
+    rng = _trajectory_rng(sso.seeds, n)
+    # the poisson increments are drawn in the kernel, by inversion of
+    # uniform random numbers
+    draw = (sso.kernel is not None and sso.noise is None and
+            not sso.homogeneous)
+    # increments for each time in times, drawn lazily from the stream
+    noise = _noise_blocks(sso, n, rng, draw)
+    # the adaptive substeps of the order 1.5 schemes sample the Brownian
+    # bridge from a substream of the trajectory
+    rhs = (sso.rhs.for_trajectory(_trajectory_rng(sso.seeds, n, stream=1))
+           if isinstance(sso.rhs, _StochasticStep) else sso.rhs)
+    dW = None
+
+    if sso.kernel is not None:
+        H_csr, A_csr, E_csr = sso.kernel_ops
+        work = np.zeros(2 * len(A_ops) * N, dtype=complex)
+        dpsi = np.zeros(N, dtype=complex)
 
-    # reseed the random number generator so that forked
-    # processes do not get the same sequence of random numbers
-    np.random.seed((n+1) * np.random.randint(0, 4294967295 // (sso.ntraj+1)))
+    states_list = []
+    measurements = _measurement_array(sso, [n], len(sso.m_ops))[0]
 
-    if sso.noise is None:
-        if sso.homogeneous:
-            if sso.distribution == 'normal':
-                dW = np.sqrt(dt) * \
-                    np.random.randn(len(A_ops), sso.N_store, sso.N_substeps,
-                                    d2_len)
-            else:
-                raise TypeError('Unsupported increment distribution for ' +
-                                'homogeneous process.')
-        else:
-            if sso.distribution != 'poisson':
-                raise TypeError('Unsupported increment distribution for ' +
-                                'inhomogeneous process.')
+    for t_idx, t in enumerate(times):
 
-            dW = np.zeros((len(A_ops), sso.N_store, sso.N_substeps, d2_len))
-    else:
-        dW = sso.noise[n]
+        dW_t, rand_t = next(noise)
 
-    states_list = []
-    measurements = np.zeros((len(times), len(sso.m_ops), d2_len),
-                            dtype=complex)
+        if not e_ops:
+            states_list.append(Qobj.from_csr(psi_t, dims=dims, copy=True))
 
-    for t_idx, t in enumerate(times):
+        if sso.kernel is not None:
+            # expectation values and all the substeps to the next time
+            cy_sse_euler_substeps(sso.kernel,
+                                  H_csr.data, H_csr.indices, H_csr.indptr,
+                                  A_csr.data, A_csr.indices, A_csr.indptr,
+                                  len(A_ops),
+                                  E_csr.data, E_csr.indices, E_csr.indptr,
+                                  len(e_ops),
+                                  psi_t, dW_t,
+                                  rand_t if draw else dW_t,
+                                  expect[:, t_idx], ss[:, t_idx], dt,
+                                  sso.normalize, draw, work, dpsi)
 
-        if e_ops:
+        else:
             for e_idx, e in enumerate(e_ops):
                 s = cy_expect_psi_csr(e.data.data,
                                       e.data.indices,
                                       e.data.indptr, psi_t, 0)
                 expect[e_idx, t_idx] += s
                 ss[e_idx, t_idx] += s ** 2
-        else:
-            states_list.append(Qobj(psi_t, dims=dims))
 
-        for j in range(sso.N_substeps):
+            for j in range(sso.N_substeps):
 
-            if sso.noise is None and not sso.homogeneous:
-                for a_idx, A in enumerate(A_ops):
-                    # dw_expect = norm(spmv(A[0], psi_t)) ** 2 * dt
-                    dw_expect = cy_expect_psi_csr(A[3].data,
-                                                  A[3].indices,
-                                                  A[3].indptr, psi_t, 1) * dt
-                    dW[a_idx, t_idx, j, :] = np.random.poisson(dw_expect,
-                                                               d2_len)
+                if sso.noise is None and not sso.homogeneous:
+                    for a_idx, A in enumerate(A_ops):
+                        # dw_expect = norm(spmv(A[0], psi_t)) ** 2 * dt
+                        dw_expect = cy_expect_psi_csr(A[3].data,
+                                                      A[3].indices,
+                                                      A[3].indptr,
+                                                      psi_t, 1) * dt
+                        dW_t[a_idx, j, :] = rng.poisson(dw_expect, d2_len)
 
-            psi_t = sso.rhs(H_data, psi_t, t + dt * j,
-                            A_ops, dt, dW[:, t_idx, j, :], d1, d2, sso.args)
+                psi_t = rhs(H_data, psi_t, t + dt * j, A_ops, dt,
+                            dW_t[:, j, :], d1, d2, sso.args)
 
-            # optionally renormalize the wave function
-            if sso.normalize:
-                psi_t /= norm(psi_t)
+                # optionally renormalize the wave function
+                if sso.normalize:
+                    psi_t /= norm(psi_t)
 
         if sso.store_measurement:
             for m_idx, m in enumerate(sso.m_ops):
@@ -808,14 +1245,153 @@ def _ssesolve_single_trajectory(n, sso):
                     else:
                         m_expt = 0
                     mm = (m_expt + dW_factor *
-                          dW[m_idx, t_idx, :, dW_idx].sum() /
+                          dW_t[m_idx, :, dW_idx].sum() /
                           (dt * sso.N_substeps))
                     measurements[t_idx, m_idx, dW_idx] = mm
 
-    if d2_len == 1:
-        measurements = measurements.squeeze(axis=(2))
+        if sso.store_noise:
+            dW = _store_noise_block(dW, dW_t, t_idx, sso.N_store)
+
+    measurements = _measurement_result(sso, measurements)
+
+    return (states_list, _noise_record(sso, n, dW), measurements,
+            expect, ss)
+
+
+def _poisson_inverse(lam, u):
+    """
+    Internal function returning poisson distributed numbers with means lam,
+    by inversion of the cumulative distribution at the uniform random
+    numbers u, as in the compiled kernels.
+    """
+    k = np.zeros(np.shape(u))
+    lam = lam * np.ones(np.shape(u))
+    logp = -lam
+    p = np.exp(logp)
+    cdf = p.copy()
+    more = (u > cdf) & ((k < lam) | (p > 0))
+    while np.any(more):
+        k[more] += 1
+        logp[more] += np.log(lam[more] / k[more])
+        p[more] = np.exp(logp[more])
+        cdf[more] += p[more]
+        more = (u > cdf) & ((k < lam) | (p > 0))
+    return k
+
+
+def _ssesolve_ensemble(trajs, sso):
+    """
+    Internal function evolving the trajectories trajs together, with the
+    states as the columns of one array. Returns the results of the
+    trajectories as _ssesolve_single_trajectory. See ssesolve.
+    """
+    dt = sso.dt
+    times = sso.times
+    e_ops = sso.e_ops
+    n_sc = len(sso.A_ops)
+    H, A, E = sso.kernel_ops
+    K = len(trajs)
+
+    psi0 = sso.state0.full().ravel()
+    dims = sso.state0.dims
+    N = len(psi0)
+    psi_t = np.tile(psi0[:, np.newaxis], (1, K))
+
+    expect = np.zeros((K, len(e_ops), sso.N_store), dtype=complex)
+    ss = np.zeros((K, len(e_ops), sso.N_store), dtype=complex)
+
+    # increments of the trajectories, drawn from their random streams as
+    # in _ssesolve_single_trajectory
+    draw = sso.noise is None and not sso.homogeneous
+    noise = [_noise_blocks(sso, n, _trajectory_rng(sso.seeds, n), draw)
+             for n in trajs]
+    dW = [None] * K
+
+    states_list = [[] for _ in trajs]
+    measurements = _measurement_array(sso, trajs, len(sso.m_ops))
+
+    for t_idx, t in enumerate(times):
+
+        dW_t, rand_t = _ensemble_block([next(blocks) for blocks in noise])
+
+        if e_ops:
+            e_psi = (E * psi_t).reshape(len(e_ops), N, K)
+            s = np.sum(psi_t.conj() * e_psi, axis=1).T
+            expect[:, :, t_idx] += s
+            ss[:, :, t_idx] += s ** 2
+        else:
+            for k in range(K):
+                states_list[k].append(Qobj.from_csr(psi_t[:, k], dims=dims,
+                                                    copy=True))
+
+        for j in range(sso.N_substeps):
+
+            dpsi = (-1.0j * dt) * (H * psi_t)
+            a_psi = (A * psi_t).reshape(n_sc, 2, N, K)
+
+            for a_idx in range(n_sc):
+                c_psi, n_psi = a_psi[a_idx]
+                # increments of the trajectories, a view of dW_t
+                dw = dW_t[:, a_idx, j, :].T
+                ec = np.sum(psi_t.conj() * c_psi, axis=0)
 
-    return states_list, dW, measurements, expect, ss
+                if sso.kernel == _kernel_methods['homodyne']:
+                    e1 = 2 * ec.real
+                    dpsi += 0.5 * (e1 * c_psi - n_psi -
+                                   0.25 * e1 ** 2 * psi_t) * dt
+                    dpsi += (c_psi - 0.5 * e1 * psi_t) * dw[0]
+
+                elif sso.kernel == _kernel_methods['heterodyne']:
+                    dpsi += (-0.5 * n_psi + 0.5 * ec.conj() * c_psi -
+                             0.25 * ec * ec.conj() * psi_t) * dt
+                    dpsi += np.sqrt(0.5) * (c_psi - ec.real * psi_t) * dw[0]
+                    dpsi -= 1.0j * np.sqrt(0.5) * \
+                        (c_psi - 1.0j * ec.imag * psi_t) * dw[1]
+
+                else:
+                    n1 = np.sum(abs(c_psi) ** 2, axis=0)
+                    if draw:
+                        dw[0] = _poisson_inverse(n1 * dt,
+                                                 rand_t[:, a_idx, j, 0])
+                    nrm = np.sqrt(n1)
+                    d2 = np.where(nrm != 0,
+                                  c_psi / np.where(nrm != 0, nrm, 1) - psi_t,
+                                  -psi_t)
+                    dpsi += -0.5 * (n_psi - n1 * psi_t) * dt + d2 * dw[0]
+
+            psi_t = psi_t + dpsi
+
+            # optionally renormalize the wave functions
+            if sso.normalize:
+                psi_t /= np.sqrt(np.sum(abs(psi_t) ** 2, axis=0))
+
+        if sso.store_measurement:
+            for k in range(K):
+                for m_idx, m in enumerate(sso.m_ops):
+                    for dW_idx, dW_factor in enumerate(sso.dW_factors):
+                        if m[dW_idx]:
+                            m_data = m[dW_idx].data
+                            m_expt = cy_expect_psi_csr(
+                                m_data.data, m_data.indices, m_data.indptr,
+                                np.ascontiguousarray(psi_t[:, k]), 0)
+                        else:
+                            m_expt = 0
+                        mm = (m_expt + dW_factor *
+                              dW_t[k, m_idx, :, dW_idx].sum() /
+                              (dt * sso.N_substeps))
+                        measurements[k, t_idx, m_idx, dW_idx] = mm
+
+        if sso.store_noise:
+            for k in range(K):
+                dW[k] = _store_noise_block(dW[k], dW_t[k], t_idx,
+                                           sso.N_store)
+
+    measurements = _measurement_result(sso, measurements)
+
+    return [(states_list[k], _noise_record(sso, n, dW[k]),
+             None if measurements is None else measurements[k],
+             expect[k], ss[k])
+            for k, n in enumerate(trajs)]
 
 
 # -----------------------------------------------------------------------------
@@ -859,15 +1435,33 @@ def _smesolve_generic(sso, options, progress_bar):
         sso.s_m_ops = [[spre(c) for _ in range(sso.d2_len)]
                        for c in sso.sc_ops]
 
-    map_kwargs = {'progress_bar': progress_bar}
-    map_kwargs.update(sso.map_kwargs)
-
-    task = _smesolve_single_trajectory
-    task_args = (sso,)
-    task_kwargs = {}
-
-    results = sso.map_func(task, list(range(sso.ntraj)),
-                           task_args, task_kwargs, **map_kwargs)
+    if sso.kernel is not None:
+        # the superoperators of each stochastic collapse operator used by
+        # the kernel of the method
+        if sso.kernel == _kernel_methods['photocurrent']:
+            blocks = [[A[4] + A[5], A[6]] for A in sso.A_ops]
+        elif sso.kernel == _kernel_methods['heterodyne']:
+            blocks = [[A[7], A[0] + A[3], A[0] - A[3]] for A in sso.A_ops]
+        else:
+            blocks = [[A[7], A[0] + A[3]] for A in sso.A_ops]
+        M = sso.L.shape[0]
+        sso.kernel_blocks = len(blocks[0]) if blocks else 0
+        sso.kernel_ops = (_stack_csr([sso.L.data], M),
+                          _stack_csr([B for block in blocks for B in block],
+                                     M),
+                          _stack_csr([e.data for e in sso.s_e_ops], M))
+
+    if sso.store_measurement and sso.measurement_file:
+        # file sink of the measurement records, written by the trajectories
+        _measurement_file(sso, len(sso.s_m_ops), 'w+').flush()
+
+    if sso.kernel is not None and sso.ensemble_size:
+        results = _map_trajectories(_smesolve_ensemble, sso, progress_bar,
+                                    ensemble=True)
+    else:
+        results = _map_trajectories(_smesolve_single_trajectory, sso,
+                                    progress_bar)
+    data.seeds = sso.seeds
 
     for result in results:
         states_list, dW, m, expect, ss = result
@@ -877,6 +1471,11 @@ def _smesolve_generic(sso, options, progress_bar):
         data.expect += expect
         data.ss += ss
 
+    if sso.store_measurement and sso.measurement_file:
+        data.measurement = _measurement_file(sso, len(sso.s_m_ops), 'r+')
+        if sso.d2_len == 1:
+            data.measurement = data.measurement.squeeze(axis=-1)
+
     # average density matrices
     if options.average_states and np.any(data.states):
         data.states = [sum([data.states[mm][n] for mm in range(nt)]).unit()
@@ -918,60 +1517,69 @@ def _smesolve_single_trajectory(n, sso):
     expect = np.zeros((len(sso.e_ops), sso.N_store), dtype=complex)
     ss = np.zeros((len(sso.e_ops), sso.N_store), dtype=complex)
 
-    # reseed the random number generator so that forked
-    # processes do not get the same sequence of random numbers
-    np.random.seed((n+1) * np.random.randint(0, 4294967295 // (sso.ntraj+1)))
-
-    if sso.noise is None:
-        if sso.generate_noise:
-            dW = sso.generate_noise(len(A_ops), N_store, N_substeps,
-                                    sso.d2_len, dt)
-        elif sso.homogeneous:
-            if sso.distribution == 'normal':
-                dW = np.sqrt(dt) * np.random.randn(len(A_ops), N_store,
-                                                   N_substeps, d2_len)
-            else:
-                raise TypeError('Unsupported increment distribution for ' +
-                                'homogeneous process.')
-        else:
-            if sso.distribution != 'poisson':
-                raise TypeError('Unsupported increment distribution for ' +
-                                'inhomogeneous process.')
-
-            dW = np.zeros((len(A_ops), N_store, N_substeps, d2_len))
-    else:
-        dW = sso.noise[n]
+    # random number stream of trajectory n
+    rng = _trajectory_rng(sso.seeds, n)
+    # the poisson increments are drawn in the kernel, by inversion of
+    # uniform random numbers
+    draw = (sso.kernel is not None and sso.noise is None and
+            not sso.homogeneous)
+    # increments for each time in times, drawn lazily from the stream
+    noise = _noise_blocks(sso, n, rng, draw)
+    # the adaptive substeps of the order 1.5 schemes sample the Brownian
+    # bridge from a substream of the trajectory
+    rhs = (sso.rhs.for_trajectory(_trajectory_rng(sso.seeds, n, stream=1))
+           if isinstance(sso.rhs, _StochasticStep) else sso.rhs)
+    dW = None
+
+    if sso.kernel is not None:
+        L_csr, A_csr, E_csr = sso.kernel_ops
+        work = np.zeros(sso.kernel_blocks * len(A_ops) * len(rho_t),
+                        dtype=complex)
+        drho = np.zeros(len(rho_t), dtype=complex)
 
     states_list = []
-    measurements = np.zeros((len(times), len(sso.s_m_ops), d2_len),
-                            dtype=complex)
+    measurements = _measurement_array(sso, [n], len(sso.s_m_ops))[0]
 
     for t_idx, t in enumerate(times):
 
-        if sso.s_e_ops:
-            for e_idx, e in enumerate(sso.s_e_ops):
-                s = cy_expect_rho_vec(e.data, rho_t, 0)
-                expect[e_idx, t_idx] += s
-                ss[e_idx, t_idx] += s ** 2
+        dW_t, rand_t = next(noise)
 
         if sso.store_states or not sso.s_e_ops:
-            states_list.append(Qobj(vec2mat(rho_t), dims=dims))
+            states_list.append(Qobj.from_csr(vec2mat(rho_t), dims=dims,
+                                             copy=True))
 
         rho_prev = np.copy(rho_t)
 
-        for j in range(N_substeps):
+        if sso.kernel is not None:
+            # expectation values and all the substeps to the next time
+            cy_sme_euler_substeps(sso.kernel,
+                                  L_csr.data, L_csr.indices, L_csr.indptr,
+                                  A_csr.data, A_csr.indices, A_csr.indptr,
+                                  len(A_ops), sso.kernel_blocks,
+                                  E_csr.data, E_csr.indices, E_csr.indptr,
+                                  len(sso.s_e_ops), rho_t, dW_t,
+                                  rand_t if draw else dW_t,
+                                  expect[:, t_idx], ss[:, t_idx], dt, draw,
+                                  work, drho)
 
-            if sso.noise is None and not sso.homogeneous:
-                for a_idx, A in enumerate(A_ops):
-                    dw_expect = cy_expect_rho_vec(A[4], rho_t, 1) * dt
-                    if dw_expect > 0:
-                        dW[a_idx, t_idx, j, :] = np.random.poisson(dw_expect,
-                                                                   d2_len)
-                    else:
-                        dW[a_idx, t_idx, j, :] = np.zeros(d2_len)
+        else:
+            for e_idx, e in enumerate(sso.s_e_ops):
+                s = cy_expect_rho_vec(e.data, rho_t, 0)
+                expect[e_idx, t_idx] += s
+                ss[e_idx, t_idx] += s ** 2
 
-            rho_t = sso.rhs(L_data, rho_t, t + dt * j,
-                            A_ops, dt, dW[:, t_idx, j, :], d1, d2, sso.args)
+            for j in range(N_substeps):
+
+                if sso.noise is None and not sso.homogeneous:
+                    for a_idx, A in enumerate(A_ops):
+                        dw_expect = cy_expect_rho_vec(A[4], rho_t, 1) * dt
+                        if dw_expect > 0:
+                            dW_t[a_idx, j, :] = rng.poisson(dw_expect, d2_len)
+                        else:
+                            dW_t[a_idx, j, :] = np.zeros(d2_len)
+
+                rho_t = rhs(L_data, rho_t, t + dt * j, A_ops, dt,
+                            dW_t[:, j, :], d1, d2, sso.args)
 
         if sso.store_measurement:
             for m_idx, m in enumerate(sso.s_m_ops):
@@ -981,12 +1589,130 @@ def _smesolve_single_trajectory(n, sso):
                     else:
                         m_expt = 0
                     measurements[t_idx, m_idx, dW_idx] = m_expt + dW_factor * \
-                        dW[m_idx, t_idx, :, dW_idx].sum() / (dt * N_substeps)
+                        dW_t[m_idx, :, dW_idx].sum() / (dt * N_substeps)
+
+        if sso.store_noise:
+            dW = _store_noise_block(dW, dW_t, t_idx, N_store)
+
+    measurements = _measurement_result(sso, measurements)
 
-    if d2_len == 1:
-        measurements = measurements.squeeze(axis=(2))
+    return (states_list, _noise_record(sso, n, dW), measurements,
+            expect, ss)
 
-    return states_list, dW, measurements, expect, ss
+
+def _smesolve_ensemble(trajs, sso):
+    """
+    Internal function evolving the trajectories trajs together, with the
+    density matrices in vector form as the columns of one array. Returns the
+    results of the trajectories as _smesolve_single_trajectory. See
+    smesolve.
+    """
+    dt = sso.dt
+    times = sso.times
+    n_sc = len(sso.A_ops)
+    n_e = len(sso.s_e_ops)
+    L, A, E = sso.kernel_ops
+    K = len(trajs)
+
+    rho0 = mat2vec(sso.state0.full()).ravel()
+    dims = sso.state0.dims
+    M = len(rho0)
+    # indices of the diagonal elements, for the traces
+    diag = np.arange(sso.state0.shape[0]) * (sso.state0.shape[0] + 1)
+    rho_t = np.tile(rho0[:, np.newaxis], (1, K))
+
+    expect = np.zeros((K, n_e, sso.N_store), dtype=complex)
+    ss = np.zeros((K, n_e, sso.N_store), dtype=complex)
+
+    # increments of the trajectories, drawn from their random streams as
+    # in _smesolve_single_trajectory
+    draw = sso.noise is None and not sso.homogeneous
+    noise = [_noise_blocks(sso, n, _trajectory_rng(sso.seeds, n), draw)
+             for n in trajs]
+    dW = [None] * K
+
+    states_list = [[] for _ in trajs]
+    measurements = _measurement_array(sso, trajs, len(sso.s_m_ops))
+
+    for t_idx, t in enumerate(times):
+
+        dW_t, rand_t = _ensemble_block([next(blocks) for blocks in noise])
+
+        if n_e:
+            s = (E * rho_t).reshape(n_e, M, K)[:, diag, :].sum(axis=1).T
+            expect[:, :, t_idx] += s
+            ss[:, :, t_idx] += s ** 2
+
+        if sso.store_states or not n_e:
+            for k in range(K):
+                states_list[k].append(Qobj.from_csr(vec2mat(rho_t[:, k]),
+                                                    dims=dims, copy=True))
+
+        rho_prev = np.copy(rho_t)
+
+        for j in range(sso.N_substeps):
+
+            drho = (L * rho_t) * dt
+            a_rho = (A * rho_t).reshape(n_sc, sso.kernel_blocks, M, K)
+            tr = a_rho[:, :, diag, :].sum(axis=2)
+
+            for a_idx in range(n_sc):
+                # increments of the trajectories, a view of dW_t
+                dw = dW_t[:, a_idx, j, :].T
+
+                if sso.kernel == _kernel_methods['homodyne']:
+                    d_rho, m_rho = a_rho[a_idx]
+                    e1 = tr[a_idx, 1]
+                    drho += d_rho * dt + (m_rho - e1 * rho_t) * dw[0]
+
+                elif sso.kernel == _kernel_methods['heterodyne']:
+                    d_rho, m1_rho, m2_rho = a_rho[a_idx]
+                    e1, e2 = tr[a_idx, 1], tr[a_idx, 2]
+                    drho += d_rho * dt
+                    drho += np.sqrt(0.5) * (m1_rho - e1 * rho_t) * dw[0]
+                    drho -= 1.0j * np.sqrt(0.5) * \
+                        (m2_rho - e2 * rho_t) * dw[1]
+
+                else:
+                    n_rho, g_rho = a_rho[a_idx]
+                    en, eg = tr[a_idx, 0], tr[a_idx, 1]
+                    if draw:
+                        lam = np.maximum(0.5 * en.real * dt, 0)
+                        dw[0] = _poisson_inverse(lam, rand_t[:, a_idx, j, 0])
+                    jump = eg.real > 1e-12
+                    d2 = np.where(jump,
+                                  g_rho / np.where(jump, eg, 1) - rho_t,
+                                  -rho_t)
+                    drho += 0.5 * (en * rho_t - n_rho) * dt + d2 * dw[0]
+
+            rho_t = rho_t + drho
+
+        if sso.store_measurement:
+            for k in range(K):
+                rho_k = np.ascontiguousarray(rho_prev[:, k])
+                for m_idx, m in enumerate(sso.s_m_ops):
+                    for dW_idx, dW_factor in enumerate(sso.dW_factors):
+                        if m[dW_idx]:
+                            m_expt = cy_expect_rho_vec(m[dW_idx].data,
+                                                       rho_k, 0)
+                        else:
+                            m_expt = 0
+                        measurements[k, t_idx, m_idx, dW_idx] = \
+                            m_expt + dW_factor * \
+                            dW_t[k, m_idx, :, dW_idx].sum() / \
+                            (dt * sso.N_substeps)
+
+        if sso.store_noise:
+            for k in range(K):
+                dW[k] = _store_noise_block(dW[k], dW_t[k], t_idx,
+                                           sso.N_store)
+
+    measurements = _measurement_result(sso, measurements)
+
+    return [(states_list[k], _noise_record(sso, n, dW[k]),
+             None if measurements is None else measurements[k],
+             expect[k], ss[k])
+            for k, n in enumerate(trajs)]
 
 
 # -----------------------------------------------------------------------------
@@ -1017,6 +1743,9 @@ def _ssepdpsolve_generic(sso, options, progress_bar):
     for c in sso.c_ops:
         Heff += -0.5j * c.dag() * c
 
+    data.seeds = (options.seeds if options.seeds is not None
+                  else _new_seed())
+
     progress_bar.start(sso.ntraj)
     for n in range(sso.ntraj):
         progress_bar.update(n)
@@ -1026,7 +1755,8 @@ def _ssepdpsolve_generic(sso, options, progress_bar):
             _ssepdpsolve_single_trajectory(data, Heff, dt, sso.times,
                                            N_store, N_substeps,
                                            psi_t, sso.state0.dims,
-                                           sso.c_ops, sso.e_ops)
+                                           sso.c_ops, sso.e_ops,
+                                           _trajectory_rng(data.seeds, n))
 
         data.states.append(states_list)
         data.jump_times.append(jump_times)
@@ -1057,7 +1787,7 @@ def _ssepdpsolve_generic(sso, options, progress_bar):
 
 
 def _ssepdpsolve_single_trajectory(data, Heff, dt, times, N_store, N_substeps,
-                                   psi_t, dims, c_ops, e_ops):
+                                   psi_t, dims, c_ops, e_ops, rng):
     """
     Internal function. See ssepdpsolve.
     """
@@ -1065,8 +1795,8 @@ def _ssepdpsolve_single_trajectory(data, Heff, dt, times, N_store, N_substeps,
 
     phi_t = np.copy(psi_t)
 
-    prng = RandomState()  # todo: seed it
-    r_jump, r_op = prng.rand(2)
+    rand_pairs = _uniform_pairs(rng)
+    r_jump, r_op = next(rand_pairs)
 
     jump_times = []
     jump_op_idx = []
@@ -1080,7 +1810,7 @@ def _ssepdpsolve_single_trajectory(data, Heff, dt, times, N_store, N_substeps,
                 data.expect[e_idx, t_idx] += s
                 data.ss[e_idx, t_idx] += s ** 2
         else:
-            states_list.append(Qobj(psi_t, dims=dims))
+            states_list.append(Qobj.from_csr(psi_t, dims=dims, copy=True))
 
         for j in range(N_substeps):
 
@@ -1100,7 +1830,7 @@ def _ssepdpsolve_single_trajectory(data, Heff, dt, times, N_store, N_substeps,
                 jump_op_idx.append(n)
 
                 # get new random numbers for next jump
-                r_jump, r_op = prng.rand(2)
+                r_jump, r_op = next(rand_pairs)
 
             # deterministic evolution wihtout correction for norm decay
             dphi_t = (-1.0j * dt) * (Heff.data * phi_t)
@@ -1147,6 +1877,9 @@ def _smepdpsolve_generic(sso, options, progress_bar):
     # needs to be modified for TD systems
     L = liouvillian(sso.H, sso.c_ops)
 
+    data.seeds = (options.seeds if options.seeds is not None
+                  else _new_seed())
+
     progress_bar.start(sso.ntraj)
 
     for n in range(sso.ntraj):
@@ -1157,7 +1890,8 @@ def _smepdpsolve_generic(sso, options, progress_bar):
             _smepdpsolve_single_trajectory(data, L, dt, sso.times,
                                            N_store, N_substeps,
                                            rho_t, sso.rho0.dims,
-                                           sso.c_ops, sso.e_ops)
+                                           sso.c_ops, sso.e_ops,
+                                           _trajectory_rng(data.seeds, n))
 
         data.states.append(states_list)
         data.jump_times.append(jump_times)
@@ -1183,7 +1917,7 @@ def _smepdpsolve_generic(sso, options, progress_bar):
 
 
 def _smepdpsolve_single_trajectory(data, L, dt, times, N_store, N_substeps,
-                                   rho_t, dims, c_ops, e_ops):
+                                   rho_t, dims, c_ops, e_ops, rng):
     """
     Internal function. See smepdpsolve.
     """
@@ -1192,8 +1926,8 @@ def _smepdpsolve_single_trajectory(data, L, dt, times, N_store, N_substeps,
     rho_t = np.copy(rho_t)
     sigma_t = np.copy(rho_t)
 
-    prng = RandomState()  # todo: seed it
-    r_jump, r_op = prng.rand(2)
+    rand_pairs = _uniform_pairs(rng)
+    r_jump, r_op = next(rand_pairs)
 
     jump_times = []
     jump_op_idx = []
@@ -1204,7 +1938,7 @@ def _smepdpsolve_single_trajectory(data, L, dt, times, N_store, N_substeps,
             for e_idx, e in enumerate(e_ops):
                 data.expect[e_idx, t_idx] += expect_rho_vec(e, rho_t)
         else:
-            states_list.append(Qobj(vec2mat(rho_t), dims=dims))
+            states_list.append(Qobj.from_csr(vec2mat(rho_t), dims=dims))
 
         for j in range(N_substeps):
 
@@ -1224,7 +1958,7 @@ def _smepdpsolve_single_trajectory(data, L, dt, times, N_store, N_substeps,
                 jump_op_idx.append(n)
 
                 # get new random numbers for next jump
-                r_jump, r_op = prng.rand(2)
+                r_jump, r_op = next(rand_pairs)
 
             # deterministic evolution wihtout correction for norm decay
             dsigma_t = spmv(L.data, sigma_t) * dt
@@ -1333,8 +2067,7 @@ def d1_psi_heterodyne(t, psi, A, args):
 
     """
     e_C = cy_expect_psi_csr(A[0].data, A[0].indices, A[0].indptr, psi, 0)
-    B = A[0].T.conj()
-    e_Cd = cy_expect_psi_csr(B.data, B.indices, B.indptr, psi, 0)
+    e_Cd = e_C.conjugate()
 
     return (-0.5 * spmv(A[3], psi) +
             0.5 * e_Cd * spmv(A[0], psi) -
@@ -1870,3 +2603,348 @@ def _rhs_rho_milstein_homodyne_fast(L, rho_t, t, A, dt, ddW, d1, d2, args):
     drho_t += np.dot(dW, d_vec[:-1])
 
     return drho_t
+
+
+# -----------------------------------------------------------------------------
+# Strong order 1.5 schemes for homodyne and heterodyne detection.
+#
+# The step functions return the order 1.5 update of the state together with
+# the order 1 (Milstein) update contained in it, whose difference is the
+# error estimate used for the adaptive substeps. The increments of a substep
+# hold dW and dZ = int (W(s) - W(t)) ds for each stochastic increment.
+#
+def _generate_noise_15(sc_len, N_store, N_substeps, d2_len, dt):
+    """
+    generate the increments dW and dZ for the order 1.5 schemes
+    """
+    U1 = np.random.randn(sc_len, N_store, N_substeps, d2_len)
+    U2 = np.random.randn(sc_len, N_store, N_substeps, d2_len)
+    dW = np.sqrt(dt) * U1
+    dZ = 0.5 * dt ** 1.5 * (U1 + U2 / np.sqrt(3))
+    return np.concatenate([dW, dZ], axis=3)
+
+
+def _bridge_halves(rng, dt, dW, dZ):
+    """
+    Sample the increments dW and dZ of the two halves of a substep of length
+    dt, conditioned on the increments dW and dZ of the whole substep, with
+    the random number generator rng.
+    """
+    h = 0.5 * dt
+    # covariance of (dW_1, dZ_1, dW_2, dZ_2) and the linear map to (dW, dZ)
+    S_h = np.array([[h, h ** 2 / 2], [h ** 2 / 2, h ** 3 / 3]])
+    S = np.zeros((4, 4))
+    S[:2, :2] = S[2:, 2:] = S_h
+    C = np.array([[1, 0, 1, 0], [h, 1, 0, 1]])
+    K = np.dot(np.dot(S, C.T), np.linalg.inv(np.dot(np.dot(C, S), C.T)))
+
+    # unconditioned sample, corrected to match the whole substep
+    x = np.dot(np.linalg.cholesky(S),
+               rng.standard_normal((4, dW.size))).reshape((4,) + dW.shape)
+    y = np.array([dW, dZ]) - np.tensordot(C, x, axes=1)
+    x += np.tensordot(K, y, axes=1)
+    return (x[0], x[1]), (x[2], x[3])
+
+
+class _StochasticStep():
+    """
+    Private class wrapping a step function of an order 1.5 scheme as rhs
+    function. With tol, a substep whose error estimate is larger than tol is
+    split into two halves, with increments sampled from the Brownian bridge,
+    up to max_halvings times. The bridge is sampled from a random number
+    stream of the trajectory, set with for_trajectory, separate from the
+    stream of the increments, so that the refinements are reproducible, also
+    along given increments.
+    """
+
+    def __init__(self, step, d2_len, tol=None, max_halvings=10):
+        self.step = step
+        self.d2_len = d2_len
+        self.tol = tol
+        self.max_halvings = max_halvings
+        self.rng = None
+
+    def for_trajectory(self, rng):
+        """
+        Copy of the rhs function sampling the Brownian bridge with the
+        random number generator rng of a trajectory.
+        """
+        rhs = copy.copy(self)
+        rhs.rng = rng
+        return rhs
+
+    def __call__(self, H, state, t, A_ops, dt, ddW, d1, d2, args):
+        dW, dZ = ddW[:, :self.d2_len], ddW[:, self.d2_len:]
+
+        if self.tol is None:
+            return self.step(H, state, t, A_ops, dt, dW, dZ, d1, d2, args)[0]
+
+        segments = [(t, dt, dW, dZ, 0)]
+        while segments:
+            t_s, dt_s, dW_s, dZ_s, depth = segments.pop()
+            state_15, state_1 = self.step(H, state, t_s, A_ops, dt_s,
+                                          dW_s, dZ_s, d1, d2, args)
+            if (depth >= self.max_halvings or
+                    norm(state_15 - state_1) <= self.tol):
+                state = state_15
+            else:
+                rng = np.random if self.rng is None else self.rng
+                first, second = _bridge_halves(rng, dt_s, dW_s, dZ_s)
+                segments.append((t_s + 0.5 * dt_s, 0.5 * dt_s) + second +
+                                (depth + 1,))
+                segments.append((t_s, 0.5 * dt_s) + first + (depth + 1,))
+
+        return state
+
+
+def _explicit15(state, dt, dW, dZ, drift, diffusion):
+    """
+    Explicit (derivative-free) strong order 1.5 scheme of Kloeden and Platen,
+    for the drift function and the list of diffusion functions of the
+    increments dW and dZ. The iterated integrals of two different increments
+    are approximated as for commuting noise.
+    """
+    sqrt_dt = np.sqrt(dt)
+    m = len(dW)
+    a = drift(state)
+    b = diffusion(state)
+
+    state_bar = state + a * dt
+    a_bar = drift(state_bar)
+    b_bar = diffusion(state_bar)
+
+    a_p, a_m, b_p, b_m = [], [], [], []
+    for j in range(m):
+        a_p.append(drift(state_bar + b[j] * sqrt_dt))
+        a_m.append(drift(state_bar - b[j] * sqrt_dt))
+        b_p.append(diffusion(state_bar + b[j] * sqrt_dt))
+        b_m.append(diffusion(state_bar - b[j] * sqrt_dt))
+
+    # order 1: Euler-Maruyama and the double integrals
+    state_1 = state_bar.copy()
+    for j in range(m):
+        state_1 += b[j] * dW[j]
+    for j1 in range(m):
+        for j2 in range(m):
+            I = 0.5 * (dW[j1] * dW[j2] - (dt if j1 == j2 else 0))
+            state_1 += (b_p[j1][j2] - b_m[j1][j2]) * I / (2 * sqrt_dt)
+
+    # order 1.5
+    state_15 = state_1 + 0.5 * (a_bar - a) * dt
+    for j in range(m):
+        state_15 += (0.25 * (a_p[j] - 2 * a_bar + a_m[j]) * dt +
+                     (a_p[j] - a_m[j]) * dZ[j] / (2 * sqrt_dt))
+
+        L0_b = (b_bar[j] - b[j]) / dt
+        for k in range(m):
+            L0_b += (b_p[k][j] - 2 * b_bar[j] + b_m[k][j]) / (2 * dt)
+        state_15 += L0_b * (dW[j] * dt - dZ[j])
+
+        phi = b_p[j][j] * sqrt_dt
+        state_p = state_bar + b[j] * sqrt_dt
+        LL_b = (diffusion(state_p + phi)[j] - diffusion(state_p - phi)[j] -
+                b_p[j][j] + b_m[j][j]) / (2 * dt)
+        state_15 += LL_b * 0.5 * (dW[j] ** 2 / 3 - dt) * dW[j]
+
+    return state_15, state_1
+
+
+def _psi_explicit15(H, psi_t, t, A_ops, dt, dW, dZ, d1, d2, args):
+    """
+    Explicit order 1.5 step for the wave function solver.
+    """
+    def drift(psi):
+        dpsi = _rhs_psi_deterministic(H, psi, t, 1.0, args)
+        for A in A_ops:
+            dpsi += d1(t, psi, A, args)
+        return dpsi
+
+    def diffusion(psi):
+        return [d2_vec for A in A_ops for d2_vec in d2(t, psi, A, args)]
+
+    return _explicit15(psi_t, dt, dW.ravel(), dZ.ravel(), drift, diffusion)
+
+
+def _rho_explicit15(L, rho_t, t, A_ops, dt, dW, dZ, d1, d2, args):
+    """
+    Explicit order 1.5 step for the density matrix solver.
+    """
+    def drift(rho):
+        drho = _rhs_rho_deterministic(L, rho, t, 1.0, args)
+        for A in A_ops:
+            drho += d1(t, rho, A, args)
+        return drho
+
+    def diffusion(rho):
+        return [d2_vec for A in A_ops for d2_vec in d2(t, rho, A, args)]
+
+    return _explicit15(rho_t, dt, dW.ravel(), dZ.ravel(), drift, diffusion)
+
+
+def _generate_A_ops_taylor15(sc, L, dt):
+    """
+    precomputed operators for the order 1.5 Taylor scheme: the deterministic
+    superoperator, the superoperators spre(c) + spost(c.dag()) of the
+    stochastic collapse operators, and the indices of the diagonal of the
+    density matrix in vector form.
+    """
+    A_len = len(sc)
+    N = sc[0].shape[0]
+    M_ops = [_stack_csr([spre(c).data + spost(c.dag()).data], N ** 2)
+             for c in sc]
+    A = L + np.sum([lindblad_dissipator(c, data_only=True) for c in sc],
+                   axis=0)
+    out = [[_stack_csr([A], N ** 2), M_ops, np.arange(N) * (N + 1)]]
+    # the following hack is required for compatibility with old A_ops
+    out += [[] for n in range(A_len - 1)]
+
+    return out
+
+
+def _generate_A_ops_taylor15_heterodyne(sc, L, dt):
+    """
+    precomputed operators for the order 1.5 Taylor scheme for heterodyne
+    detection, with the two quadratures of each stochastic collapse operator
+    as separate operators.
+    """
+    sc_quad = [op for c in sc
+               for op in (c / np.sqrt(2), -1.0j * c / np.sqrt(2))]
+    return _generate_A_ops_taylor15(sc_quad, L, dt)[:len(sc)]
+
+
+def _rho_taylor15(L, rho_t, t, A_ops, dt, dW, dZ, d1, d2, args):
+    """
+    Order 1.5 Taylor step for homodyne and heterodyne detection, with the
+    derivatives of the drift and diffusion terms of the stochastic master
+    equation. The iterated integrals of two different increments are
+    approximated as for commuting noise.
+    """
+    A, M_ops, diag = A_ops[0]
+    m = len(M_ops)
+    dW, dZ = dW.ravel(), dZ.ravel()
+
+    def tr(vec):
+        return vec[diag].sum()
+
+    a = spmv(A, rho_t)
+    M_rho = [spmv(M, rho_t) for M in M_ops]
+    e = [tr(M_rho[j]) for j in range(m)]
+    b = [M_rho[j] - e[j] * rho_t for j in range(m)]
+
+    def b_deriv(j, v, M_v=None):
+        # derivative of the diffusion term j in the direction v
+        M_v = spmv(M_ops[j], v) if M_v is None else M_v
+        return M_v - tr(M_v) * rho_t - e[j] * v
+
+    # M_b[k][j] = M_j b_k
+    M_b = [[spmv(M_ops[j], b[k]) for j in range(m)] for k in range(m)]
+
+    # order 1: Euler-Maruyama and the double integrals
+    state_1 = rho_t + a * dt
+    for j in range(m):
+        state_1 += b[j] * dW[j]
+    LL = [[None] * m for _ in range(m)]
+    for j1 in range(m):
+        for j2 in range(m):
+            LL[j1][j2] = b_deriv(j2, b[j1], M_b[j1][j2])
+            I = 0.5 * (dW[j1] * dW[j2] - (dt if j1 == j2 else 0))
+            state_1 += LL[j1][j2] * I
+
+    # order 1.5
+    state_15 = state_1 + 0.5 * spmv(A, a) * dt ** 2
+    for j in range(m):
+        state_15 += spmv(A, b[j]) * dZ[j]
+
+        L0_b = b_deriv(j, a)
+        for k in range(m):
+            L0_b -= tr(M_b[k][j]) * b[k]
+        state_15 += L0_b * (dW[j] * dt - dZ[j])
+
+        LLL_b = -2 * tr(M_b[j][j]) * b[j] + b_deriv(j, LL[j][j])
+        state_15 += LLL_b * 0.5 * (dW[j] ** 2 / 3 - dt) * dW[j]
+
+    return state_15, state_1
+
+
+# -----------------------------------------------------------------------------
+# Drift-implicit and exponential schemes for stiff stochastic master equations
+#
+class _DriftPropagatorStep():
+    """
+    Private class of the rhs function of the drift-implicit and exponential
+    solvers. The deterministic part of the substep, with the Liouvillian L
+    and, with dissipators, the dissipators of the stochastic collapse
+    operators, is integrated by (1 - L dt)^-1 ('implicit') or exp(L dt)
+    ('exponential'), applied after the explicit increment. The LU
+    factorization or, for a vectorized density matrix of dimension at most
+    _expm_max_dim, the exponential is computed at the first substep and
+    reused by all the following ones. For larger systems, the dense fill-in of
+    exp(L dt) is avoided by applying it with expm_multiply at each substep.
+    The factorization is not pickled, and is computed again by each process
+    of a parallel map.
+    """
+
+    def __init__(self, kind, milstein=False, dissipators=True):
+        self.kind = kind
+        self.milstein = milstein
+        self.dissipators = dissipators
+        self.dt = None
+        self.propagator = None
+        self.generator = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.kind == 'implicit':
+            state['dt'] = None
+            state['propagator'] = None
+        return state
+
+    def _setup(self, L, A_ops, dt):
+        D = L
+        if self.dissipators:
+            for A in A_ops:
+                D = D + A[7]
+        M = D.shape[0]
+        if self.kind == 'implicit':
+            self.propagator = spla.splu(
+                sp.identity(M, dtype=complex, format='csc') - dt * D.tocsc())
+        elif M <= _expm_max_dim:
+            self.propagator = _stack_csr([sp_expm(dt * D)], M)
+        else:
+            self.propagator = None
+            self.generator = (dt * D).tocsr()
+        self.dt = dt
+
+    def __call__(self, L, rho_t, t, A_ops, dt, dW, d1, d2, args):
+        if self.dt != dt:
+            self._setup(L, A_ops, dt)
+        dW = dW.ravel()
+
+        def diffusion(rho):
+            return [d2_vec for A in A_ops for d2_vec in d2(t, rho, A, args)]
+
+        b = diffusion(rho_t)
+        rho = rho_t.copy()
+        if not self.dissipators:
+            for A in A_ops:
+                rho += d1(t, rho_t, A, args) * dt
+        for j in range(len(b)):
+            if dW[j] != 0:
+                rho += b[j] * dW[j]
+
+        if self.milstein:
+            # derivative-free double integral terms, with the iterated
+            # integrals of two different increments as for commuting noise
+            sqrt_dt = np.sqrt(dt)
+            for j1 in range(len(b)):
+                b_p = diffusion(rho_t + b[j1] * sqrt_dt)
+                for j2 in range(len(b)):
+                    I = 0.5 * (dW[j1] * dW[j2] - (dt if j1 == j2 else 0))
+                    rho += (b_p[j2] - b[j2]) * I / sqrt_dt
+
+        if self.kind == 'implicit':
+            return self.propagator.solve(rho)
+        elif self.propagator is None:
+            return spla.expm_multiply(self.generator, rho)
+        else:
+            return spmv(self.propagator, rho)
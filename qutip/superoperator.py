@@ -35,6 +35,7 @@ __all__ = ['liouvillian', 'liouvillian_ref', 'lindblad_dissipator',
            'operator_to_vector', 'vector_to_operator', 'mat2vec', 'vec2mat',
            'vec2mat_index', 'mat2vec_index', 'spost', 'spre', 'sprepost']
 
+from collections import OrderedDict
 import scipy.sparse as sp
 import numpy as np
 from qutip.qobj import Qobj
@@ -91,32 +92,53 @@ def liouvillian(H, c_ops=[], data_only=False, chi=None):
 
     sop_dims = [[op_dims[0], op_dims[0]], [op_dims[1], op_dims[1]]]
     sop_shape = [np.prod(op_dims), np.prod(op_dims)]
+    N = op_shape[0]
 
-    spI = sp.identity(op_shape[0], format='csr')
+    # The Liouvillian is assembled as
+    #   L = I x A + B x I + sum_c w_c conj(c) x c + superoperator terms,
+    # with A = -iH - sum_c cdc / 2 and B = (iH - sum_c cdc / 2)^T, so that
+    # only the (small) operators A and B are summed as sparse matrices, and
+    # the Kronecker products are filled in a single COO -> CSR conversion.
+    A = sp.csr_matrix((N, N), dtype=complex)
+    B = sp.csr_matrix((N, N), dtype=complex)
+    terms = []
 
     if H:
         if H.isoper:
-            data = -1j * (sp.kron(spI, H.data, format='csr')
-                          - sp.kron(H.data.T, spI, format='csr'))
+            A = A - 1j * H.data
+            B = B + 1j * H.data
         else:
-            data = H.data
-    else:
-        data = sp.csr_matrix((sop_shape[0], sop_shape[1]), dtype=complex)
+            terms.append(_coo_entries(H.data))
 
+    # group repeated collapse operators, reusing their c^dag c products
+    collapse = {}
     for idx, c_op in enumerate(c_ops):
         if c_op.issuper:
-            data = data + c_op.data
+            terms.append(_coo_entries(c_op.data))
+            continue
+        weight = np.exp(1j * chi[idx]) if chi else 1
+        if id(c_op) in collapse:
+            collapse[id(c_op)][1] += weight
+            collapse[id(c_op)][2] += 1
         else:
-            cd = c_op.data.T.conj()
-            c = c_op.data
-            if chi:
-                data = data + np.exp(1j * chi[idx]) * sp.kron(cd.T, c,
-                                                              format='csr')
-            else:
-                data = data + sp.kron(cd.T, c, format='csr')
-            cdc = cd * c
-            data = data - 0.5 * sp.kron(spI, cdc, format='csr')
-            data = data - 0.5 * sp.kron(cdc.T, spI, format='csr')
+            collapse[id(c_op)] = [c_op, weight, 1]
+
+    for c_op, weight, count in collapse.values():
+        c = c_op.data
+        cdc = c.T.conj() * c
+        A = A - 0.5 * count * cdc
+        B = B - 0.5 * count * cdc
+        rows, cols, vals = _kron_coo(c.conj(), c)
+        terms.append((rows, cols, weight * vals))
+
+    spI = _identity_coo(N)
+    terms.append(_kron_coo(spI, A))
+    terms.append(_kron_coo(B.T, spI))
+
+    rows, cols, vals = [np.concatenate(x) for x in zip(*terms)]
+    data = sp.coo_matrix((vals, (rows, cols)),
+                         shape=(sop_shape[0], sop_shape[1])).tocsr()
+    data.eliminate_zeros()
 
     if data_only:
         return data
@@ -129,6 +151,52 @@ def liouvillian(H, c_ops=[], data_only=False, chi=None):
         return L
 
 
+# COO identity matrices used in the Kronecker products of liouvillian, cached
+# by dimension for the _identity_cache_size most recently used dimensions up
+# to _identity_cache_max_dim
+_identity_cache = OrderedDict()
+_identity_cache_size = 8
+_identity_cache_max_dim = 4096
+
+
+def _identity_coo(N):
+    """
+    Identity matrix of dimension N in COO format, cached by dimension.
+    """
+    if N > _identity_cache_max_dim:
+        return sp.identity(N, dtype=complex, format='coo')
+    eye = _identity_cache.pop(N, None)
+    if eye is None:
+        eye = sp.identity(N, dtype=complex, format='coo')
+        while len(_identity_cache) >= _identity_cache_size:
+            _identity_cache.popitem(last=False)
+    _identity_cache[N] = eye
+    return eye
+
+
+def _coo_entries(A):
+    """
+    Row indices, column indices and values of the nonzero elements of the
+    sparse matrix A.
+    """
+    A = A.tocoo()
+    return A.row.astype(np.int64), A.col.astype(np.int64), A.data
+
+
+def _kron_coo(A, B):
+    """
+    Row indices, column indices and values of the nonzero elements of the
+    Kronecker product of the sparse matrices A and B, without forming the
+    product as a sparse matrix.
+    """
+    A_rows, A_cols, A_vals = _coo_entries(A)
+    B_rows, B_cols, B_vals = _coo_entries(B)
+    rows = (A_rows[:, np.newaxis] * B.shape[0] + B_rows).ravel()
+    cols = (A_cols[:, np.newaxis] * B.shape[1] + B_cols).ravel()
+    vals = (A_vals[:, np.newaxis] * B_vals).ravel()
+    return rows, cols, vals
+
+
 def liouvillian_ref(H, c_ops=[]):
     """Assembles the Liouvillian superoperator from a Hamiltonian
     and a ``list`` of collapse operators.
@@ -115,7 +115,7 @@ shape = [4, 4], type = oper, isHerm = True
     if not out.isherm:
         out._isherm = None
 
-    return out.tidyup() if qutip.settings.auto_tidyup else out
+    return out._auto_tidyup()
 
 
 def super_tensor(*args):
@@ -37,7 +37,8 @@ from numpy.testing import assert_, run_module_suite
 from qutip.operators import (num, destroy,
                              sigmax, sigmay, sigmaz, sigmam, sigmap)
 from qutip.states import fock, fock_dm
-from qutip.expect import expect
+from qutip.random_objects import rand_ket, rand_dm, rand_herm
+from qutip.expect import expect, _can_batch, _batch_max_dim
 from qutip.mesolve import mesolve
 
 
@@ -158,6 +159,32 @@ class TestExpect:
             assert_(e1[n].dtype == e2[n].dtype)
             assert_(all(abs(e1[n] - e2[n]) < 1e-12))
 
+    def testExpectBatched(self):
+        """
+        expect: state lists and stacked state data
+        """
+        N = 6
+        kets = [rand_ket(N) for _ in range(5)]
+        rhos = [rand_dm(N) for _ in range(4)] + [rand_dm(N).to_csr()]
+        for op in [num(N), destroy(N), rand_herm(N).to_dense()]:
+            for states in [kets, rhos]:
+                e = expect(op, states)
+                e_ref = np.array([expect(op, s) for s in states])
+                assert_(e.dtype == e_ref.dtype)
+                assert_(all(abs(e - e_ref) < 1e-12))
+
+            e = expect(op, np.array([psi.full()[:, 0] for psi in kets]))
+            assert_(all(abs(e - expect(op, kets)) < 1e-12))
+            e = expect(op, np.array([rho.full() for rho in rhos]))
+            assert_(all(abs(e - expect(op, rhos)) < 1e-12))
+
+        # large sparse density matrices keep the sparse trace
+        N = 2 * _batch_max_dim
+        rhos = [fock_dm(N, n) for n in range(3)]
+        assert_(not _can_batch(num(N), rhos))
+        assert_(_can_batch(num(N), [rho.to_dense() for rho in rhos]))
+        assert_(all(expect(num(N), rhos) == np.arange(3)))
+
 
 if __name__ == "__main__":
     run_module_suite()
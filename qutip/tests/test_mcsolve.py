@@ -31,13 +31,22 @@
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
 
+import os
+import shutil
+import tempfile
 import numpy as np
-from numpy.testing import assert_equal, run_module_suite, assert_
+from numpy.testing import (assert_equal, run_module_suite, assert_,
+                           assert_raises)
 import unittest
+import scipy.integrate
 
 from qutip import (mcsolve, destroy, basis, qeye, Options, tensor, sigmam,
                    expect, coherent, Qobj)
 from qutip import _version2int
+from qutip.fileio import qsave, qload
+from qutip.mcsolve import _mc_dense_jump, _MCAverage, _mc_col_weights
+import qutip.parallel as parallel
+from qutip.parallel import parallel_map, _SharedArray
 
 # find Cython if it exists
 try:
@@ -535,5 +544,350 @@ def test_mc_ntraj_list():
     assert_equal(len(mc.expect), 4)
 
 
+def test_mc_stream_average():
+    "Monte-carlo: streaming average matches stored trajectories"
+    N = 5
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 3)
+    c_ops = [np.sqrt(0.5) * a]
+    tlist = np.linspace(0, 2, 20)
+    ntraj = 50
+    data1 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a, a], ntraj=ntraj,
+                    options=Options(store_states=True, average_states=True))
+    opts = Options(seeds=data1.seeds, store_states=True, stream_average=True,
+                   average_states=True, store_trajectories=True)
+    data2 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a, a], ntraj=ntraj,
+                    options=opts)
+    for k in range(2):
+        # the averages of stored trajectories are object arrays
+        assert_(np.allclose(np.asarray(data1.expect[k], dtype=complex),
+                            data2.expect[k]))
+    assert_(isinstance(data2.expect[0][1], float))
+    assert_(isinstance(data2.expect[1][1], complex))
+    assert_(len(data2.expect_err) == 2)
+    assert_(np.all(data2.expect_err[0] >= 0))
+    assert_(len(data2.states) == len(tlist))
+    for rho1, rho2 in zip(data1.states, data2.states):
+        assert_(np.allclose(rho1.full(), rho2.full()))
+    for k in range(ntraj):
+        assert_(np.allclose(data1.col_times[k], data2.col_times[k]))
+    data3 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=[10, ntraj],
+                    options=Options(seeds=data1.seeds, stream_average=True))
+    assert_equal(len(data3.expect), 2)
+    assert_(np.allclose(data3.expect[1][0],
+                        np.asarray(data1.expect[0], dtype=float)))
+    assert_(data3.col_times is None)
+    # the density matrices are not summed unless they are averaged
+    opts = Options(seeds=data1.seeds, store_states=True, stream_average=True)
+    data4 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=10,
+                    options=opts)
+    assert_equal(data4.states, [])
+
+
+def test_mc_average_out_of_order():
+    "Monte-carlo: streaming average of parts that arrive out of order"
+    class _Config():
+        e_num = 1
+        e_ops_isherm = [True]
+        tlist = np.linspace(0, 1, 3)
+        psi0_dims = [[2], [1]]
+        options = Options(store_trajectories=True)
+
+    avg = _MCAverage(_Config(), [1, 3])
+    rho = np.ones((3, 2, 2), dtype=complex)
+    avg.add(1, (2, [np.array([2., 4., 6.])], [np.array([2., 8., 18.])],
+                2 * rho, [[0.5], [0.7]], [[0], [0]]))
+    # the sums are added at once, and only the ordered data is kept
+    assert_equal(avg.num, 2)
+    assert_(np.all(avg.states_sum == 2))
+    assert_(all(x is not rho for x in avg.pending[1]))
+    assert_equal(avg.snapshots, {})
+    avg.add(0, (1, [np.array([1., 1., 1.])], [np.array([1., 1., 1.])],
+                rho, [[0.1]], [[0]]))
+    assert_equal(avg.num, 3)
+    assert_(np.allclose(avg.expect()[0], [1., 5. / 3, 7. / 3]))
+    assert_(np.allclose(avg.snapshots[1][0][0], 1))
+    assert_(np.allclose(avg.snapshots[3][0][0], avg.expect()[0]))
+    assert_equal(avg.collapse_times, [[0.1], [0.5], [0.7]])
+    assert_(np.allclose(avg.states()[0].full(), 1))
+
+
+def test_mc_chunk_size():
+    "Monte-carlo: results do not depend on the trajectory chunk size"
+    N = 5
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 3)
+    c_ops = [np.sqrt(0.5) * a]
+    tlist = np.linspace(0, 2, 20)
+    ntraj = 30
+    data1 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=ntraj)
+    for chunk_size in [1, 7]:
+        opts = Options(seeds=data1.seeds, chunk_size=chunk_size)
+        data2 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=ntraj,
+                        options=opts)
+        assert_(np.allclose(np.asarray(data1.expect[0], dtype=float),
+                            np.asarray(data2.expect[0], dtype=float)))
+        for k in range(ntraj):
+            assert_(np.allclose(data1.col_times[k], data2.col_times[k]))
+    opts = Options(seeds=data1.seeds, chunk_size=7, stream_average=True)
+    data3 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=[10, ntraj],
+                    options=opts)
+    assert_(np.allclose(data3.expect[1][0],
+                        np.asarray(data1.expect[0], dtype=float)))
+
+
+def test_mc_shared_memory():
+    "Monte-carlo: operators in shared memory"
+    N = 5
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 3)
+    c_ops = [np.sqrt(0.5) * a]
+    tlist = np.linspace(0, 2, 20)
+    data1 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=20)
+
+    shared_configs = []
+
+    def _map_func(task, values, task_args, task_kwargs, **kwargs):
+        config = task_args[0]
+        shared_configs.append(isinstance(config.h_data, _SharedArray) and
+                              isinstance(config.psi0, _SharedArray))
+        return parallel_map(task, values, task_args, task_kwargs, **kwargs)
+
+    # share the arrays of this small system too
+    min_bytes = parallel._shared_min_bytes
+    parallel._shared_min_bytes = 0
+    try:
+        opts = Options(seeds=data1.seeds, shared_memory=True, num_cpus=2)
+        data2 = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=20,
+                        options=opts, map_func=_map_func)
+    finally:
+        parallel._shared_min_bytes = min_bytes
+    assert_(len(shared_configs) > 0 and all(shared_configs))
+    assert_(np.allclose(np.asarray(data1.expect[0], dtype=float),
+                        np.asarray(data2.expect[0], dtype=float)))
+
+
+def test_mc_target_tol():
+    "Monte-carlo: run trajectories until a target standard error"
+    N = 5
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 3)
+    c_ops = [np.sqrt(0.5) * a]
+    tlist = np.linspace(0, 2, 20)
+    tol = 0.1
+    data = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=5000,
+                   options=Options(target_tol=tol))
+    assert_(data.ntraj < 5000)
+    assert_(np.max(data.expect_err[0]) <= tol)
+    expt = 3 * np.exp(-0.5 * tlist)
+    assert_(np.max(np.abs(data.expect[0] - expt)) < 5 * tol)
+    # the maximum number of trajectories is respected
+    data = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=150,
+                   options=Options(target_tol=1e-4))
+    assert_equal(data.ntraj, 150)
+    # the standard errors are those of the expectation values
+    assert_raises(ValueError, mcsolve, H, psi0, tlist, c_ops, [], ntraj=150,
+                  options=Options(target_tol=tol))
+
+
+def test_mc_many_channels():
+    "Monte-carlo: many decay channels"
+    N = 6
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 4)
+    rates = np.linspace(0.01, 0.05, 20)
+    c_ops = [np.sqrt(g) * a for g in rates[:10]]
+    c_ops += [[np.sqrt(g) * a, sqrt_kappa] for g in rates[10:]]
+    tlist = np.linspace(0, 5, 50)
+    data = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=ntraj)
+    expt = 4 * np.exp(-(np.sum(rates[:10]) + kappa * np.sum(rates[10:])) *
+                      tlist)
+    diff = np.mean(abs(expt - data.expect[0]) / expt)
+    assert_(diff < mc_error)
+    which = np.hstack(data.col_which)
+    assert_(np.all(which >= 0) and np.all(which < 20))
+
+
+def test_mc_integrators():
+    "Monte-carlo: integrators of the no-jump evolution"
+    N = 6
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 4)
+    c_ops = [np.sqrt(kappa) * a]
+    tlist = np.linspace(0, 10, 50)
+    expt = 4 * np.exp(-kappa * tlist)
+    # the Runge-Kutta integrators need scipy.integrate.DOP853 and RK45
+    rk_found = hasattr(scipy.integrate, 'DOP853')
+    for integrator in ['dop853', 'rk45', 'krylov', 'propagator']:
+        if integrator in ['dop853', 'rk45'] and not rk_found:
+            continue
+        opts = Options(mc_integrator=integrator)
+        data = mcsolve(H, psi0, tlist, c_ops, [a.dag() * a], ntraj=ntraj,
+                       options=opts)
+        diff = np.mean(abs(expt - data.expect[0]) / expt)
+        assert_(diff < mc_error)
+    # time-dependent collapse operators
+    if rk_found:
+        data = mcsolve(H, psi0, tlist, [[a, sqrt_kappa]], [a.dag() * a],
+                       ntraj=ntraj, options=Options(mc_integrator='dop853'))
+        diff = np.mean(abs(expt - data.expect[0]) / expt)
+        assert_(diff < mc_error)
+        data = mcsolve(H, psi0, tlist, [[a, 'sqrt(k) * conj(exp(1j * t))']],
+                       [a.dag() * a], args={'k': kappa}, ntraj=ntraj,
+                       options=Options(mc_integrator='dop853'))
+        diff = np.mean(abs(expt - data.expect[0]) / expt)
+        assert_(diff < mc_error)
+    assert_raises(TypeError, mcsolve, H, psi0, tlist, [[a, sqrt_kappa]],
+                  [a.dag() * a], ntraj=10,
+                  options=Options(mc_integrator='krylov'))
+
+
+def test_mc_col_weights_str():
+    "Monte-carlo: collapse weights of string coefficients evaluated in python"
+    class _Config():
+        c_num = 3
+        c_td_inds = [1, 2]
+        c_coeffs = [None, 'sqrt(k) * conj(exp(1j * t))',
+                    'real(proj(1j * t)) + 1 / real(proj(z))']
+        c_coeff_args = {'k': 0.5, 'z': complex(np.inf, -1)}
+
+    weights = _mc_col_weights(_Config(), 0.3)
+    assert_(np.allclose(weights, [1, 0.5, 0]))
+
+
+def test_mc_dense_jump_tolerance():
+    "Monte-carlo: collapse not located on the dense output raises"
+    class Stuck():
+        # dense output that never reaches the norm of the collapse
+        def rhs(self, t, y):
+            return -0.5 * y
+
+        def interpolate(self, t):
+            return np.array([1.0 + 0j])
+
+    y0, y1 = np.array([1.0 + 0j]), np.array([0.5 + 0j])
+    assert_raises(Exception, _mc_dense_jump, Stuck(), 0.0, y0, 1.0, 1.0, y1,
+                  0.25, 0.5, 1e-3, 5)
+
+
+def test_mc_propagator():
+    "Monte-carlo: precomputed no-jump propagators"
+    N = 6
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 4)
+    # non-uniform time steps
+    tlist = np.hstack([np.linspace(0, 2, 11), np.linspace(2.5, 10, 16)])
+    opts = Options(mc_integrator='propagator')
+    data = mcsolve(H, psi0, tlist, [np.sqrt(kappa) * a], [a.dag() * a],
+                   ntraj=ntraj, options=opts)
+    expt = 4 * np.exp(-kappa * tlist)
+    diff = np.mean(abs(expt - data.expect[0]) / expt)
+    assert_(diff < mc_error)
+    # no collapse operators
+    data = mcsolve(H, coherent(N, 0.5), tlist, [], [a.dag() * a, a],
+                   options=opts)
+    assert_(np.allclose(data.expect[0], data.expect[0][0], atol=1e-6))
+    assert_(np.allclose(data.expect[1],
+                        data.expect[1][0] * np.exp(-1j * tlist), atol=1e-6))
+
+
+def test_mc_compact_states():
+    "Monte-carlo: compact array of trajectory states"
+    N = 5
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 3)
+    c_ops = [np.sqrt(kappa) * a]
+    tlist = np.linspace(0, 5, 20)
+    data = mcsolve(H, psi0, tlist, c_ops, [], ntraj=20)
+    opts = Options(compact_states=True, seeds=data.seeds)
+    compact = mcsolve(H, psi0, tlist, c_ops, [], ntraj=20, options=opts)
+    assert_equal(compact.states.shape, (20, 20))
+    assert_equal(compact.states.data.shape, (20, 20, N))
+    for n in [0, 7, 19]:
+        for k in [0, 10, 19]:
+            assert_((compact.states[n, k] - data.states[n, k]).norm() < 1e-8)
+        assert_(np.allclose(compact.col_times[n], data.col_times[n]))
+        assert_equal(compact.col_which[n], data.col_which[n])
+    assert_(np.allclose(compact.expect_from_states(a.dag() * a),
+                        data.expect_from_states(a.dag() * a)))
+
+    # memory-mapped states, saved and loaded with qsave as a reference to
+    # their file
+    tmpdir = tempfile.mkdtemp()
+    try:
+        opts.states_file = os.path.join(tmpdir, 'states.dat')
+        mapped = mcsolve(H, psi0, tlist, c_ops, [], ntraj=20, options=opts)
+        assert_(np.allclose(mapped.states.data, compact.states.data))
+        name = os.path.join(tmpdir, 'result')
+        qsave(mapped, name)
+        assert_(os.path.getsize(name + '.qu') < mapped.states.data.nbytes)
+        loaded = qload(name)
+        assert_(isinstance(loaded.states.data, np.memmap))
+        assert_(np.allclose(loaded.states.data, compact.states.data))
+        assert_((loaded.states[3, 5] - compact.states[3, 5]).norm() < 1e-8)
+        assert_equal(loaded.col_which[4], compact.col_which[4])
+        del mapped, loaded
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_mc_psi0_list():
+    "Monte-carlo: list of initial states"
+    N = 5
+    a = destroy(N)
+    H = a.dag() * a + 0.1 * (a + a.dag())
+    psi0_list = [basis(N, n) for n in range(3)]
+    tlist = np.linspace(0, 5, 20)
+    # without collapse operators
+    data = mcsolve(H, psi0_list, tlist, [], [a.dag() * a])
+    assert_equal(len(data), 3)
+    for psi0, res in zip(psi0_list, data):
+        single = mcsolve(H, psi0, tlist, [], [a.dag() * a])
+        assert_(np.allclose(np.asarray(res.expect[0], dtype=float),
+                            np.asarray(single.expect[0], dtype=float),
+                            atol=1e-6))
+    data = mcsolve(H, psi0_list, tlist, [], [])
+    assert_equal(len(data[2].states), len(tlist))
+    # with collapse operators, reusing the seeds
+    c_ops = [np.sqrt(kappa) * a]
+    single = mcsolve(H, psi0_list[2], tlist, c_ops, [a.dag() * a],
+                     ntraj=50)
+    opts = Options(seeds=single.seeds)
+    data = mcsolve(H, psi0_list, tlist, c_ops, [a.dag() * a], ntraj=50,
+                   options=opts)
+    assert_equal(len(data), 3)
+    assert_(np.allclose(np.asarray(data[2].expect[0], dtype=float),
+                        np.asarray(single.expect[0], dtype=float),
+                        atol=1e-5))
+
+
+def test_mc_seed_extend():
+    "Monte-carlo: extend a run with more trajectories"
+    N = 5
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 3)
+    c_ops = [np.sqrt(kappa) * a]
+    tlist = np.linspace(0, 5, 10)
+    data1 = mcsolve(H, psi0, tlist, c_ops, [], ntraj=20)
+    opts = Options(seeds=data1.seeds, chunk_size=3)
+    data2 = mcsolve(H, psi0, tlist, c_ops, [], ntraj=40, options=opts)
+    assert_equal(data2.seeds, data1.seeds)
+    for k in range(20):
+        assert_(np.allclose(data1.col_times[k], data2.col_times[k]))
+        assert_equal(data1.col_which[k], data2.col_which[k])
+    assert_(any(len(data2.col_times[k]) != len(data2.col_times[k - 20]) or
+                not np.allclose(data2.col_times[k], data2.col_times[k - 20])
+                for k in range(20, 40)))
+
+
 if __name__ == "__main__":
     run_module_suite()
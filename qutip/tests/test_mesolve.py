@@ -41,7 +41,8 @@ import os
 os.environ['QUTIP_GRAPHICS'] = "NO"
 
 from qutip import (sigmax, sigmay, sigmaz, sigmam, mesolve, tensor, destroy,
-                   identity, steadystate, expect, basis, num)
+                   identity, steadystate, expect, basis, num, Options,
+                   sesolve, coherent, propagator, rand_herm, Qobj, ket2dm)
 
 
 class TestJCModelEvolution:
@@ -451,5 +452,169 @@ class TestMESolveTDDecay:
         avg_diff = np.mean(abs(actual_answer - expt) / actual_answer)
         assert_(avg_diff < 100 * me_error)
 
+
+class TestMESolveMatrixFree:
+    """
+    A test class for mesolve without forming the Liouvillian, compared to the
+    default solver.
+    """
+
+    def jc_problem(self):
+        a = tensor(destroy(5), identity(2))
+        sm = tensor(identity(5), destroy(2))
+        H0 = a.dag() * a + sm.dag() * sm
+        H1 = a.dag() * sm + a * sm.dag()
+        psi0 = tensor(basis(5, 2), basis(2, 1))
+        return a, sm, H0, H1, psi0
+
+    def testMEMatrixFreeConst(self):
+        "mesolve: matrix-free constant problem"
+        a, sm, H0, H1, psi0 = self.jc_problem()
+        H = H0 + 0.5 * H1
+        c_ops = [np.sqrt(0.1) * a, np.sqrt(0.05) * sm, 0.2 * a.dag() * a]
+        e_ops = [a.dag() * a, sm.dag() * sm, a]
+        tlist = np.linspace(0, 5, 50)
+        ref = mesolve(H, psi0, tlist, c_ops, e_ops)
+        out = mesolve(H, psi0, tlist, c_ops, e_ops,
+                      options=Options(matrix_free=True))
+        for m in range(len(e_ops)):
+            assert_(np.max(abs(ref.expect[m] - out.expect[m])) < 1e-5)
+
+    def testMEMatrixFreeFuncList(self):
+        "mesolve: matrix-free list-function time-dependence"
+        a, sm, H0, H1, psi0 = self.jc_problem()
+
+        def H1_coeff(t, args):
+            return np.cos(args['w'] * t)
+
+        def c_coeff(t, args):
+            return np.sqrt(0.2 * np.exp(-t))
+        H = [H0, [H1, H1_coeff]]
+        c_ops = [[a, c_coeff], np.sqrt(0.05) * sm]
+        tlist = np.linspace(0, 5, 50)
+        args = {'w': 1.5}
+        ref = mesolve(H, psi0, tlist, c_ops, [a.dag() * a], args=args)
+        out = mesolve(H, psi0, tlist, c_ops, [a.dag() * a], args=args,
+                      options=Options(matrix_free=True))
+        assert_(np.max(abs(ref.expect[0] - out.expect[0])) < 1e-5)
+
+    def testMEMatrixFreeStrList(self):
+        "mesolve: matrix-free list-string time-dependence"
+        a, sm, H0, H1, psi0 = self.jc_problem()
+        H = [H0, [H1, 'cos(w*t)']]
+        c_ops = [[a, 'sqrt(k*exp(-t))'], np.sqrt(0.05) * sm]
+        tlist = np.linspace(0, 5, 50)
+        args = {'w': 1.5, 'k': 0.2}
+        ref = mesolve(H, psi0, tlist, c_ops, [a.dag() * a], args=args)
+        out = mesolve(H, psi0, tlist, c_ops, [a.dag() * a], args=args,
+                      options=Options(matrix_free=True))
+        assert_(np.max(abs(ref.expect[0] - out.expect[0])) < 1e-5)
+
+        # states are stored as density matrices with the dims of the system
+        out = mesolve(H, psi0, tlist, c_ops, [], args=args,
+                      options=Options(matrix_free=True))
+        assert_(out.states[-1].dims == [[5, 2], [5, 2]])
+        assert_(abs(out.states[-1].tr() - 1) < 1e-6)
+
+
+class TestMESolveBatch:
+    """
+    A test class for evolving a list of initial states together, compared to
+    evolving them one at a time.
+    """
+
+    def testSEBatchConst(self):
+        "sesolve: batch of initial states, constant Hamiltonian"
+        N = 8
+        a = destroy(N)
+        H = a.dag() * a + 0.3 * (a + a.dag())
+        psi0_list = [basis(N, 0), basis(N, 3), coherent(N, 0.5)]
+        tlist = np.linspace(0, 3, 30)
+        e_ops = [a.dag() * a, a]
+        outputs = sesolve(H, psi0_list, tlist, e_ops)
+        assert_(len(outputs) == len(psi0_list))
+        for psi0, output in zip(psi0_list, outputs):
+            ref = sesolve(H, psi0, tlist, e_ops)
+            for m in range(len(e_ops)):
+                assert_(np.max(abs(ref.expect[m] - output.expect[m])) < 1e-5)
+
+    def testSEBatchStrList(self):
+        "sesolve: batch of initial states, list-string time-dependence"
+        N = 6
+        a = destroy(N)
+        H = [a.dag() * a, [a + a.dag(), 'cos(w*t)']]
+        psi0_list = [basis(N, 0), basis(N, 2)]
+        tlist = np.linspace(0, 3, 30)
+        args = {'w': 1.2}
+        outputs = sesolve(H, psi0_list, tlist, [], args)
+        for psi0, output in zip(psi0_list, outputs):
+            ref = sesolve(H, psi0, tlist, [], args)
+            assert_((ref.states[-1] - output.states[-1]).norm() < 1e-5)
+
+    def testMEBatchConst(self):
+        "mesolve: batch of initial states, constant Liouvillian"
+        N = 6
+        a = destroy(N)
+        H = a.dag() * a + 0.3 * (a + a.dag())
+        c_ops = [np.sqrt(0.2) * a]
+        rho0_list = [basis(N, 2), coherent(N, 0.7) * coherent(N, 0.7).dag()]
+        tlist = np.linspace(0, 3, 30)
+        e_ops = [a.dag() * a, a]
+        outputs = mesolve(H, rho0_list, tlist, c_ops, e_ops)
+        for rho0, output in zip(rho0_list, outputs):
+            ref = mesolve(H, rho0, tlist, c_ops, e_ops)
+            for m in range(len(e_ops)):
+                assert_(np.max(abs(ref.expect[m] - output.expect[m])) < 1e-5)
+
+    def testPropagatorBatch(self):
+        "propagator: unitary and dissipative propagators"
+        N = 4
+        H = rand_herm(N)
+        c_ops = [np.sqrt(0.1) * destroy(N)]
+        psi0 = basis(N, 1)
+        U = propagator(H, 1.0, [], method='ode')
+        ref = sesolve(H, psi0, [0, 1.0], []).states[-1]
+        assert_(((U * psi0) - ref).norm() < 1e-5)
+
+        U = propagator(H, 1.0, c_ops, method='ode')
+        ref = mesolve(H, psi0, [0, 1.0], c_ops, []).states[-1]
+        rho = Qobj(np.reshape((U.full().dot(
+            np.reshape(ket2dm(psi0).full(), (N * N, 1), order='F'))),
+            (N, N), order='F'))
+        assert_(np.max(abs(rho.full() - ref.full())) < 1e-5)
+
+
+class TestPropagatorMethods:
+    """
+    A test class for the exponentiation methods of the propagator, compared
+    to integrating the equations of motion.
+    """
+
+    def testPropagatorMethodsUnitary(self):
+        "propagator: expm and expm_multiply for a constant Hamiltonian"
+        H = rand_herm(6)
+        tlist = np.linspace(0, 2, 5)
+        U_ode = propagator(H, tlist, [], method='ode')
+        for method in ['expm', 'expm_multiply']:
+            U, info = propagator(H, tlist, [], method=method,
+                                 return_info=True)
+            assert_(info['method'] == method)
+            for k in range(len(tlist)):
+                assert_((U[k] - U_ode[k]).norm() < 1e-5)
+        U, info = propagator(H, 1.0, [], return_info=True)
+        assert_(info['method'] == 'expm')
+
+    def testPropagatorMethodsDissipative(self):
+        "propagator: expm and expm_multiply with collapse operators"
+        H = rand_herm(4)
+        c_ops = [np.sqrt(0.1) * destroy(4)]
+        tlist = [0, 0.5, 1.5]
+        U_ode = propagator(H, tlist, c_ops, method='ode')
+        for method in ['expm', 'expm_multiply']:
+            U = propagator(H, tlist, c_ops, method=method)
+            for k in range(len(tlist)):
+                assert_(np.max(abs(U[k].full() - U_ode[k].full())) < 1e-5)
+
+
 if __name__ == "__main__":
     run_module_suite()
@@ -89,6 +89,19 @@ def test_fidelity2():
         assert_(abs((F-FU)/F) < 1e-5)
 
 
+def test_fidelity_list():
+    """
+    Metrics: fidelity for a list of states
+    """
+    rho = rand_dm(5)
+    rhos = [rand_dm(5) for _ in range(4)]
+    kets = [rand_ket(5) for _ in range(4)]
+    for states in [rhos, kets]:
+        F = fidelity(rho, states)
+        F_ref = np.array([fidelity(rho, s) for s in states])
+        assert_(np.all(abs(F - F_ref) < 1e-7))
+
+
 def test_tracedist1():
     """
     Metrics: Trace dist., invariance under unitary trans.
@@ -33,9 +33,15 @@
 
 import numpy as np
 import time
-from numpy.testing import assert_, run_module_suite
+from numpy.testing import assert_, assert_equal, run_module_suite
 
-from qutip.parallel import parfor, parallel_map, serial_map
+import pickle
+import qutip.settings as qset
+from qutip import rand_herm
+from qutip.solver import _openmp_threads
+from qutip.parallel import (parfor, parallel_map, serial_map, SharedArrays,
+                            _map_chunks, _chunk_task)
+from qutip.ui.progressbar import BaseProgressBar
 
 
 def _func1(x):
@@ -91,5 +97,142 @@ def test_serial_map():
     y2 = serial_map(_func2, x, args, kwargs, num_cpus=2)
     assert_((np.array(y1) == np.array(y2)).all())
 
+def test_map_reduce_func():
+    "parallel_map and serial_map with reduce_func"
+
+    x = np.arange(10)
+    y1 = [xx**2 for xx in x]
+
+    for map_func in [serial_map, parallel_map]:
+        y2 = [None] * len(x)
+
+        def _reduce(n, result):
+            y2[n] = result
+
+        out = map_func(_func1, x, num_cpus=2, reduce_func=_reduce)
+        assert_(len(out) == 0)
+        assert_((np.array(y1) == np.array(y2)).all())
+
+def test_parallel_map_shared_args():
+    "parallel_map with shared_args"
+
+    args = (1, 2, 3)
+    kwargs = {'d': 4, 'e': 5, 'f': 6}
+
+    x = np.arange(10)
+    y1 = [_func2(xx, *args, **kwargs)for xx in x]
+
+    y2 = parallel_map(_func2, x, args, kwargs, num_cpus=2, shared_args=True)
+    assert_((np.array(y1) == np.array(y2)).all())
+
+def _openmp_threads_task(x):
+    return _openmp_threads(None, qset.openmp_thresh)
+
+
+def test_worker_openmp_threads():
+    "parfor and parallel_map workers use one openmp thread by default"
+
+    openmp_threads = qset.openmp_threads
+    try:
+        qset.openmp_threads = 0
+        x = np.arange(4)
+        assert_(parfor(_openmp_threads_task, x, num_cpus=2) == [1] * 4)
+        assert_(parallel_map(_openmp_threads_task, x, num_cpus=2) == [1] * 4)
+        assert_(parallel_map(_openmp_threads_task, x, num_cpus=2,
+                             shared_args=True) == [1] * 4)
+        assert_(_openmp_threads_task(0) == max(qset.num_cpus, 1))
+
+        qset.openmp_threads = 3
+        assert_(parallel_map(_openmp_threads_task, x, num_cpus=2) == [3] * 4)
+    finally:
+        qset.openmp_threads = openmp_threads
+
+
+def _sum_task(chunk, offset):
+    return [x + offset for x in chunk]
+
+
+def test_map_chunks():
+    "chunked map of the trajectory solvers"
+
+    class _ProgressBar(BaseProgressBar):
+        def start(self, iterations):
+            self.total = iterations
+            self.counts = []
+
+        def update(self, n):
+            self.counts.append(n)
+
+    x = np.arange(20)
+    for map_func in [serial_map, parallel_map]:
+        for chunk_size in [0, 3]:
+            pbar = _ProgressBar()
+            parts, task_time = _map_chunks(_sum_task, x, (1,), map_func,
+                                           {'num_cpus': 2}, num_cpus=2,
+                                           chunk_size=chunk_size,
+                                           progress_bar=pbar)
+            assert_(np.all(np.concatenate(parts) == x + 1))
+            assert_(all(len(part) <= 3 for part in parts) or not chunk_size)
+            assert_((task_time is None) == (chunk_size > 0))
+            # the progress is counted in values, not chunks
+            assert_equal(pbar.total, 20)
+            assert_equal(sorted(pbar.counts)[-1], 20)
+
+    # chunks do not straddle the boundaries, and are reduced as they arrive
+    results = {}
+    out, _ = _map_chunks(_sum_task, x, (0,), parallel_map, {'num_cpus': 2},
+                         num_cpus=2, chunk_size=4, boundaries=set([6, 15]),
+                         reduce_func=results.__setitem__)
+    assert_equal(out, [])
+    chunks = [results[n] for n in sorted(results)]
+    assert_(np.all(np.concatenate(chunks) == x))
+    assert_(all(part[0] >= b or part[-1] < b
+                for part in chunks for b in [6, 15]))
+
+    # blocks of values are counted by their size
+    pbar = _ProgressBar()
+    blocks = [[0, 1, 2], [3, 4], [5]]
+    _map_chunks(_chunk_task, blocks, (len,), serial_map, chunk_size=1,
+                value_size=len, progress_bar=pbar)
+    assert_equal(pbar.total, 6)
+    assert_equal(pbar.counts, [3, 5, 6])
+
+
+def _expect_task(x, op):
+    return (op * x).tr()
+
+
+def test_shared_arrays():
+    "SharedArrays"
+
+    a = np.random.rand(100, 100)
+    H = rand_herm(200, density=0.5)
+    with SharedArrays() as shared:
+        a2 = shared.share(a)
+        H2 = shared.share(H)
+        small = np.arange(3)
+        assert_(shared.share(small) is small)
+        assert_((a2 == a).all())
+        assert_(H2 == H)
+        # pickled as a reference, and attached on unpickling
+        assert_(len(pickle.dumps(a2)) < 1000)
+        assert_((pickle.loads(pickle.dumps(a2)) == a).all())
+        # and read-only where attached
+        assert_(not pickle.loads(pickle.dumps(a2)).flags.writeable)
+        assert_(pickle.loads(pickle.dumps(H2)) == H)
+
+        y1 = [_expect_task(x, H) for x in range(4)]
+        y2 = parallel_map(_expect_task, range(4), (H2,), num_cpus=2)
+        assert_(np.allclose(y1, y2))
+
+        class _Config():
+            pass
+
+        config = _Config()
+        config.data = a
+        shared.share_attrs(config, ['data', 'missing'])
+        assert_(config.data is not a)
+    assert_(config.data is a)
+
 if __name__ == "__main__":
     run_module_suite()
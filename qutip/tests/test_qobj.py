@@ -34,15 +34,17 @@
 import scipy.sparse as sp
 import scipy.linalg as la
 import numpy as np
-from numpy.testing import assert_equal, assert_, run_module_suite
+from numpy.testing import (assert_equal, assert_, assert_almost_equal,
+                           assert_raises, run_module_suite)
 
-from qutip.qobj import Qobj
+from qutip.qobj import Qobj, ptrace_batch
 from qutip.random_objects import (rand_ket, rand_dm, rand_herm, rand_unitary,
                                   rand_super)
 from qutip.states import basis, fock_dm, ket2dm
 from qutip.operators import create, destroy, num, sigmax
 from qutip.superoperator import spre, spost, operator_to_vector
 from qutip.superop_reps import to_super
+from qutip.expect import expect
 from qutip.tensor import tensor, super_tensor, composite
 
 from operator import add, mul, truediv, sub
@@ -758,5 +760,183 @@ def test_composite_vec():
     assert_(composite(k1, r4) == super_tensor(r1, r4))
     assert_(composite(r3, k2) == super_tensor(r3, r2))
 
+
+def test_isherm_symbolic():
+    """
+    Qobj arithmetic: hermiticity inferred without computing it.
+    """
+    A = rand_unitary(5) + destroy(5)
+    H = rand_herm(5)
+    assert_(H.isherm)
+
+    assert_equal((A + A.dag())._isherm, True)
+    assert_equal((A * A.dag())._isherm, True)
+    assert_equal((A.dag() * A)._isherm, True)
+    assert_equal((2.5 * H)._isherm, True)
+    assert_equal((H / 3)._isherm, True)
+    assert_equal((H + H)._isherm, True)
+    assert_equal((H + 1j)._isherm, False)
+
+    # unknown hermiticity is computed only when read
+    B = A * A
+    assert_(B._isherm is None)
+    assert_equal(B.isherm, False)
+    C = 1j * H
+    assert_(C._isherm is None)
+    assert_equal((C * C).isherm, True)
+
+
+def test_auto_tidyup_lazy():
+    """
+    Qobj arithmetic: lazy tidyup is applied once when the data is used.
+    """
+    import qutip.settings as settings
+    lazy = settings.auto_tidyup_lazy
+    settings.auto_tidyup_lazy = True
+    try:
+        a = destroy(5)
+        q = a + 1e-15 * a.dag()
+        q = q + 2 * num(5)
+        assert_(q._tidyup_pending)
+        assert_equal(q._data.nnz, 12)
+        assert_equal(q.data.nnz, 8)
+        assert_(not q._tidyup_pending)
+        assert_(q == a + 2 * num(5))
+    finally:
+        settings.auto_tidyup_lazy = lazy
+
+
+def test_QobjFromCsr():
+    """
+    Qobj.from_csr: wraps data without copying.
+    """
+    data = rand_dm(5).data
+    q = Qobj.from_csr(data, dims=[[5], [5]], isherm=True)
+    assert_(q.data is data)
+    assert_equal(q.isherm, True)
+    assert_(Qobj.from_csr(data, copy=True).data is not data)
+
+    psi = np.array([0.5, 0, 0.5j, 0, 1.0])
+    q = Qobj.from_csr(psi, dims=[[5], [1]])
+    assert_equal(q.type, 'ket')
+    assert_equal(q.data.nnz, 3)
+    assert_(q == Qobj(psi))
+
+    psi = np.exp(1j * np.arange(5.))
+    q = Qobj.from_csr(psi)
+    assert_(np.may_share_memory(q.data.data, psi))
+    assert_(np.all(q.full(squeeze=True) == psi))
+
+    rho = np.array([[0.5, 0.25j], [-0.25j, 0.5]])
+    assert_(Qobj.from_csr(rho) == Qobj(rho))
+    assert_(Qobj.from_csr(rho.T) == Qobj(rho.T))
+
+
+def test_QobjDenseStorage():
+    """
+    Qobj: dense storage is selected by fill ratio and gives the same results
+    """
+    import qutip.settings as settings
+    auto_dense = settings.auto_dense
+    settings.auto_dense = True
+    try:
+        rho = rand_dm(6)
+        assert_equal(rho.storage, 'dense')
+        assert_equal(Qobj(np.diag(np.arange(6.))).storage, 'csr')
+        A = rand_herm(6, density=0.2)
+        assert_equal(A.storage, 'csr')
+
+        rho_s = rho.to_csr()
+        psi = rand_ket(6).to_dense()
+        assert_equal(rho_s.storage, 'csr')
+        assert_equal(psi.storage, 'dense')
+        assert_(rho_s == rho)
+        assert_equal((A * rho).storage, 'dense')
+        assert_equal((A * psi).storage, 'dense')
+        assert_((A * rho - A * rho_s).norm() < 1e-12)
+        assert_((rho * A + 2 - (rho_s * A + 2)).norm() < 1e-12)
+        assert_((rho.dag() - rho_s.dag()).norm() < 1e-12)
+        assert_((rho.expm() - rho_s.expm()).norm() < 1e-12)
+        assert_almost_equal(rho.tr(), 1)
+        assert_almost_equal(rho.norm('fro'), rho_s.norm('fro'))
+        assert_almost_equal(psi.norm(), 1)
+        assert_almost_equal(expect(A, rho), expect(A, rho_s))
+        assert_almost_equal(expect(A.to_dense(), psi),
+                            expect(A, psi.to_csr()))
+        assert_equal(rho.full(), rho_s.full())
+        assert_equal(rho[1, 2], rho_s[1, 2])
+        assert_equal(rho[0:2, 1:4], rho_s[0:2, 1:4])
+        assert_equal(rho[:, 3], rho_s[:, 3])
+        assert_equal(psi[2:4], psi.to_csr()[2:4])
+
+        # direct access to the data gives a CSR copy of dense storage,
+        # which is kept until the data changes, and cannot be written to
+        assert_(sp.isspmatrix_csr(rho.data))
+        assert_(rho.data is rho.data)
+        assert_raises(ValueError, rho.data.data.__setitem__, 0, 1.0)
+        rho_csr = rho.data
+        rho.tidyup()
+        assert_(rho.data is not rho_csr)
+        # but is copied when it is used as the data of another object
+        rho_2 = Qobj(dims=rho.dims)
+        rho_2.data = sp.csr_matrix(rho.data, dtype=complex)
+        assert_(rho_2.data.data.flags.writeable)
+        assert_(rho_2.tidyup() == rho)
+        assert_equal(rho.storage, 'dense')
+        assert_((spre(rho) - spre(rho_s)).norm() < 1e-12)
+        assert_equal(rho.storage, 'dense')
+        rho_2 = Qobj(rho)
+        rho_2.data = 2 * rho.full()
+        assert_(abs(rho_2.data - 2 * rho_s.data).max() < 1e-12)
+    finally:
+        settings.auto_dense = auto_dense
+
+    # dense storage is only selected with settings.auto_dense
+    assert_equal(rand_dm(6).storage, 'csr')
+    assert_equal(Qobj(np.ones((3, 3))).storage, 'csr')
+
+
+def test_QobjPtrace():
+    """
+    Qobj: ptrace of dense, sparse and ket data
+    """
+    A, B, C = rand_dm(2), rand_dm(3), rand_dm(4)
+    rho = tensor(A, B, C)
+    for q in [rho, rho.to_csr(), rho.to_dense()]:
+        assert_((q.ptrace(0) - A).norm() < 1e-12)
+        assert_((q.ptrace([0, 2]) - tensor(A, C)).norm() < 1e-12)
+        assert_((q.ptrace([2, 1]) - tensor(B, C)).norm() < 1e-12)
+        assert_((q.ptrace([0, 1, 2]) - rho).norm() < 1e-12)
+
+    psi = tensor(rand_ket(2), rand_ket(3), rand_ket(4)) + \
+        tensor(basis(2, 0), basis(3, 1), basis(4, 3))
+    psi = psi.unit()
+    for sel in [0, 1, [0, 1], [1, 2]]:
+        ref = ket2dm(psi).ptrace(sel)
+        assert_((psi.ptrace(sel) - ref).norm() < 1e-12)
+        assert_((psi.to_dense().ptrace(sel) - ref).norm() < 1e-12)
+        assert_equal(psi.ptrace(sel).dims, ref.dims)
+
+
+def test_QobjPtraceBatch():
+    """
+    Qobj: ptrace_batch of state lists and stacked state data
+    """
+    dims = [2, 3, 2]
+    rhos = [rand_dm(12, dims=[dims, dims]) for _ in range(3)]
+    kets = [rand_ket(12, dims=dims) for _ in range(3)]
+    for states in [rhos, kets]:
+        for sel in [0, [0, 2], [2, 1]]:
+            out = ptrace_batch(states, sel)
+            assert_equal(len(out), len(states))
+            for rho, q in zip(out, states):
+                assert_((rho - q.ptrace(sel)).norm() < 1e-12)
+                assert_equal(rho.dims, q.ptrace(sel).dims)
+
+    stack = np.array([rho.full() for rho in rhos])
+    out = ptrace_batch(stack, 1, dims=dims)
+    assert_equal(out.shape, (3, 3, 3))
+    assert_(np.allclose(out[0], rhos[0].ptrace(1).full()))
+
 if __name__ == "__main__":
     run_module_suite()
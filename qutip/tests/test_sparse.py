@@ -31,13 +31,17 @@
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
 import numpy as np
-from numpy.testing import run_module_suite, assert_equal
+from numpy.testing import run_module_suite, assert_equal, assert_
 import scipy.sparse as sp
 
 from qutip.random_objects import rand_dm
 from qutip.states import coherent
 from qutip.sparse import (sp_bandwidth, sp_permute, sp_reverse_permute,
                           sp_profile)
+from qutip.cy.spmatfuncs import (spmv_csr, spmv_csr_openmp, spmvpy,
+                                 spmvpy_openmp, row_partition, cy_mc_collapse)
+from qutip.random_objects import rand_ket
+from qutip.operators import destroy
 
 
 def _permutateIndexes(array, row_perm, col_perm):
@@ -187,5 +191,44 @@ def test_sp_profile():
         assert_equal(pro, ans)
 
 
+def test_spmv_openmp():
+    "Sparse: Multi-threaded matrix-vector products"
+    A = rand_dm(500, density=0.05).data
+    vec = np.random.rand(500) + 1j * np.random.rand(500)
+    ans = spmv_csr(A.data, A.indices, A.indptr, vec)
+    for nthr in [1, 2, 3, 7]:
+        out = spmv_csr_openmp(A.data, A.indices, A.indptr, vec, nthr)
+        assert_(np.max(abs(out - ans)) < 1e-12)
+
+        out = spmvpy_openmp(A.data, A.indices, A.indptr, vec, 0.5j,
+                            vec.copy(), nthr)
+        ref = spmvpy(A.data, A.indices, A.indptr, vec, 0.5j, vec.copy())
+        assert_(np.max(abs(out - ref)) < 1e-12)
+
+        bounds = row_partition(A.indptr, nthr)
+        assert_equal(bounds[0], 0)
+        assert_equal(bounds[-1], 500)
+        assert_(np.all(np.diff(bounds) >= 0))
+
+
+def test_mc_collapse():
+    "Sparse: Collapse channel selection on stacked operators"
+    N = 10
+    psi = rand_ket(N).full().ravel()
+    c_ops = [destroy(N), destroy(N).dag(), 0.5 * destroy(N) ** 2]
+    weights = np.array([1.0, 0.3, 2.0])
+    C = sp.vstack([c.data for c in c_ops], format='csr')
+    outs = [c.data * psi for c in c_ops]
+    probs = weights * np.array([np.linalg.norm(out) ** 2 for out in outs])
+    cum = np.cumsum(probs / np.sum(probs))
+    for rand in [0.0, 0.2, 0.5, 0.8, 0.999]:
+        j, state = cy_mc_collapse(C.data, C.indices.astype(np.int32),
+                                  C.indptr.astype(np.int32), psi, weights,
+                                  rand)
+        assert_equal(j, np.where(cum >= rand)[0][0])
+        ans = outs[j] / np.linalg.norm(outs[j])
+        assert_(np.max(abs(state - ans)) < 1e-12)
+
+
 if __name__ == "__main__":
     run_module_suite()
@@ -31,10 +31,18 @@
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
 
+import warnings
 import numpy as np
 from numpy.testing import assert_, run_module_suite
+from scipy.stats import poisson
 
-from qutip import (smesolve, mesolve, destroy, coherent, parallel_map)
+from qutip import (smesolve, mesolve, destroy, coherent, parallel_map,
+                   Options, basis, sigmax, sigmay, sigmaz, sigmam)
+from qutip import stochastic
+from qutip.stochastic import (d1_rho_homodyne, d2_rho_homodyne,
+                              d1_rho_heterodyne, d2_rho_heterodyne,
+                              d1_rho_photocurrent, d2_rho_photocurrent,
+                              _poisson_inverse)
 
 
 def test_ssesolve_photocurrent():
@@ -127,5 +135,166 @@ def test_ssesolve_heterodyne():
                  for m in res.measurement]))
 
 
+def test_smesolve_kernel():
+    "Stochastic: smesolve: compiled kernel"
+    N = 4
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    c_ops = [np.sqrt(0.05) * a.dag()]
+    sc_ops = [np.sqrt(0.25) * a, np.sqrt(0.1) * a.dag() * a]
+    e_ops = [a.dag() * a, a + a.dag()]
+    times = np.linspace(0, 1, 20)
+    for method, d1, d2, d2_len in [
+            ('homodyne', d1_rho_homodyne, d2_rho_homodyne, 1),
+            ('heterodyne', d1_rho_heterodyne, d2_rho_heterodyne, 2),
+            ('photocurrent', d1_rho_photocurrent, d2_rho_photocurrent, 1)]:
+        res1 = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=2,
+                        nsubsteps=20, method=method, store_noise=True)
+        # the same increments with the python rhs functions
+        res2 = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=2,
+                        nsubsteps=20, method=method, d1=d1, d2=d2,
+                        d2_len=d2_len, noise=res1.noise)
+        assert_(all(np.allclose(res1.expect[idx], res2.expect[idx])
+                    for idx in range(len(e_ops))))
+
+
+def test_smesolve_ensemble():
+    "Stochastic: smesolve: ensemble of trajectories"
+    N = 4
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    c_ops = [np.sqrt(0.05) * a.dag()]
+    sc_ops = [np.sqrt(0.25) * a, np.sqrt(0.1) * a.dag() * a]
+    e_ops = [a.dag() * a, a + a.dag()]
+    times = np.linspace(0, 1, 20)
+    for method in ['homodyne', 'heterodyne', 'photocurrent']:
+        res1 = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=5,
+                        nsubsteps=20, method=method, store_noise=True)
+        # blocks of trajectories, distributed over processes
+        res2 = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=5,
+                        nsubsteps=20, method=method, ensemble_size=2,
+                        store_noise=True, map_func=parallel_map,
+                        options=Options(seeds=res1.seeds))
+        assert_(all(np.allclose(dW1, dW2)
+                    for dW1, dW2 in zip(res1.noise, res2.noise)))
+        assert_(all(np.allclose(res1.expect[idx], res2.expect[idx])
+                    for idx in range(len(e_ops))))
+
+
+def test_smesolve_order15():
+    "Stochastic: smesolve: strong order 1.5 solvers"
+    tol = 0.01
+
+    N = 4
+    gamma = 0.25
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [np.sqrt(gamma) * a]
+    e_ops = [a.dag() * a, a + a.dag(), (-1j)*(a - a.dag())]
+
+    times = np.linspace(0, 2.5, 50)
+    res_ref = mesolve(H, psi0, times, sc_ops, e_ops)
+    for method in ['homodyne', 'heterodyne']:
+        # the two schemes agree along the same noise
+        res1 = smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=1,
+                        nsubsteps=5, method=method, solver='taylor1.5',
+                        store_noise=True)
+        res2 = smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=1,
+                        nsubsteps=5, method=method, solver='explicit1.5',
+                        noise=res1.noise)
+        assert_(all([np.max(abs(res1.expect[idx] - res2.expect[idx])) < tol
+                     for idx in range(len(e_ops))]))
+
+        # adaptive substeps
+        res = smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=25,
+                       nsubsteps=2, method=method, solver='taylor1.5',
+                       tol=1e-4, map_func=parallel_map)
+        assert_(all([np.mean(abs(res.expect[idx] - res_ref.expect[idx])) <
+                     tol for idx in range(len(e_ops))]))
+
+        # the refinements are reproducible along given increments
+        res1 = smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=2,
+                        nsubsteps=2, method=method, solver='taylor1.5',
+                        tol=1e-4)
+        res2 = smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=2,
+                        nsubsteps=2, method=method, solver='taylor1.5',
+                        tol=1e-4, noise=res1.noise,
+                        options=Options(seeds=res1.seeds))
+        assert_(all([np.allclose(res1.expect[idx], res2.expect[idx])
+                     for idx in range(len(e_ops))]))
+
+
+def test_poisson_inverse():
+    "Stochastic: poisson increments by inversion, with large means"
+    u = np.random.rand(500)
+    for lam in [0.5, 20.0, 1000.0]:
+        k = _poisson_inverse(lam * np.ones(len(u)), u)
+        assert_(np.all(k == poisson.ppf(u, lam)))
+
+
+def test_smesolve_stiff():
+    "Stochastic: smesolve: drift-implicit and exponential solvers"
+    tol = 0.02
+
+    # strong dephasing of a driven qubit: the coherences decay at the rate
+    # 2 * kappa = 100 while the populations relax slowly by the Zeno effect
+    Omega = 10.0
+    kappa = 50.0
+    gamma = 0.01
+
+    H = 0.5 * Omega * sigmax()
+    psi0 = basis(2, 0)
+    c_ops = [np.sqrt(kappa) * sigmaz()]
+    sc_ops = [np.sqrt(gamma) * sigmam()]
+    e_ops = [sigmaz(), sigmay()]
+
+    # substeps with 2 * kappa * dt = 10, far beyond the stability limit of
+    # the explicit solvers
+    times = np.linspace(0, 5, 51)
+    res_ref = mesolve(H, psi0, times, c_ops + sc_ops, e_ops)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        res = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=2,
+                       nsubsteps=1, solver='euler-maruyama')
+    assert_(not np.all(np.abs(res.expect[0] - res_ref.expect[0]) < 1))
+
+    for solver in ['implicit-euler', 'implicit-milstein',
+                   'exponential-euler', 'exponential-milstein']:
+        for method in ['homodyne', 'heterodyne']:
+            res = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=20,
+                           nsubsteps=1, method=method, solver=solver,
+                           map_func=parallel_map)
+            assert_(all([np.mean(abs(res.expect[idx] - res_ref.expect[idx]))
+                         < tol for idx in range(len(e_ops))]))
+
+
+def test_smesolve_exponential_expm_multiply():
+    "Stochastic: smesolve: exponential solver without the exp(L dt) matrix"
+    N = 4
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    c_ops = [np.sqrt(0.5) * a]
+    sc_ops = [np.sqrt(0.25) * a]
+    e_ops = [a.dag() * a]
+    times = np.linspace(0, 1, 11)
+
+    res1 = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=2,
+                    nsubsteps=5, solver='exponential-euler')
+    max_dim = stochastic._expm_max_dim
+    stochastic._expm_max_dim = 0
+    try:
+        res2 = smesolve(H, psi0, times, c_ops, sc_ops, e_ops, ntraj=2,
+                        nsubsteps=5, solver='exponential-euler',
+                        options=Options(seeds=res1.seeds))
+    finally:
+        stochastic._expm_max_dim = max_dim
+    assert_(np.allclose(res1.expect[0], res2.expect[0]))
+
+
 if __name__ == "__main__":
     run_module_suite()
@@ -30,10 +30,17 @@
 #    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
+import os
+import tempfile
 import numpy as np
 from numpy.testing import assert_,  run_module_suite
 
-from qutip import ssesolve, destroy, coherent, mesolve, parallel_map
+from qutip import (ssesolve, destroy, coherent, mesolve, parallel_map,
+                   Options)
+from qutip.stochastic import (StochasticNoise,
+                              d1_psi_homodyne, d2_psi_homodyne,
+                              d1_psi_heterodyne, d2_psi_heterodyne,
+                              d1_psi_photocurrent, d2_psi_photocurrent)
 
 
 def test_ssesolve_photocurrent():
@@ -126,5 +133,136 @@ def test_ssesolve_heterodyne():
                  for m in res.measurement]))
 
 
+def test_ssesolve_seeds():
+    "Stochastic: ssesolve: reproducible noise"
+    N = 4
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [np.sqrt(0.25) * a]
+    times = np.linspace(0, 1, 20)
+    res1 = ssesolve(H, psi0, times, sc_ops, [a.dag() * a], ntraj=8,
+                    nsubsteps=10, method='homodyne', map_func=parallel_map)
+    # the noise does not depend on the distribution of the trajectories
+    opts = Options(seeds=res1.seeds, chunk_size=3)
+    res2 = ssesolve(H, psi0, times, sc_ops, [a.dag() * a], ntraj=8,
+                    nsubsteps=10, method='homodyne', options=opts)
+    assert_(all(np.allclose(dW1, dW2)
+                for dW1, dW2 in zip(res1.noise, res2.noise)))
+    assert_(np.allclose(res1.expect[0], res2.expect[0]))
+    # more trajectories extend the run
+    res3 = ssesolve(H, psi0, times, sc_ops, [a.dag() * a], ntraj=12,
+                    nsubsteps=10, method='homodyne', options=opts)
+    assert_(all(np.allclose(dW1, dW3)
+                for dW1, dW3 in zip(res1.noise, res3.noise[:8])))
+
+
+def test_ssesolve_kernel():
+    "Stochastic: ssesolve: compiled kernel"
+    N = 4
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [np.sqrt(0.25) * a, np.sqrt(0.1) * a.dag() * a]
+    e_ops = [a.dag() * a, a + a.dag()]
+    times = np.linspace(0, 1, 20)
+    for method, d1, d2, d2_len in [
+            ('homodyne', d1_psi_homodyne, d2_psi_homodyne, 1),
+            ('heterodyne', d1_psi_heterodyne, d2_psi_heterodyne, 2),
+            ('photocurrent', d1_psi_photocurrent, d2_psi_photocurrent, 1)]:
+        res1 = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=2,
+                        nsubsteps=20, method=method, store_noise=True)
+        # the same increments with the python rhs functions
+        res2 = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=2,
+                        nsubsteps=20, method=method, d1=d1, d2=d2,
+                        d2_len=d2_len, noise=res1.noise)
+        assert_(all(np.allclose(res1.expect[idx], res2.expect[idx])
+                    for idx in range(len(e_ops))))
+
+
+def test_ssesolve_ensemble():
+    "Stochastic: ssesolve: ensemble of trajectories"
+    N = 4
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [np.sqrt(0.25) * a, np.sqrt(0.1) * a.dag() * a]
+    e_ops = [a.dag() * a, a + a.dag()]
+    times = np.linspace(0, 1, 20)
+    for method in ['homodyne', 'heterodyne', 'photocurrent']:
+        res1 = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=5,
+                        nsubsteps=20, method=method, store_noise=True)
+        # blocks of trajectories, distributed over processes
+        res2 = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=5,
+                        nsubsteps=20, method=method, ensemble_size=2,
+                        store_noise=True, map_func=parallel_map,
+                        options=Options(seeds=res1.seeds))
+        assert_(all(np.allclose(dW1, dW2)
+                    for dW1, dW2 in zip(res1.noise, res2.noise)))
+        assert_(all(np.allclose(res1.expect[idx], res2.expect[idx])
+                    for idx in range(len(e_ops))))
+
+
+def test_ssesolve_noise_records():
+    "Stochastic: ssesolve: noise handles and measurement file"
+    N = 4
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [np.sqrt(0.25) * a]
+    times = np.linspace(0, 1, 20)
+    res1 = ssesolve(H, psi0, times, sc_ops, [a.dag() * a], ntraj=3,
+                    nsubsteps=10, method='homodyne', store_noise=False,
+                    store_measurement=True)
+    assert_(all(isinstance(dW, StochasticNoise) for dW in res1.noise))
+    # the handles regenerate the stored increments
+    opts = Options(seeds=res1.seeds)
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        res2 = ssesolve(H, psi0, times, sc_ops, [a.dag() * a], ntraj=3,
+                        nsubsteps=10, method='homodyne', store_noise=True,
+                        store_measurement=True, measurement_file=path,
+                        options=opts)
+        assert_(all(np.allclose(dW1.full(), dW2)
+                    for dW1, dW2 in zip(res1.noise, res2.noise)))
+        # the handles index as arrays
+        assert_(res1.noise[1].shape == res2.noise[1].shape)
+        assert_(np.allclose(res1.noise[1][0, 5], res2.noise[1][0, 5]))
+        assert_(res2.measurement.shape == (3, len(times), len(sc_ops)))
+        assert_(np.allclose(res2.measurement, res1.measurement))
+        # and can be used as the noise of a new run
+        res3 = ssesolve(H, psi0, times, sc_ops, [a.dag() * a], ntraj=3,
+                        nsubsteps=10, method='homodyne', noise=res1.noise)
+        assert_(np.allclose(res3.expect[0], res1.expect[0]))
+        del res2
+    finally:
+        os.remove(path)
+
+
+def test_ssesolve_explicit15():
+    "Stochastic: ssesolve: explicit order 1.5 solver"
+    tol = 0.01
+
+    N = 4
+    gamma = 0.25
+    ntraj = 25
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [np.sqrt(gamma) * a]
+    e_ops = [a.dag() * a, a + a.dag(), (-1j)*(a - a.dag())]
+
+    times = np.linspace(0, 2.5, 50)
+    res_ref = mesolve(H, psi0, times, sc_ops, e_ops)
+    for method in ['homodyne', 'heterodyne']:
+        res = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=ntraj,
+                       nsubsteps=5, method=method, solver='explicit1.5',
+                       tol=1e-3, map_func=parallel_map)
+        assert_(all([np.mean(abs(res.expect[idx] - res_ref.expect[idx])) <
+                     tol for idx in range(len(e_ops))]))
+
+
 if __name__ == "__main__":
     run_module_suite()
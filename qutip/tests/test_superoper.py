@@ -39,8 +39,10 @@ import scipy
 from qutip import (rand_dm, rand_unitary, spre, spost, vector_to_operator,
                    operator_to_vector, mat2vec, vec2mat, vec2mat_index,
                    mat2vec_index, tensor, sprepost, to_super, reshuffle,
-                   identity)
-from qutip.superoperator import liouvillian, liouvillian_ref
+                   identity, rand_herm, destroy)
+import qutip.superoperator as superoperator
+from qutip.superoperator import (liouvillian, liouvillian_ref,
+                                 lindblad_dissipator)
 
 
 class TestMatVec:
@@ -183,6 +185,46 @@ class TestMatVec:
 
         assert_((L1 - L2).norm() < 1e-8)
 
+    def testLiouvillianRepeatedAndSuperCollapse(self):
+        """
+        Superoperator: Liouvillian with repeated, superoperator and
+        phase-weighted collapse operators.
+        """
+        N = 5
+        H = rand_herm(N)
+        a = destroy(N)
+        b = rand_dm(N, density=0.75)
+
+        L1 = liouvillian(H, [a, a, b, lindblad_dissipator(b)])
+        L2 = liouvillian_ref(H, [a, a, b, lindblad_dissipator(b)])
+        assert_((L1 - L2).norm() < 1e-8)
+        assert_((liouvillian(None, [a]) - liouvillian_ref(None, [a])).norm()
+                < 1e-8)
+
+        chi = [0.5, -0.5]
+        L1 = liouvillian(H, [a, a], chi=chi)
+        L2 = (-1j * (spre(H) - spost(H)) +
+              2 * np.cos(0.5) * spre(a) * spost(a.dag()) +
+              2 * lindblad_dissipator(a) - 2 * spre(a) * spost(a.dag()))
+        assert_((L1 - L2).norm() < 1e-8)
+
+    def testLiouvillianIdentityCache(self):
+        """
+        Superoperator: the identity matrices of liouvillian are cached for a
+        bounded number of dimensions
+        """
+        for N in range(2, 4 + 2 * superoperator._identity_cache_size):
+            H = rand_herm(N)
+            L1 = liouvillian(H, [destroy(N)])
+            L2 = liouvillian_ref(H, [destroy(N)])
+            assert_((L1 - L2).norm() < 1e-8)
+            assert_(len(superoperator._identity_cache) <=
+                    superoperator._identity_cache_size)
+        assert_(superoperator._identity_coo(3).shape == (3, 3))
+        N = superoperator._identity_cache_max_dim + 1
+        assert_(superoperator._identity_coo(N).nnz == N)
+        assert_(N not in superoperator._identity_cache)
+
 
 if __name__ == "__main__":
     run_module_suite()